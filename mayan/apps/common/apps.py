@@ -12,11 +12,12 @@ from django.conf import settings
 from django.conf.urls import include, url
 from django.contrib.auth.signals import user_logged_in
 from django.db.models.signals import post_save
+from django.test.signals import setting_changed
 from django.utils.translation import ugettext_lazy as _
 
 from mayan.celery import app
 
-from .classes import Package
+from .classes import CompiledTemplate, Package
 from .handlers import (
     user_locale_profile_session_config, user_locale_profile_create
 )
@@ -1086,6 +1087,10 @@ THE SOFTWARE.
             user_locale_profile_session_config,
             dispatch_uid='user_locale_profile_session_config'
         )
+        setting_changed.connect(
+            CompiledTemplate.reset_fast_evaluation,
+            dispatch_uid='compiled_template_reset_fast_evaluation'
+        )
         self.setup_auto_logging()
 
     def setup_auto_logging(self):
@@ -1,12 +1,24 @@
 from __future__ import unicode_literals
 
+import re
+import threading
+
+from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.db import models
+from django.template import Context, Template, Variable, VariableDoesNotExist
+from django.utils.encoding import force_text
+from django.utils.formats import localize
+from django.utils.html import conditional_escape
+from django.utils.timezone import template_localtime
 from django.utils.translation import ugettext
 
 from acls.models import AccessControlList
 from permissions import Permission
 
+from .literals import TEMPLATE_CACHE_SIZE
+from .settings import setting_fast_template_evaluation
+
 
 class ModelAttribute(object):
     __registry = {}
@@ -162,3 +174,107 @@ class Package(object):
         self.label = label
         self.license_text = license_text
         self.__class__._registry.append(self)
+
+
+class CompiledTemplate(object):
+    """
+    Cache of the compiled templates of the user defined expressions, like
+    the index, smart link and metadata expressions, keyed by their text.
+    Expressions that only output a variable, like
+    {{ document.metadata_value_of.invoice }}, can be resolved directly
+    without the template engine when COMMON_FAST_TEMPLATE_EVALUATION is
+    enabled.
+    """
+    _cache = {}
+    _fast_evaluation = None
+    _lock = threading.Lock()
+    _variable_regex = re.compile(r'^\{\{\s*([\w.]+)\s*\}\}$')
+
+    @classmethod
+    def get(cls, expression):
+        try:
+            return cls._cache[expression]
+        except KeyError:
+            compiled_template = cls(expression)
+
+            with cls._lock:
+                if len(cls._cache) >= TEMPLATE_CACHE_SIZE:
+                    cls._cache.clear()
+
+                cls._cache[expression] = compiled_template
+
+            return compiled_template
+
+    @classmethod
+    def invalidate(cls, expression=None):
+        """
+        Remove the compiled template of an expression, or of all the
+        expressions if no expression is given.
+        """
+        with cls._lock:
+            if expression is None:
+                cls._cache.clear()
+            else:
+                cls._cache.pop(expression, None)
+
+    @classmethod
+    def get_fast_evaluation(cls):
+        """
+        Return the value of COMMON_FAST_TEMPLATE_EVALUATION, read once
+        instead of on every render.
+        """
+        if cls._fast_evaluation is None:
+            cls._fast_evaluation = setting_fast_template_evaluation.value
+
+        return cls._fast_evaluation
+
+    @classmethod
+    def reset_fast_evaluation(cls, setting, **kwargs):
+        """
+        Forget the value of COMMON_FAST_TEMPLATE_EVALUATION when it
+        changes. Accepts the arguments of the setting_changed signal.
+        """
+        if setting == setting_fast_template_evaluation.global_name:
+            cls._fast_evaluation = None
+
+    def __init__(self, expression):
+        self.expression = expression
+        match = self._variable_regex.match(expression)
+
+        if match and not match.group(1).startswith('_'):
+            self.variable = Variable(match.group(1))
+        else:
+            self.variable = None
+
+        # Compile even simple expressions to raise syntax errors early
+        self.template = Template(expression)
+
+    def render(self, context=None):
+        """
+        Render the expression with a dictionary of context values
+        """
+        context = Context(context or {})
+
+        if self.variable and self.get_fast_evaluation():
+            return self.render_variable(context=context)
+        else:
+            return self.template.render(context=context)
+
+    def render_variable(self, context):
+        """
+        Resolve the variable of the expression and format it like the
+        template engine does.
+        """
+        try:
+            value = self.variable.resolve(context)
+        except VariableDoesNotExist:
+            return settings.TEMPLATE_STRING_IF_INVALID
+
+        value = template_localtime(value, use_tz=context.use_tz)
+        value = localize(value, use_l10n=context.use_l10n)
+        value = force_text(value)
+
+        if context.autoescape:
+            return force_text(conditional_escape(value))
+        else:
+            return value
@@ -5,6 +5,8 @@ from django.utils.translation import ugettext_lazy as _
 
 DELETE_STALE_UPLOADS_INTERVAL = 60 * 10  # 10 minutes
 
+TEMPLATE_CACHE_SIZE = 1000
+
 TIME_DELTA_UNIT_DAYS = 'days'
 TIME_DELTA_UNIT_HOURS = 'hours'
 TIME_DELTA_UNIT_MINUTES = 'minutes'
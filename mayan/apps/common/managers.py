@@ -0,0 +1,24 @@
+from __future__ import unicode_literals
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+
+
+class CacheGenerationManager(models.Manager):
+    def get_value(self, name):
+        """
+        Return the current value of a generation, 0 until it is first
+        incremented.
+        """
+        return self.filter(name=name).values_list(
+            'value', flat=True
+        ).first() or 0
+
+    def increment(self, name):
+        if not self.filter(name=name).update(value=F('value') + 1):
+            try:
+                with transaction.atomic():
+                    self.create(name=name, value=1)
+            except IntegrityError:
+                # Created by another process meanwhile
+                self.filter(name=name).update(value=F('value') + 1)
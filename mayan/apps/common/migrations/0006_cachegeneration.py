@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('common', '0005_auto_20150706_1832'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheGeneration',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('name', models.CharField(unique=True, max_length=64, verbose_name='Name')),
+                ('value', models.PositiveIntegerField(default=0, verbose_name='Value')),
+            ],
+            options={
+                'verbose_name': 'Cache generation',
+                'verbose_name_plural': 'Cache generations',
+            },
+            bases=(models.Model,),
+        ),
+    ]
@@ -9,6 +9,7 @@ from django.db import models
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 
+from .managers import CacheGenerationManager
 from .runtime import shared_storage_backend
 
 
@@ -16,6 +17,25 @@ def upload_to(instance, filename):
     return 'shared-file-{}'.format(uuid.uuid4().hex)
 
 
+@python_2_unicode_compatible
+class CacheGeneration(models.Model):
+    """
+    Counter shared by all the processes, used as part of cache keys to
+    invalidate values cached by other processes.
+    """
+    name = models.CharField(max_length=64, unique=True, verbose_name=_('Name'))
+    value = models.PositiveIntegerField(default=0, verbose_name=_('Value'))
+
+    objects = CacheGenerationManager()
+
+    class Meta:
+        verbose_name = _('Cache generation')
+        verbose_name_plural = _('Cache generations')
+
+    def __str__(self):
+        return self.name
+
+
 @python_2_unicode_compatible
 class SharedUploadedFile(models.Model):
     file = models.FileField(
@@ -41,3 +41,12 @@ settings_db_sync_task_delay = namespace.add_setting(
         'propagate.'
     )
 )
+setting_fast_template_evaluation = namespace.add_setting(
+    global_name='COMMON_FAST_TEMPLATE_EVALUATION',
+    default=True,
+    help_text=_(
+        'Resolve the user defined template expressions that only output a '
+        'variable, like {{ document.metadata_value_of.invoice }}, without '
+        'the template engine.'
+    )
+)
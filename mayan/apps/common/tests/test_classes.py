@@ -0,0 +1,49 @@
+from __future__ import unicode_literals
+
+import datetime
+
+from django.test import TestCase, override_settings
+
+from ..classes import CompiledTemplate
+
+
+class CompiledTemplateTestCase(TestCase):
+    def setUp(self):
+        CompiledTemplate.invalidate()
+
+    def test_compiled_template_reuse(self):
+        compiled_template = CompiledTemplate.get('{{ value|upper }}')
+
+        self.assertTrue(
+            CompiledTemplate.get('{{ value|upper }}') is compiled_template
+        )
+
+        CompiledTemplate.invalidate('{{ value|upper }}')
+
+        self.assertFalse(
+            CompiledTemplate.get('{{ value|upper }}') is compiled_template
+        )
+
+    def test_fast_evaluation_matches_template(self):
+        context = {
+            'document': {
+                'date': datetime.date(2015, 1, 31), 'label': 'a & b',
+                'pages': 3
+            }
+        }
+
+        for expression in (
+            '{{ document.date }}', '{{ document.label }}',
+            '{{ document.pages }}', '{{ document.missing }}',
+            '{{ missing.value }}'
+        ):
+            compiled_template = CompiledTemplate.get(expression)
+            self.assertTrue(compiled_template.variable)
+
+            with override_settings(COMMON_FAST_TEMPLATE_EVALUATION=False):
+                expected = compiled_template.render(context=context)
+
+            with override_settings(COMMON_FAST_TEMPLATE_EVALUATION=True):
+                self.assertEqual(
+                    compiled_template.render(context=context), expected
+                )
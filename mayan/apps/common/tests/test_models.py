@@ -0,0 +1,16 @@
+from __future__ import unicode_literals
+
+from django.test import TestCase
+
+from ..models import CacheGeneration
+
+
+class CacheGenerationTestCase(TestCase):
+    def test_increment(self):
+        self.assertEqual(CacheGeneration.objects.get_value(name='test'), 0)
+
+        CacheGeneration.objects.increment(name='test')
+        CacheGeneration.objects.increment(name='test')
+
+        self.assertEqual(CacheGeneration.objects.get_value(name='test'), 2)
+        self.assertEqual(CacheGeneration.objects.get_value(name='other'), 0)
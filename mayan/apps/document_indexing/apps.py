@@ -1,10 +1,13 @@
 from __future__ import absolute_import, unicode_literals
 
+from datetime import timedelta
+
 from kombu import Exchange, Queue
 
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import m2m_changed, post_save, post_delete
 from django.utils.translation import ugettext_lazy as _
 
+from acls.models import AccessControlList
 from common import (
     MayanAppConfig, menu_facet, menu_main, menu_object, menu_secondary,
     menu_setup, menu_tools
@@ -16,19 +19,23 @@ from documents.signals import post_document_created
 from mayan.celery import app
 from metadata.models import DocumentMetadata
 from navigation import SourceColumn
+from permissions.models import Role
 from rest_api.classes import APIEndPoint
 
 from .handlers import (
-    document_created_index_update, document_index_delete,
+    document_created_index_update, document_index_count_update,
     document_metadata_index_update, document_metadata_index_post_delete
 )
 from .links import (
     link_document_index_list, link_index_main_menu, link_index_setup,
     link_index_setup_create, link_index_setup_document_types,
     link_index_setup_delete, link_index_setup_edit, link_index_setup_list,
-    link_index_setup_view, link_rebuild_index_instances,
-    link_template_node_create, link_template_node_delete,
-    link_template_node_edit
+    link_index_setup_rebuild, link_index_setup_view,
+    link_rebuild_index_instances, link_template_node_create,
+    link_template_node_delete, link_template_node_edit
+)
+from .literals import (
+    EMPTY_NODES_SWEEP_INTERVAL, INDEX_UPDATE_SWEEP_INTERVAL
 )
 from .models import (
     DocumentIndexInstanceNode, Index, IndexInstance, IndexInstanceNode,
@@ -155,12 +162,35 @@ OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
                 'document_indexing.tasks.task_delete_empty_index_nodes': {
                     'queue': 'indexing'
                 },
-                'document_indexing.tasks.task_index_document': {
+                'document_indexing.tasks.task_index_queued_documents': {
                     'queue': 'indexing'
                 },
                 'document_indexing.tasks.task_do_rebuild_all_indexes': {
                     'queue': 'tools'
                 },
+                'document_indexing.tasks.task_rebuild_index_documents': {
+                    'queue': 'indexing'
+                },
+                'document_indexing.tasks.task_rebuild_index_finish': {
+                    'queue': 'tools'
+                },
+            }
+        )
+
+        app.conf.CELERYBEAT_SCHEDULE.update(
+            {
+                'task_delete_empty_index_nodes': {
+                    'task': 'document_indexing.tasks.task_delete_empty_index_nodes',
+                    'schedule': timedelta(
+                        seconds=EMPTY_NODES_SWEEP_INTERVAL
+                    ),
+                },
+                'task_index_queued_documents': {
+                    'task': 'document_indexing.tasks.task_index_queued_documents',
+                    'schedule': timedelta(
+                        seconds=INDEX_UPDATE_SWEEP_INTERVAL
+                    ),
+                },
             }
         )
 
@@ -170,7 +200,8 @@ OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
         menu_object.bind_links(
             links=(
                 link_index_setup_edit, link_index_setup_view,
-                link_index_setup_document_types, link_index_setup_delete
+                link_index_setup_document_types, link_index_setup_rebuild,
+                link_index_setup_delete
             ), sources=(Index,)
         )
         menu_object.bind_links(
@@ -190,10 +221,6 @@ OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
         menu_setup.bind_links(links=(link_index_setup,))
         menu_tools.bind_links(links=(link_rebuild_index_instances,))
 
-        post_delete.connect(
-            document_index_delete, dispatch_uid='document_index_delete',
-            sender=Document
-        )
         post_delete.connect(
             document_metadata_index_post_delete,
             dispatch_uid='document_metadata_index_post_delete',
@@ -208,3 +235,23 @@ OR IN CONNECTION WITH THE USE OR PERFORMANCE OF THIS SOFTWARE.
             dispatch_uid='document_metadata_index_update',
             sender=DocumentMetadata
         )
+        post_save.connect(
+            document_index_count_update,
+            dispatch_uid='document_index_count_update', sender=Document
+        )
+
+        # Access changes alter the document counts of the users with
+        # restricted access
+        for signal, sender in (
+            (post_save, AccessControlList),
+            (post_delete, AccessControlList),
+            (m2m_changed, AccessControlList.permissions.through),
+            (post_delete, Role),
+            (m2m_changed, Role.permissions.through),
+        ):
+            signal.connect(
+                IndexInstanceNode.invalidate_item_counts, sender=sender,
+                dispatch_uid='index_item_count_invalidate_{}_{}'.format(
+                    id(signal), sender._meta.model_name
+                )
+            )
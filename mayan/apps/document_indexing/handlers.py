@@ -1,25 +1,53 @@
 from __future__ import unicode_literals
 
-from .tasks import task_delete_empty_index_nodes, task_index_document
+from lock_manager import Lock, LockError
+
+from .literals import (
+    INDEX_UPDATE_DEBOUNCE, INDEX_UPDATE_SCHEDULED_LOCK_NAME,
+    INDEX_UPDATE_LOCK_TIMEOUT
+)
+from .models import IndexInstanceNode, IndexUpdateQueueEntry
+from .tasks import task_index_queued_documents
+
+
+def queue_document_index_update(document_pk):
+    """
+    Mark a document as needing an index update. Changes to the same
+    document before the queue is processed are coalesced and a single task
+    processes the queue INDEX_UPDATE_DEBOUNCE seconds after the first
+    change.
+    """
+    if IndexUpdateQueueEntry.objects.add_documents(document_pks=(document_pk,)):
+        try:
+            Lock.acquire_lock(
+                INDEX_UPDATE_SCHEDULED_LOCK_NAME,
+                timeout=INDEX_UPDATE_LOCK_TIMEOUT
+            )
+        except LockError:
+            # The queue processing task is already scheduled
+            pass
+        else:
+            task_index_queued_documents.apply_async(
+                countdown=INDEX_UPDATE_DEBOUNCE
+            )
 
 
 def document_created_index_update(sender, **kwargs):
-    task_index_document.apply_async(
-        kwargs=dict(document_id=kwargs['instance'].pk)
-    )
+    queue_document_index_update(document_pk=kwargs['instance'].pk)
 
 
-def document_index_delete(sender, **kwargs):
-    task_delete_empty_index_nodes.apply_async()
+def document_index_count_update(sender, **kwargs):
+    # Documents in the trash are not counted
+    IndexInstanceNode.objects.update_document_counts(
+        IndexInstanceNode.objects.filter(
+            documents=kwargs['instance']
+        ).values_list('pk', flat=True)
+    )
 
 
 def document_metadata_index_update(sender, **kwargs):
-    task_index_document.apply_async(
-        kwargs=dict(document_id=kwargs['instance'].document.pk)
-    )
+    queue_document_index_update(document_pk=kwargs['instance'].document.pk)
 
 
 def document_metadata_index_post_delete(sender, **kwargs):
-    task_index_document.apply_async(
-        kwargs=dict(document_id=kwargs['instance'].document.pk)
-    )
+    queue_document_index_update(document_pk=kwargs['instance'].document.pk)
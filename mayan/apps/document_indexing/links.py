@@ -49,6 +49,11 @@ link_index_setup_delete = Link(
     text=_('Delete'), view='indexing:index_setup_delete',
     args='resolved_object.pk'
 )
+link_index_setup_rebuild = Link(
+    permissions=(permission_document_indexing_rebuild_indexes,),
+    text=_('Rebuild'), view='indexing:index_setup_rebuild',
+    args='resolved_object.pk'
+)
 link_index_setup_view = Link(
     permissions=(permission_document_indexing_setup,), text=_('Tree template'),
     view='indexing:index_setup_view', args='resolved_object.pk'
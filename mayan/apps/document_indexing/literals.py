@@ -1 +1,24 @@
+EMPTY_NODES_SWEEP_BATCH_SIZE = 1000
+EMPTY_NODES_SWEEP_INTERVAL = 60 * 10  # 10 minutes
+EMPTY_NODES_SWEEP_LOCK_TIMEOUT = 60 * 60  # 1 hour
+ITEM_COUNT_BATCH_SIZE = 1000
+ITEM_COUNT_CACHE_KEY_PREFIX = 'document_indexing_item_count_'
+ITEM_COUNT_CACHE_TIMEOUT = 60 * 60  # 1 hour
+ITEM_COUNT_GENERATION_KEY = 'document_indexing_item_count_generation'
+INDEX_UPDATE_BATCH_SIZE = 100
+INDEX_UPDATE_DEBOUNCE = 5  # 5 seconds
+INDEX_UPDATE_LOCK_NAME = 'document_indexing_task_update_index_documents'
+INDEX_UPDATE_LOCK_TIMEOUT = 60 * 10  # 10 minutes
+INDEX_UPDATE_SCHEDULED_LOCK_NAME = 'document_indexing_index_update_scheduled'
+INDEX_UPDATE_SWEEP_INTERVAL = 60  # 1 minute
+REBUILD_CHUNK_LOCK_NAME = 'document_indexing_chunk_%d_%d_%d'
+REBUILD_CHUNK_LOCK_PREFIX = 'document_indexing_chunk_'
+REBUILD_CHUNK_LOCK_TIMEOUT = 60 * 60  # 1 hour
+REBUILD_CHUNK_SIZE = 1000
+REBUILD_LOCK_NAME = 'document_indexing_task_do_rebuild_all_indexes'
+REBUILD_LOCK_TIMEOUT = 60 * 60 * 24  # 24 hours
 RETRY_DELAY = 5  # TODO: convert this into a config option
+# Give up waiting for the rebuild chunks before the rebuild lock expires
+REBUILD_FINISH_MAX_RETRIES = (
+    REBUILD_LOCK_TIMEOUT - REBUILD_CHUNK_LOCK_TIMEOUT
+) // RETRY_DELAY
@@ -0,0 +1,60 @@
+from __future__ import unicode_literals
+
+import json
+from optparse import make_option
+
+from django.core import management
+from django.core.management.base import CommandError
+
+from ...models import Index
+from ...profilers import IndexProfiler
+
+
+class Command(management.BaseCommand):
+    help = (
+        'Evaluate the templates of an index over its documents without '
+        'updating it and output the evaluation time, errors, distinct '
+        'values and resulting index instances and links of each template '
+        'node as JSON.'
+    )
+    args = '[index slug]'
+
+    option_list = management.BaseCommand.option_list + (
+        make_option(
+            '--sample', action='store', dest='sample', type='int',
+            help='Number of random documents to evaluate instead of all '
+            'the documents of the index.'
+        ),
+        make_option(
+            '--seed', action='store', dest='seed', type='int', default=0,
+            help='Seed of the random document sample.'
+        ),
+        make_option(
+            '--output', action='store', dest='output',
+            help='File to write the results to instead of the standard '
+            'output.'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        if len(args) != 1:
+            raise CommandError('Incorrect number of arguments')
+
+        try:
+            index = Index.objects.get(slug=args[0])
+        except Index.DoesNotExist:
+            raise CommandError(
+                'Unknown index slug: {}.'.format(args[0])
+            )
+
+        results = IndexProfiler(
+            index=index, sample=options['sample'], seed=options['seed']
+        ).run()
+
+        output = json.dumps(results, indent=2, sort_keys=True)
+
+        if options['output']:
+            with open(options['output'], 'w') as file_object:
+                file_object.write(output)
+        else:
+            self.stdout.write(output)
@@ -2,12 +2,15 @@ from __future__ import unicode_literals
 
 import logging
 
-from django.db import models, transaction
-from django.template import Context, Template
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Max, Min
 from django.utils.translation import ugettext_lazy as _
 
+from common.classes import CompiledTemplate
 from documents.models import Document
 
+from .literals import EMPTY_NODES_SWEEP_BATCH_SIZE, ITEM_COUNT_BATCH_SIZE
+
 logger = logging.getLogger(__name__)
 
 
@@ -16,36 +19,75 @@ class IndexManager(models.Manager):
         return self.get(name=name)
 
 
-class IndexInstanceNodeManager(models.Manager):
-    @staticmethod
-    def delete_empty_index_nodes_recursive(instance_node):
+class IndexUpdateQueueEntryManager(models.Manager):
+    def add_documents(self, document_pks):
         """
-        Calls itself recursively deleting empty index instance nodes up to
-        root
+        Mark the documents as needing an index update and return the
+        primary keys of those that were not already marked.
         """
+        document_pks = set(document_pks)
+
+        new_pks = document_pks - set(
+            self.filter(document_pk__in=document_pks).values_list(
+                'document_pk', flat=True
+            )
+        )
 
-        if instance_node.get_children().count() == 0:
-            # if there are no children, delete node and check parent for the
-            # same conditions
-            parent = instance_node.parent
-            if parent:
-                instance_node.delete()
-                IndexInstanceNodeManager.delete_empty_index_nodes_recursive(
-                    parent
+        try:
+            with transaction.atomic():
+                self.bulk_create(
+                    [self.model(document_pk=pk) for pk in new_pks]
                 )
+        except IntegrityError:
+            # Another process marked some of these documents concurrently,
+            # fallback to adding the entries one by one.
+            result = set()
+            for pk in new_pks:
+                try:
+                    with transaction.atomic():
+                        self.create(document_pk=pk)
+                except IntegrityError:
+                    logger.debug('Document %d already queued', pk)
+                else:
+                    result.add(pk)
+
+            return result
+        else:
+            return new_pks
+
+    def get_entries(self, limit):
+        """
+        Return a dictionary of the entry primary keys of up to limit of the
+        oldest entries by the primary keys of their documents. The entries
+        are kept until their documents are indexed.
+        """
+        return dict(
+            (document_pk, pk) for pk, document_pk in self.values_list(
+                'pk', 'document_pk'
+            )[:limit]
+        )
+
 
-    def cascade_eval(self, document, template_node, parent_index_instance=None):
+class IndexInstanceNodeManager(models.Manager):
+    def cascade_eval(self, document, template_node, parent_index_instance=None, link_nodes=None, created_nodes=None):
         """
         Evaluate an enabled index expression and update or create all the
         related index instances also recursively calling itself to evaluate
-        all the index's children
+        all the index's children.
+        The index instances the document should be linked to are added to
+        the link_nodes set. When link_nodes is not provided the document is
+        linked directly.
+        When created_nodes is provided the index instances are created
+        without updating the tree fields of the rest of the tree and are
+        added to it, insert_tree_nodes or a rebuild must be called
+        afterwards to place them in the tree.
         """
 
         if template_node.enabled:
             try:
-                template = Template(template_node.expression)
-                context = Context({'document': document})
-                result = template.render(context=context)
+                result = CompiledTemplate.get(
+                    template_node.expression
+                ).render(context={'document': document})
             except Exception as exception:
                 error_message = _(
                     'Error indexing document: %(document)s; expression: '
@@ -58,40 +100,187 @@ class IndexInstanceNodeManager(models.Manager):
                 logger.debug(error_message)
             else:
                 if result:
-                    index_instance, created = self.get_or_create(
-                        index_template_node=template_node, value=result,
-                        parent=parent_index_instance
+                    index_instance = self.get_or_create_node(
+                        template_node=template_node, value=result,
+                        parent=parent_index_instance,
+                        created_nodes=created_nodes
                     )
 
                     if template_node.link_documents:
-                        index_instance.documents.add(document)
+                        if link_nodes is None:
+                            index_instance.documents.add(document)
+                        else:
+                            link_nodes.add(index_instance)
 
                     for child in template_node.get_children():
                         self.cascade_eval(
                             document=document,
                             template_node=child,
-                            parent_index_instance=index_instance
+                            parent_index_instance=index_instance,
+                            link_nodes=link_nodes,
+                            created_nodes=created_nodes
                         )
 
+    def close_tree_gaps(self, tree_id, lefts):
+        """
+        Close the gaps left in a tree by deleted leaf index instances, given
+        their left values. The tree fields between two consecutive gaps are
+        shifted at once, instead of shifting the rest of the tree once per
+        gap.
+        """
+        opts = self.model._mptt_meta
+        lefts = sorted(lefts)
+
+        # Ascending, the shifted values end before the ranges not yet shifted
+        for count, left in enumerate(lefts, 1):
+            for attribute in (opts.left_attr, opts.right_attr):
+                queryset = self.filter(
+                    **{
+                        opts.tree_id_attr: tree_id,
+                        '{}__gt'.format(attribute): left
+                    }
+                )
+
+                if count < len(lefts):
+                    queryset = queryset.filter(
+                        **{'{}__lt'.format(attribute): lefts[count]}
+                    )
+
+                queryset.update(**{attribute: F(attribute) - 2 * count})
+
     def delete_empty_index_nodes(self):
         """
-        Delete empty index instance nodes
+        Delete the index instances without documents and without children,
+        including the ones left that way by these deletions. The levels of
+        the trees are swept from the deepest up, the empty index instances
+        of a level are found with a single query and are deleted in batches
+        of EMPTY_NODES_SWEEP_BATCH_SIZE, closing the gaps they leave in the
+        trees once per batch.
         """
+        opts = self.model._mptt_meta
+
+        deepest_level = self.aggregate(
+            level=Max(opts.level_attr)
+        )['level'] or 0
+
+        for level in range(deepest_level, 0, -1):
+            queryset = self.filter(
+                parent__isnull=False, documents__isnull=True,
+                **{opts.level_attr: level}
+            ).exclude(
+                pk__in=self.filter(parent__isnull=False).values('parent')
+            ).order_by()
+
+            while True:
+                with transaction.atomic():
+                    entries = list(
+                        queryset.values_list(
+                            'pk', opts.tree_id_attr, opts.left_attr
+                        )[:EMPTY_NODES_SWEEP_BATCH_SIZE]
+                    )
+
+                    if not entries:
+                        break
+
+                    self.filter(pk__in=[pk for pk, tree_id, left in entries]).delete()
+
+                    lefts = {}
+                    for pk, tree_id, left in entries:
+                        lefts.setdefault(tree_id, []).append(left)
+
+                    for tree_id, tree_lefts in lefts.items():
+                        self.close_tree_gaps(tree_id=tree_id, lefts=tree_lefts)
+
+    def delete_empty_nodes(self, instance_nodes):
+        """
+        Delete the given index instance nodes that have no documents and no
+        children and then their parents that become empty, up to the root.
+        The empty nodes are found first and only the topmost ones are
+        deleted, each deletion removes the whole branch and closes its gap
+        in the tree once.
+        """
+        through_model = self.model.documents.through
+        pending = set(instance_node.pk for instance_node in instance_nodes)
+        empty = {}
+
+        while pending:
+            pk = pending.pop()
 
-        for instance_node in self.filter(documents__isnull=True, parent__isnull=False):
-            IndexInstanceNodeManager.delete_empty_index_nodes_recursive(
-                instance_node
+            try:
+                parent_pk = self.filter(pk=pk).values_list(
+                    'parent', flat=True
+                ).get()
+            except self.model.DoesNotExist:
+                continue
+
+            if parent_pk is None or pk in empty:
+                continue
+
+            children_pks = set(
+                self.filter(parent=pk).values_list('pk', flat=True)
             )
 
+            if children_pks.issubset(empty) and not through_model.objects.filter(indexinstancenode=pk).exists():
+                empty[pk] = parent_pk
+                # The parent can be empty now, check it again
+                pending.add(parent_pk)
+
+        for pk, parent_pk in empty.items():
+            if parent_pk not in empty:
+                # Fresh instance, the tree fields change with each deletion
+                self.get(pk=pk).delete()
+
+    @staticmethod
+    def get_deferred_tree_fields():
+        """
+        Return the tree field values of the index instances created outside
+        of the tree, they are replaced by insert_tree_nodes or a rebuild.
+        """
+        return {'lft': 1, 'rght': 2, 'level': 0, 'tree_id': 0}
+
+    def get_or_create_node(self, template_node, value, parent, created_nodes=None):
+        """
+        Return the index instance of a template node with a value under a
+        parent, creating it when missing. The workers of a rebuild create
+        the index instances concurrently and can create duplicates, which
+        are merged only when the rebuild finishes, the oldest one is used
+        meanwhile.
+        When created_nodes is provided the index instance is created with
+        deferred tree fields and added to it.
+        """
+        index_instance = self.filter(
+            index_template_node=template_node, value=value, parent=parent
+        ).order_by('pk').first()
+
+        if index_instance is None:
+            if created_nodes is None:
+                index_instance = self.create(
+                    index_template_node=template_node, value=value,
+                    parent=parent
+                )
+            else:
+                index_instance = self.create(
+                    index_template_node=template_node, value=value,
+                    parent=parent, **self.get_deferred_tree_fields()
+                )
+                created_nodes.add(index_instance)
+
+        return index_instance
+
     def index_document(self, document):
         """
-        Update or create all the index instances related to a document
+        Update or create all the index instances related to a document.
+        The index instances the document should be in are compared with the
+        ones it is in, only the links that changed are added or removed and
+        only the index instances the document left, or that were created
+        and ended up empty, are checked for deletion.
         """
 
         from .models import Index
 
         with transaction.atomic():
-            self.remove_document(document)
+            link_nodes = set()
+            created_nodes = set()
 
             # Only update indexes where the document type is found
             for index in Index.objects.filter(enabled=True, document_types=document.document_type):
@@ -99,17 +288,259 @@ class IndexInstanceNodeManager(models.Manager):
                     index_template_node=index.template_root, parent=None
                 )
                 for template_node in index.template_root.get_children():
-                    self.cascade_eval(document, template_node, root_instance)
+                    self.cascade_eval(
+                        document=document, template_node=template_node,
+                        parent_index_instance=root_instance,
+                        link_nodes=link_nodes, created_nodes=created_nodes
+                    )
+
+            self.insert_tree_nodes(instance_nodes=created_nodes)
 
-    def remove_document(self, document):
-        for index_node in self.filter(documents=document):
-            index_node.documents.remove(document)
+            current_nodes = set(self.filter(documents=document))
 
-        self.delete_empty_index_nodes()
+            added_nodes = link_nodes - current_nodes
+            removed_nodes = current_nodes - link_nodes
 
-    def rebuild_all_indexes(self):
-        for instance_node in self.all():
-            instance_node.delete()
+            if added_nodes:
+                document.node_instances.add(*added_nodes)
+
+            if removed_nodes:
+                document.node_instances.remove(*removed_nodes)
+
+            self.delete_empty_nodes(removed_nodes | created_nodes)
+            self.update_document_counts(
+                instance_node.pk for instance_node in (
+                    added_nodes | removed_nodes
+                )
+            )
 
-        for document in Document.objects.all():
-            self.index_document(document)
+    def get_rebuild_documents(self, index):
+        """
+        Return the documents of the document types of an index
+        """
+        return Document.objects.filter(
+            document_type__in=index.document_types.all()
+        )
+
+    def insert_tree_nodes(self, instance_nodes):
+        """
+        Place in the tree the index instances created with deferred tree
+        fields. The new branches under the same existing parent are added
+        as its last children making space in the tree once, instead of once
+        per index instance.
+        """
+        opts = self.model._mptt_meta
+        tree_manager = self.model._tree_manager
+
+        new_pks = set(instance_node.pk for instance_node in instance_nodes)
+        children = {}
+        for instance_node in sorted(instance_nodes, key=lambda node: node.pk):
+            children.setdefault(instance_node.parent_id, []).append(
+                instance_node.pk
+            )
+
+        def set_tree_fields(pk, left, level, tree_id):
+            right = left + 1
+            for child_pk in children.get(pk, ()):
+                right = set_tree_fields(
+                    pk=child_pk, left=right, level=level + 1, tree_id=tree_id
+                ) + 1
+
+            self.filter(pk=pk).update(
+                **{
+                    opts.left_attr: left, opts.right_attr: right,
+                    opts.level_attr: level, opts.tree_id_attr: tree_id
+                }
+            )
+            return right
+
+        def get_branch_size(pk):
+            return 1 + sum(
+                get_branch_size(child_pk) for child_pk in children.get(pk, ())
+            )
+
+        for parent_pk, pks in children.items():
+            if parent_pk in new_pks:
+                continue
+
+            # Fresh tree fields, making space changes them
+            parent = self.get(pk=parent_pk)
+            parent_right = getattr(parent, opts.right_attr)
+            tree_id = getattr(parent, opts.tree_id_attr)
+
+            tree_manager._create_space(
+                2 * sum(get_branch_size(pk) for pk in pks), parent_right - 1,
+                tree_id
+            )
+
+            left = parent_right
+            for pk in pks:
+                left = set_tree_fields(
+                    pk=pk, left=left,
+                    level=getattr(parent, opts.level_attr) + 1,
+                    tree_id=tree_id
+                ) + 1
+
+    def merge_duplicate_nodes(self, index):
+        """
+        Merge the index instances with the same parent and value created by
+        concurrent rebuild workers, moving their documents and children to
+        the oldest one.
+        """
+        through_model = self.model.documents.through
+
+        # Parents first, so that the children of merged nodes end up with
+        # the same parent and are merged too
+        for template_node in index.node_templates.order_by('level'):
+            duplicates = self.filter(
+                index_template_node=template_node
+            ).order_by().values('parent', 'value').annotate(
+                count=Count('pk'), keeper=Min('pk')
+            ).filter(count__gt=1)
+
+            for duplicate in duplicates:
+                node_pks = list(
+                    self.filter(
+                        index_template_node=template_node,
+                        parent=duplicate['parent'], value=duplicate['value']
+                    ).exclude(pk=duplicate['keeper']).values_list(
+                        'pk', flat=True
+                    )
+                )
+
+                self.filter(parent__in=node_pks).update(
+                    parent=duplicate['keeper']
+                )
+
+                document_pks = set(
+                    through_model.objects.filter(
+                        indexinstancenode__in=node_pks
+                    ).values_list('document', flat=True)
+                ) - set(
+                    through_model.objects.filter(
+                        indexinstancenode=duplicate['keeper']
+                    ).values_list('document', flat=True)
+                )
+                through_model.objects.bulk_create(
+                    through_model(
+                        indexinstancenode_id=duplicate['keeper'],
+                        document_id=document_pk
+                    ) for document_pk in document_pks
+                )
+                through_model.objects.filter(
+                    indexinstancenode__in=node_pks
+                ).delete()
+
+                self.filter(pk__in=node_pks).delete()
+
+    def rebuild_index_documents(self, index, documents):
+        """
+        Add a group of documents to an index being rebuilt. The tree fields
+        are not maintained, rebuild_index_finish must be called after all
+        the documents are added.
+        """
+        through_model = self.model.documents.through
+        root_instance = self.get(
+            index_template_node=index.template_root, parent=None
+        )
+        template_nodes = list(index.template_root.get_children())
+
+        with transaction.atomic():
+            links = []
+            # The index instances are created outside of the tree and
+            # placed by the rebuild of the whole index
+            created_nodes = set()
+
+            for document in documents.iterator():
+                link_nodes = set()
+                for template_node in template_nodes:
+                    self.cascade_eval(
+                        document=document, template_node=template_node,
+                        parent_index_instance=root_instance,
+                        link_nodes=link_nodes, created_nodes=created_nodes
+                    )
+
+                links.extend(
+                    through_model(
+                        indexinstancenode_id=instance_node.pk,
+                        document_id=document.pk
+                    ) for instance_node in link_nodes
+                )
+
+            through_model.objects.bulk_create(links)
+
+    def rebuild_index_finish(self, index):
+        """
+        Merge the duplicated index instances and rebuild the tree fields of
+        the index once.
+        """
+        with transaction.atomic():
+            self.merge_duplicate_nodes(index=index)
+
+            root_instance = self.get(
+                index_template_node=index.template_root, parent=None
+            )
+            self.filter(index_template_node__index=index).update(
+                tree_id=root_instance.tree_id
+            )
+            self.model._tree_manager.partial_rebuild(
+                tree_id=root_instance.tree_id
+            )
+            self.update_document_counts(
+                self.filter(
+                    index_template_node__index=index,
+                    index_template_node__link_documents=True
+                ).values_list('pk', flat=True)
+            )
+
+    def reset_index(self, index):
+        """
+        Delete all the index instances of an index in bulk and create the
+        root instance of the enabled indexes.
+        """
+        with transaction.atomic():
+            self.model.documents.through.objects.filter(
+                indexinstancenode__index_template_node__index=index
+            ).delete()
+
+            # Detach the nodes from each other so that they are deleted
+            # without cascading or updating the tree fields
+            queryset = self.filter(index_template_node__index=index)
+            queryset.update(parent=None)
+            queryset.delete()
+
+            if index.enabled:
+                self.create(
+                    index_template_node=index.template_root, parent=None
+                )
+
+    def update_document_counts(self, instance_node_pks):
+        """
+        Store the number of documents not in the trash of each index
+        instance and increase its document revision, which identifies the
+        cached counts of the users with restricted access.
+        """
+        through_model = self.model.documents.through
+        instance_node_pks = list(instance_node_pks)
+
+        for start in range(0, len(instance_node_pks), ITEM_COUNT_BATCH_SIZE):
+            batch = instance_node_pks[start:start + ITEM_COUNT_BATCH_SIZE]
+
+            counts = dict(
+                (entry['indexinstancenode'], entry['count'])
+                for entry in through_model.objects.filter(
+                    document__in_trash=False, indexinstancenode__in=batch
+                ).values('indexinstancenode').annotate(count=Count('pk'))
+            )
+
+            instance_nodes_by_count = {}
+            for pk in batch:
+                instance_nodes_by_count.setdefault(
+                    counts.get(pk, 0), []
+                ).append(pk)
+
+            for count, pks in instance_nodes_by_count.items():
+                self.filter(pk__in=pks).update(
+                    document_count=count,
+                    document_revision=F('document_revision') + 1
+                )
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('document_indexing', '0010_documentindexinstancenode_indexinstance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndexUpdateQueueEntry',
+            fields=[
+                (
+                    'id', models.AutoField(
+                        verbose_name='ID', serialize=False, auto_created=True,
+                        primary_key=True
+                    )
+                ),
+                (
+                    'datetime_queued', models.DateTimeField(
+                        auto_now_add=True, verbose_name='Date time queued',
+                        db_index=True
+                    )
+                ),
+                (
+                    'document_pk', models.PositiveIntegerField(
+                        unique=True, verbose_name='Document ID'
+                    )
+                ),
+            ],
+            options={
+                'ordering': ('datetime_queued',),
+                'verbose_name': 'Index update queue entry',
+                'verbose_name_plural': 'Index update queue entries',
+            },
+            bases=(models.Model,),
+        ),
+    ]
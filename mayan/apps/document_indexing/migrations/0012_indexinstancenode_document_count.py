@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+def update_document_counts(apps, schema_editor):
+    IndexInstanceNode = apps.get_model('document_indexing', 'IndexInstanceNode')
+
+    for entry in IndexInstanceNode.documents.through.objects.filter(
+        document__in_trash=False
+    ).values('indexinstancenode').annotate(count=models.Count('pk')):
+        IndexInstanceNode.objects.filter(
+            pk=entry['indexinstancenode']
+        ).update(document_count=entry['count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('document_indexing', '0011_indexupdatequeueentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='indexinstancenode',
+            name='document_count',
+            field=models.PositiveIntegerField(
+                default=0, verbose_name='Document count'
+            ),
+            preserve_default=True,
+        ),
+        migrations.AddField(
+            model_name='indexinstancenode',
+            name='document_revision',
+            field=models.PositiveIntegerField(
+                default=0, verbose_name='Document revision'
+            ),
+            preserve_default=True,
+        ),
+        migrations.RunPython(update_document_counts),
+    ]
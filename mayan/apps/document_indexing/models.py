@@ -1,5 +1,8 @@
 from __future__ import absolute_import, unicode_literals
 
+import hashlib
+
+from django.core.cache import caches
 from django.core.exceptions import PermissionDenied
 from django.core.urlresolvers import reverse
 from django.db import models
@@ -10,11 +13,19 @@ from mptt.fields import TreeForeignKey
 from mptt.models import MPTTModel
 
 from acls.models import AccessControlList
+from common.models import CacheGeneration
 from documents.models import Document, DocumentType
 from documents.permissions import permission_document_view
 from permissions import Permission
+from permissions.models import Role
 
-from .managers import IndexManager, IndexInstanceNodeManager
+from .literals import (
+    ITEM_COUNT_CACHE_KEY_PREFIX, ITEM_COUNT_CACHE_TIMEOUT,
+    ITEM_COUNT_GENERATION_KEY
+)
+from .managers import (
+    IndexManager, IndexInstanceNodeManager, IndexUpdateQueueEntryManager
+)
 
 
 @python_2_unicode_compatible
@@ -156,6 +167,12 @@ class IndexInstanceNode(MPTTModel):
     documents = models.ManyToManyField(
         Document, related_name='node_instances', verbose_name=_('Documents')
     )
+    document_count = models.PositiveIntegerField(
+        default=0, verbose_name=_('Document count')
+    )
+    document_revision = models.PositiveIntegerField(
+        default=0, verbose_name=_('Document revision')
+    )
 
     objects = IndexInstanceNodeManager()
 
@@ -173,18 +190,69 @@ class IndexInstanceNode(MPTTModel):
     def index(self):
         return self.index_template_node.index
 
+    @staticmethod
+    def get_item_count_generation():
+        return CacheGeneration.objects.get_value(
+            name=ITEM_COUNT_GENERATION_KEY
+        )
+
+    @staticmethod
+    def invalidate_item_counts(**kwargs):
+        """
+        Invalidate the cached document counts of the users with restricted
+        access, in all the processes. Accepts the arguments of a signal to
+        be used as a signal receiver.
+        """
+        CacheGeneration.objects.increment(name=ITEM_COUNT_GENERATION_KEY)
+
+    def get_accessible_document_count(self, user):
+        """
+        Return the number of documents a user with restricted access can
+        view. Counts are cached per set of roles, the key includes the
+        document revision of the node that changes when its documents
+        change and a generation that changes when the access controls
+        change.
+        """
+        try:
+            # Memoized for the other nodes rendered in the same request
+            roles, generation = user._index_item_count_access
+        except AttributeError:
+            # Hashed to keep the cache key short for users of many roles
+            roles = hashlib.sha256(
+                ','.join(
+                    sorted(
+                        unicode(pk) for pk in Role.objects.filter(
+                            groups__in=user.groups.all()
+                        ).distinct().values_list('pk', flat=True)
+                    )
+                )
+            ).hexdigest()
+            generation = self.get_item_count_generation()
+            user._index_item_count_access = (roles, generation)
+
+        cache = caches['default']
+        cache_key = '{}{}_{}_{}_{}'.format(
+            ITEM_COUNT_CACHE_KEY_PREFIX, self.pk, self.document_revision,
+            generation, roles
+        )
+
+        count = cache.get(cache_key)
+        if count is None:
+            count = AccessControlList.objects.filter_by_access(
+                permission_document_view, user, self.documents
+            ).count()
+            cache.set(cache_key, count, ITEM_COUNT_CACHE_TIMEOUT)
+
+        return count
+
     def get_item_count(self, user):
         if self.index_template_node.link_documents:
-            queryset = self.documents
-
             try:
                 Permission.check_permissions(user, (permission_document_view,))
             except PermissionDenied:
-                queryset = AccessControlList.objects.filter_by_access(
-                    permission_document_view, user, queryset
-                )
-
-            return queryset.count()
+                return self.get_accessible_document_count(user=user)
+            else:
+                return self.document_count
         else:
             return self.get_children().count()
 
@@ -205,3 +273,28 @@ class DocumentIndexInstanceNode(IndexInstanceNode):
         proxy = True
         verbose_name = _('Document index node instance')
         verbose_name_plural = _('Document indexes node instances')
+
+
+@python_2_unicode_compatible
+class IndexUpdateQueueEntry(models.Model):
+    """
+    Document waiting to have its index instances updated. The document is
+    referenced by its primary key only, entries are added while documents
+    are being deleted.
+    """
+    document_pk = models.PositiveIntegerField(
+        unique=True, verbose_name=_('Document ID')
+    )
+    datetime_queued = models.DateTimeField(
+        auto_now_add=True, db_index=True, verbose_name=_('Date time queued')
+    )
+
+    objects = IndexUpdateQueueEntryManager()
+
+    def __str__(self):
+        return unicode(self.document_pk)
+
+    class Meta:
+        ordering = ('datetime_queued',)
+        verbose_name = _('Index update queue entry')
+        verbose_name_plural = _('Index update queue entries')
@@ -0,0 +1,214 @@
+from __future__ import division, unicode_literals
+
+from collections import Counter
+import datetime
+import logging
+import random
+import time
+
+import mayan
+
+from common.classes import CompiledTemplate
+
+from .models import IndexInstanceNode
+
+logger = logging.getLogger(__name__)
+
+
+class TemplateNodeProfile(object):
+    """
+    Evaluation statistics of an index template node
+    """
+    def __init__(self, template_node):
+        self.template_node = template_node
+        self.error_count = 0
+        self.error_example = None
+        self.empty_count = 0
+        self.evaluation_count = 0
+        self.evaluation_time = 0
+        self.link_count = 0
+        self.nodes = Counter()
+        self.values = set()
+
+    def get_projected_node_count(self, scale):
+        """
+        Estimate the number of index instances for all the documents from
+        those of a sample, with the bias corrected Chao1 estimator: the
+        index instances found in a single document of the sample indicate
+        how many were not found. The estimate is limited to one new index
+        instance per document not evaluated.
+        """
+        observed = len(self.nodes)
+
+        if scale <= 1:
+            return observed
+
+        frequencies = Counter(self.nodes.values())
+        singletons = frequencies[1]
+        doubletons = frequencies[2]
+
+        estimate = observed + singletons * (singletons - 1) / (
+            2 * (doubletons + 1)
+        )
+        limit = observed + sum(self.nodes.values()) * (scale - 1)
+
+        return int(round(min(estimate, limit)))
+
+    def get_results(self, scale):
+        return {
+            'cardinality': len(self.values),
+            'empty': self.empty_count,
+            'enabled': self.template_node.enabled,
+            'error_example': self.error_example,
+            'errors': self.error_count,
+            'evaluation_time_ms': {
+                'mean': self.evaluation_count and (
+                    self.evaluation_time * 1000 / self.evaluation_count
+                ),
+                'total': self.evaluation_time * 1000,
+            },
+            'evaluations': self.evaluation_count,
+            'existing_nodes': IndexInstanceNode.objects.filter(
+                index_template_node=self.template_node
+            ).count(),
+            'expression': self.template_node.expression,
+            'level': self.template_node.level,
+            'link_documents': self.template_node.link_documents,
+            'links': self.link_count,
+            'nodes': len(self.nodes),
+            'projected_links': int(round(self.link_count * scale)),
+            'projected_nodes': self.get_projected_node_count(scale=scale),
+            'template_node': self.template_node.pk,
+        }
+
+
+class IndexProfiler(object):
+    """
+    Evaluate the template nodes of an index over all its documents or over
+    a random sample of them, the same way they are evaluated when indexing
+    but without creating index instances or links. Collect the evaluation
+    time, the errors, the number of distinct values and the number of
+    index instances and links each template node produces.
+    The links and index instances of a sample are also projected to all
+    the documents. The links grow with the number of documents, the index
+    instances are estimated from how often their values repeat in the
+    sample.
+    """
+    def __init__(self, index, sample=None, seed=0):
+        self.index = index
+        self.sample = sample
+        self.random = random.Random(seed)
+
+    def evaluate(self, document, template_node, parent_key):
+        # Follows IndexInstanceNodeManager.cascade_eval, index instances
+        # are identified by the values of the path from the root
+        if not template_node.enabled:
+            return
+
+        profile = self.profiles[template_node.pk]
+        profile.evaluation_count += 1
+
+        start_time = time.time()
+        try:
+            result = CompiledTemplate.get(template_node.expression).render(
+                context={'document': document}
+            )
+        except Exception as exception:
+            profile.evaluation_time += time.time() - start_time
+            profile.error_count += 1
+            if profile.error_example is None:
+                profile.error_example = '{}: {}'.format(document, exception)
+            return
+
+        profile.evaluation_time += time.time() - start_time
+
+        if not result:
+            profile.empty_count += 1
+            return
+
+        key = parent_key + (result,)
+        profile.nodes[key] += 1
+        profile.values.add(result)
+
+        if template_node.link_documents:
+            profile.link_count += 1
+
+        for child in self.children.get(template_node.pk, ()):
+            self.evaluate(
+                document=document, template_node=child, parent_key=key
+            )
+
+    def get_documents(self):
+        """
+        Return the documents to evaluate and the total number of documents
+        of the index
+        """
+        queryset = IndexInstanceNode.objects.get_rebuild_documents(
+            index=self.index
+        )
+        total_count = queryset.count()
+
+        if self.sample is None or self.sample >= total_count:
+            return queryset, total_count, total_count
+
+        document_pks = self.random.sample(
+            list(queryset.values_list('pk', flat=True)), self.sample
+        )
+
+        return queryset.filter(pk__in=document_pks), self.sample, total_count
+
+    def run(self):
+        template_root = self.index.template_root
+        template_nodes = list(template_root.get_descendants())
+
+        self.children = {}
+        for template_node in template_nodes:
+            self.children.setdefault(template_node.parent_id, []).append(
+                template_node
+            )
+
+        self.profiles = dict(
+            (template_node.pk, TemplateNodeProfile(template_node=template_node))
+            for template_node in template_nodes
+        )
+
+        documents, document_count, total_count = self.get_documents()
+
+        start_time = time.time()
+        for document in documents.iterator():
+            for template_node in self.children.get(template_root.pk, ()):
+                self.evaluate(
+                    document=document, template_node=template_node,
+                    parent_key=()
+                )
+        elapsed_time = time.time() - start_time
+
+        logger.debug(
+            'index: %s, documents: %d, elapsed: %.2f s', self.index,
+            document_count, elapsed_time
+        )
+
+        scale = document_count and total_count / document_count
+        results = [
+            self.profiles[template_node.pk].get_results(scale=scale)
+            for template_node in template_nodes
+        ]
+
+        return {
+            'datetime': datetime.datetime.utcnow().isoformat(),
+            'documents': document_count,
+            'elapsed_time': elapsed_time,
+            'enabled': self.index.enabled,
+            'index': self.index.slug,
+            'links': sum(result['links'] for result in results),
+            'nodes': sum(result['nodes'] for result in results),
+            'projected_links': sum(
+                result['projected_links'] for result in results
+            ),
+            'projected_nodes': sum(
+                result['projected_nodes'] for result in results
+            ),
+            'template_nodes': results,
+            'total_documents': total_count,
+            'version': mayan.__version__,
+        }
@@ -2,91 +2,270 @@ from __future__ import unicode_literals
 
 import logging
 
-from django.db import OperationalError
+from django.db import OperationalError, transaction
+from django.utils.timezone import now
 
 from mayan.celery import app
 from documents.models import Document
 from lock_manager import Lock, LockError
 
-from .literals import RETRY_DELAY
-from .models import IndexInstanceNode
+from .literals import (
+    EMPTY_NODES_SWEEP_LOCK_TIMEOUT, INDEX_UPDATE_BATCH_SIZE, INDEX_UPDATE_LOCK_NAME,
+    INDEX_UPDATE_LOCK_TIMEOUT, INDEX_UPDATE_SCHEDULED_LOCK_NAME,
+    REBUILD_CHUNK_LOCK_NAME, REBUILD_CHUNK_LOCK_PREFIX,
+    REBUILD_CHUNK_LOCK_TIMEOUT, REBUILD_CHUNK_SIZE,
+    REBUILD_FINISH_MAX_RETRIES, REBUILD_LOCK_NAME, REBUILD_LOCK_TIMEOUT,
+    RETRY_DELAY
+)
+from .models import Index, IndexInstanceNode, IndexUpdateQueueEntry
 
 logger = logging.getLogger(__name__)
 
 
-@app.task(bind=True, default_retry_delay=RETRY_DELAY, max_retries=None, ignore_result=True)
-def task_delete_empty_index_nodes(self):
+@app.task(ignore_result=True)
+def task_delete_empty_index_nodes():
+    """
+    Periodically delete the index instances left without documents, like
+    the ones of deleted documents. The index update queue is not processed
+    meanwhile as both change the tree fields of the index instances.
+    """
     try:
-        rebuild_lock = Lock.acquire_lock(
-            'document_indexing_task_do_rebuild_all_indexes'
+        rebuild_lock = Lock.acquire_shared_lock(
+            REBUILD_LOCK_NAME, timeout=EMPTY_NODES_SWEEP_LOCK_TIMEOUT
         )
-    except LockError as exception:
-        # A rebuild is happening, retry later
-        raise self.retry(exc=exception)
-    else:
+    except LockError:
+        # A rebuild is happening, the next run will delete the index
+        # instances
+        return
+
+    try:
+        try:
+            lock = Lock.acquire_lock(
+                INDEX_UPDATE_LOCK_NAME, timeout=EMPTY_NODES_SWEEP_LOCK_TIMEOUT
+            )
+        except LockError:
+            # The index update queue is being processed, the next run will
+            # delete the index instances
+            return
+
         try:
             IndexInstanceNode.objects.delete_empty_index_nodes()
         finally:
-            rebuild_lock.release()
+            lock.release()
+    finally:
+        rebuild_lock.release()
 
 
-@app.task(bind=True, default_retry_delay=RETRY_DELAY, max_retries=None, ignore_result=True)
-def task_index_document(self, document_id):
+@app.task(ignore_result=True)
+def task_index_queued_documents():
+    """
+    Update the index instances of the documents in the index update queue
+    in batches of INDEX_UPDATE_BATCH_SIZE documents. Only one instance of
+    this task processes the queue at a time, the queue is also processed
+    periodically to pick up the documents left while a rebuild or another
+    instance of this task was running.
+    """
+    # Documents changed from now on are processed by a new task
+    Lock.filter(name=INDEX_UPDATE_SCHEDULED_LOCK_NAME).delete()
+
+    if not IndexUpdateQueueEntry.objects.exists():
+        return
+
     try:
-        rebuild_lock = Lock.acquire_lock(
-            'document_indexing_task_do_rebuild_all_indexes'
+        rebuild_lock = Lock.acquire_shared_lock(
+            REBUILD_LOCK_NAME, timeout=INDEX_UPDATE_LOCK_TIMEOUT
         )
-    except LockError as exception:
-        # A rebuild is happening, retry later
-        raise self.retry(exc=exception)
-    else:
+    except LockError:
+        # A rebuild is happening, the periodic task will process the queue
+        return
+
+    try:
         try:
             lock = Lock.acquire_lock(
-                'document_indexing_task_update_index_document_%d' % document_id
+                INDEX_UPDATE_LOCK_NAME, timeout=INDEX_UPDATE_LOCK_TIMEOUT
             )
-        except LockError as exception:
-            # This document is being reindexed by another task, retry later
-            raise self.retry(exc=exception)
-        else:
-            try:
-                document = Document.objects.get(pk=document_id)
-            except Document.DoesNotExist:
-                # Document was deleted before we could execute, abort about
-                # updating
-                pass
-            else:
+        except LockError:
+            # Another task is processing the queue
+            return
+
+        try:
+            entries = IndexUpdateQueueEntry.objects.get_entries(
+                limit=INDEX_UPDATE_BATCH_SIZE
+            )
+            batch_size = len(entries)
+
+            for document in Document.objects.filter(pk__in=entries.keys()):
+                entry_pk = entries.pop(document.pk)
+
                 try:
-                    IndexInstanceNode.objects.index_document(document)
-                except OperationalError as exception:
-                    logger.warning(
-                        'Operational error while trying to index document: '
-                        '%s; %s', document, exception
+                    # Remove the entry with the index changes, it stays
+                    # queued if the worker dies while indexing
+                    with transaction.atomic():
+                        IndexInstanceNode.objects.index_document(document)
+                        IndexUpdateQueueEntry.objects.filter(
+                            pk=entry_pk
+                        ).delete()
+                except Exception as exception:
+                    # Queue the document again at the end of the queue
+                    # without losing the rest of the batch
+                    if isinstance(exception, OperationalError):
+                        logger.warning(
+                            'Operational error while trying to index '
+                            'document: %s; %s', document, exception
+                        )
+                    else:
+                        logger.error(
+                            'Error indexing document: %s; %s', document,
+                            exception, exc_info=True
+                        )
+
+                    IndexUpdateQueueEntry.objects.filter(
+                        pk=entry_pk
+                    ).delete()
+                    IndexUpdateQueueEntry.objects.add_documents(
+                        document_pks=(document.pk,)
                     )
-                    lock.release()
-                    raise self.retry(exc=exception)
-                else:
-                    lock.release()
-            finally:
-                lock.release()
+
+            # Entries of the documents deleted meanwhile
+            IndexUpdateQueueEntry.objects.filter(
+                pk__in=entries.values()
+            ).delete()
         finally:
-            rebuild_lock.release()
+            lock.release()
+    finally:
+        rebuild_lock.release()
 
+    if batch_size == INDEX_UPDATE_BATCH_SIZE:
+        # There could be more documents queued
+        task_index_queued_documents.apply_async()
 
-@app.task(bind=True, default_retry_delay=RETRY_DELAY, ignore_result=True)
-def task_do_rebuild_all_indexes(self):
-    if Lock.check_existing(name__startswith='document_indexing_task_update_index_document'):
-        # A document index update is happening, wait
-        raise self.retry()
 
+@app.task(bind=True, default_retry_delay=RETRY_DELAY, max_retries=None, ignore_result=True)
+def task_do_rebuild_all_indexes(self, index_id=None):
+    """
+    Delete the index instances of all the indexes, or of a single index,
+    and queue the documents to be indexed in primary key ranges of
+    REBUILD_CHUNK_SIZE documents processed in parallel by the indexing
+    workers. The rebuild lock is held until task_rebuild_index_finish runs.
+    """
     try:
-        lock = Lock.acquire_lock(
-            'document_indexing_task_do_rebuild_all_indexes'
+        lock = Lock.acquire_exclusive_lock(
+            REBUILD_LOCK_NAME, timeout=REBUILD_LOCK_TIMEOUT
         )
     except LockError as exception:
-        # Another rebuild is happening, retry later
+        # Another rebuild or a document index update is happening, retry
+        # later
         raise self.retry(exc=exception)
     else:
         try:
-            IndexInstanceNode.objects.rebuild_all_indexes()
-        finally:
+            indexes = Index.objects.all()
+            if index_id:
+                indexes = indexes.filter(pk=index_id)
+
+            chunks = []
+            for index in indexes:
+                IndexInstanceNode.objects.reset_index(index=index)
+
+                if index.enabled:
+                    document_pks = list(
+                        IndexInstanceNode.objects.get_rebuild_documents(
+                            index=index
+                        ).order_by('pk').values_list('pk', flat=True)
+                    )
+
+                    for start in range(0, len(document_pks), REBUILD_CHUNK_SIZE):
+                        chunk_pks = document_pks[start:start + REBUILD_CHUNK_SIZE]
+                        chunks.append((index.pk, chunk_pks[0], chunk_pks[-1]))
+
+            # Create the locks of all the chunks before queuing any of them
+            # so that the finish task waits for the ones not started yet
+            for index_pk, start_pk, end_pk in chunks:
+                Lock.acquire_lock(
+                    REBUILD_CHUNK_LOCK_NAME % (index_pk, start_pk, end_pk),
+                    timeout=REBUILD_LOCK_TIMEOUT
+                )
+        except Exception:
+            Lock.filter(name__startswith=REBUILD_CHUNK_LOCK_PREFIX).delete()
             lock.release()
+            raise
+        else:
+            for index_pk, start_pk, end_pk in chunks:
+                task_rebuild_index_documents.apply_async(
+                    kwargs=dict(
+                        index_id=index_pk, start_pk=start_pk, end_pk=end_pk
+                    )
+                )
+
+            task_rebuild_index_finish.apply_async(
+                kwargs=dict(index_ids=[index.pk for index in indexes])
+            )
+
+
+@app.task(ignore_result=True)
+def task_rebuild_index_documents(index_id, start_pk, end_pk):
+    lock_name = REBUILD_CHUNK_LOCK_NAME % (index_id, start_pk, end_pk)
+
+    # Mark the chunk as started, its lock expires if the worker dies
+    if not Lock.filter(name=lock_name).update(creation_datetime=now(), timeout=REBUILD_CHUNK_LOCK_TIMEOUT):
+        # The rebuild gave up waiting for this chunk and queued its
+        # documents for an index update
+        return
+
+    try:
+        index = Index.objects.get(pk=index_id)
+        IndexInstanceNode.objects.rebuild_index_documents(
+            index=index,
+            documents=IndexInstanceNode.objects.get_rebuild_documents(
+                index=index
+            ).filter(pk__gte=start_pk, pk__lte=end_pk)
+        )
+    except Index.DoesNotExist:
+        # Index was deleted during the rebuild
+        pass
+    finally:
+        Lock.filter(name=lock_name).delete()
+
+
+@app.task(bind=True, default_retry_delay=RETRY_DELAY, max_retries=REBUILD_FINISH_MAX_RETRIES, ignore_result=True)
+def task_rebuild_index_finish(self, index_ids):
+    """
+    Wait for the rebuild chunks and rebuild the tree fields of the indexes.
+    The documents of the chunks that were lost, their lock expired while
+    running or they didn't run in time, are queued for an index update
+    after the rebuild.
+    """
+    if self.request.retries < REBUILD_FINISH_MAX_RETRIES:
+        if Lock.get_active_locks(name__startswith=REBUILD_CHUNK_LOCK_PREFIX):
+            # Documents are still being indexed, wait
+            raise self.retry()
+
+    lost_chunks = list(
+        Lock.filter(name__startswith=REBUILD_CHUNK_LOCK_PREFIX)
+    )
+
+    try:
+        for lock in lost_chunks:
+            index_pk, start_pk, end_pk = (
+                int(value) for value in lock.name[
+                    len(REBUILD_CHUNK_LOCK_PREFIX):
+                ].split('_')
+            )
+            logger.warning(
+                'Rebuild chunk lost, index: %d, documents: %d to %d',
+                index_pk, start_pk, end_pk
+            )
+
+            IndexUpdateQueueEntry.objects.add_documents(
+                document_pks=Document.objects.filter(
+                    pk__gte=start_pk, pk__lte=end_pk
+                ).values_list('pk', flat=True)
+            )
+            lock.delete()
+
+        for index in Index.objects.filter(pk__in=index_ids, enabled=True):
+            IndexInstanceNode.objects.rebuild_index_finish(index=index)
+    finally:
+        Lock.filter(name=REBUILD_LOCK_NAME).delete()
+
+    if lost_chunks:
+        task_index_queued_documents.apply_async()
@@ -1,13 +1,20 @@
 from __future__ import unicode_literals
 
+from django.contrib.auth import get_user_model
 from django.core.files.base import File
 from django.test import TestCase, override_settings
 
 from documents.models import DocumentType
 from documents.tests import TEST_SMALL_DOCUMENT_PATH, TEST_DOCUMENT_TYPE
 from metadata.models import MetadataType, DocumentTypeMetadataType
+from user_management.tests import (
+    TEST_ADMIN_EMAIL, TEST_ADMIN_PASSWORD, TEST_ADMIN_USERNAME
+)
 
-from ..models import Index, IndexInstanceNode, IndexTemplateNode
+from ..models import (
+    Index, IndexInstanceNode, IndexTemplateNode, IndexUpdateQueueEntry
+)
+from ..tasks import task_do_rebuild_all_indexes
 
 
 @override_settings(OCR_AUTO_OCR=False)
@@ -110,8 +117,10 @@ class IndexTestCase(TestCase):
             ), ['', '0003']
         )
 
-        # Document deleted from, index structure should update
+        # Document deleted from, index structure should update once the
+        # empty index instances are deleted
         self.document.delete()
+        IndexInstanceNode.objects.delete_empty_index_nodes()
         self.assertEqual(
             list(
                 IndexInstanceNode.objects.values_list('value', flat=True)
@@ -156,10 +165,241 @@ class IndexTestCase(TestCase):
         self.assertEqual(list(IndexInstanceNode.objects.all()), [])
 
         # Rebuild all indexes
-        IndexInstanceNode.objects.rebuild_all_indexes()
+        task_do_rebuild_all_indexes.apply_async()
 
         # Check that document is in instance node
         instance_node = IndexInstanceNode.objects.get(value='0001')
         self.assertQuerysetEqual(
             instance_node.documents.all(), [repr(self.document)]
         )
+
+    def test_reindex_keeps_unchanged_links(self):
+        metadata_type = MetadataType.objects.create(name='test', label='test')
+        DocumentTypeMetadataType.objects.create(
+            document_type=self.document_type, metadata_type=metadata_type
+        )
+        self.document.metadata.create(
+            metadata_type=metadata_type, value='0001'
+        )
+
+        index = Index.objects.create(label='test')
+        index.document_types.add(self.document_type)
+        index.node_templates.create(
+            parent=index.template_root,
+            expression='{{ document.metadata_value_of.test }}',
+            link_documents=True
+        )
+
+        IndexInstanceNode.objects.index_document(self.document)
+        link = IndexInstanceNode.documents.through.objects.get(
+            document=self.document
+        )
+
+        IndexInstanceNode.objects.index_document(self.document)
+        self.assertEqual(
+            list(
+                IndexInstanceNode.documents.through.objects.filter(
+                    document=self.document
+                )
+            ), [link]
+        )
+
+    def test_rebuild_index_merges_duplicate_nodes(self):
+        index = Index.objects.create(label='test')
+        index.document_types.add(self.document_type)
+        index.node_templates.create(
+            parent=index.template_root, expression='{{ document.label }}',
+            link_documents=True
+        )
+
+        IndexInstanceNode.objects.reset_index(index=index)
+        IndexInstanceNode.objects.rebuild_index_documents(
+            index=index,
+            documents=IndexInstanceNode.objects.get_rebuild_documents(
+                index=index
+            )
+        )
+
+        # Simulate a node created concurrently by another worker
+        instance_node = IndexInstanceNode.objects.get(
+            value=self.document.label
+        )
+        duplicate = IndexInstanceNode.objects.create(
+            index_template_node=instance_node.index_template_node,
+            parent=instance_node.parent, value=instance_node.value
+        )
+        duplicate.documents.add(self.document)
+
+        IndexInstanceNode.objects.rebuild_index_finish(index=index)
+
+        instance_node = IndexInstanceNode.objects.get(
+            value=self.document.label
+        )
+        self.assertQuerysetEqual(
+            instance_node.documents.all(), [repr(self.document)]
+        )
+        self.assertEqual(index.instance_root.get_descendant_count(), 1)
+
+    def test_rebuild_index_chunk_after_duplicate_node(self):
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            document = self.document_type.new_document(
+                file_object=File(file_object)
+            )
+
+        index = Index.objects.create(label='test')
+        index.document_types.add(self.document_type)
+        index.node_templates.create(
+            parent=index.template_root,
+            expression='{{ document.document_type }}', link_documents=True
+        )
+
+        IndexInstanceNode.objects.reset_index(index=index)
+        IndexInstanceNode.objects.rebuild_index_documents(
+            index=index,
+            documents=IndexInstanceNode.objects.get_rebuild_documents(
+                index=index
+            ).filter(pk=self.document.pk)
+        )
+
+        # Simulate a node created concurrently by another worker
+        instance_node = IndexInstanceNode.objects.get(
+            value=TEST_DOCUMENT_TYPE
+        )
+        IndexInstanceNode.objects.create(
+            index_template_node=instance_node.index_template_node,
+            parent=instance_node.parent, value=instance_node.value
+        )
+
+        # A later chunk finds both nodes
+        IndexInstanceNode.objects.rebuild_index_documents(
+            index=index,
+            documents=IndexInstanceNode.objects.get_rebuild_documents(
+                index=index
+            ).filter(pk=document.pk)
+        )
+        IndexInstanceNode.objects.rebuild_index_finish(index=index)
+
+        instance_node = IndexInstanceNode.objects.get(
+            value=TEST_DOCUMENT_TYPE
+        )
+        self.assertEqual(
+            set(instance_node.documents.all()), set([self.document, document])
+        )
+        self.assertEqual(index.instance_root.get_descendant_count(), 1)
+
+    def test_index_document_tree_fields(self):
+        index = Index.objects.create(label='test')
+        index.document_types.add(self.document_type)
+        template_node = index.node_templates.create(
+            parent=index.template_root,
+            expression='{{ document.document_type }}'
+        )
+        index.node_templates.create(
+            parent=template_node, expression='{{ document.label }}',
+            link_documents=True
+        )
+
+        IndexInstanceNode.objects.index_document(self.document)
+
+        self.document.label = 'renamed'
+        self.document.save()
+        IndexInstanceNode.objects.index_document(self.document)
+
+        # The new branch is placed inside its existing parent and the
+        # empty one is removed
+        instance_root = index.instance_root
+        self.assertEqual(instance_root.get_descendant_count(), 2)
+
+        instance_node = IndexInstanceNode.objects.get(value='renamed')
+        parent = instance_node.parent
+        self.assertEqual(instance_node.level, 2)
+        self.assertEqual(instance_node.tree_id, instance_root.tree_id)
+        self.assertTrue(parent.lft < instance_node.lft < instance_node.rght < parent.rght)
+        self.assertEqual(parent.rght, instance_root.rght - 1)
+
+    def test_delete_empty_index_nodes(self):
+        index = Index.objects.create(label='test')
+        index.document_types.add(self.document_type)
+        template_node = index.node_templates.create(
+            parent=index.template_root,
+            expression='{{ document.document_type }}'
+        )
+        index.node_templates.create(
+            parent=template_node, expression='{{ document.label }}',
+            link_documents=True
+        )
+
+        IndexInstanceNode.objects.index_document(self.document)
+        instance_root = index.instance_root
+        instance_node = IndexInstanceNode.objects.get(
+            value=self.document.label
+        )
+
+        # Empty branches left by removed documents
+        for value in ('empty_1', 'empty_2'):
+            parent = IndexInstanceNode.objects.create(
+                index_template_node=template_node, parent=instance_root,
+                value=value
+            )
+            IndexInstanceNode.objects.create(
+                index_template_node=instance_node.index_template_node,
+                parent=parent, value=value
+            )
+
+        IndexInstanceNode.objects.delete_empty_index_nodes()
+
+        self.assertEqual(
+            set(
+                IndexInstanceNode.objects.filter(
+                    index_template_node__index=index
+                ).values_list('value', flat=True)
+            ), set(['', TEST_DOCUMENT_TYPE, self.document.label])
+        )
+
+        # The tree fields are left without gaps
+        instance_root = index.instance_root
+        instance_node = IndexInstanceNode.objects.get(pk=instance_node.pk)
+        self.assertEqual(instance_root.lft, 1)
+        self.assertEqual(instance_root.rght, 6)
+        self.assertEqual(instance_node.parent.lft, 2)
+        self.assertEqual(instance_node.lft, 3)
+        self.assertEqual(instance_node.rght, 4)
+
+    def test_index_update_queue_coalescing(self):
+        self.assertEqual(
+            IndexUpdateQueueEntry.objects.add_documents(
+                document_pks=(self.document.pk,)
+            ), set([self.document.pk])
+        )
+        self.assertEqual(
+            IndexUpdateQueueEntry.objects.add_documents(
+                document_pks=(self.document.pk,)
+            ), set()
+        )
+        self.assertEqual(
+            IndexUpdateQueueEntry.objects.get_entries(limit=10).keys(),
+            [self.document.pk]
+        )
+
+    def test_item_count_maintained(self):
+        admin_user = get_user_model().objects.create_superuser(
+            username=TEST_ADMIN_USERNAME, email=TEST_ADMIN_EMAIL,
+            password=TEST_ADMIN_PASSWORD
+        )
+        index = Index.objects.create(label='test')
+        index.document_types.add(self.document_type)
+        index.node_templates.create(
+            parent=index.template_root, expression='{{ document.label }}',
+            link_documents=True
+        )
+
+        IndexInstanceNode.objects.index_document(self.document)
+        instance_node = IndexInstanceNode.objects.get(
+            value=self.document.label
+        )
+        self.assertEqual(instance_node.get_item_count(user=admin_user), 1)
+
+        # Documents in the trash are not counted
+        self.document.delete()
+        instance_node = IndexInstanceNode.objects.get(pk=instance_node.pk)
+        self.assertEqual(instance_node.get_item_count(user=admin_user), 0)
@@ -0,0 +1,90 @@
+from __future__ import unicode_literals
+
+from django.core.files.base import File
+from django.test import TestCase
+
+from documents.models import DocumentType
+from documents.tests import TEST_SMALL_DOCUMENT_PATH, TEST_DOCUMENT_TYPE
+
+from ..models import Index, IndexInstanceNode
+from ..profilers import IndexProfiler
+
+
+class IndexProfilerTestCase(TestCase):
+    def setUp(self):
+        self.document_type = DocumentType.objects.create(
+            label=TEST_DOCUMENT_TYPE
+        )
+
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            self.document = self.document_type.new_document(
+                file_object=File(file_object)
+            )
+
+    def tearDown(self):
+        for document_type in DocumentType.objects.all():
+            document_type.delete()
+
+    def test_profile(self):
+        index = Index.objects.create(label='test', enabled=False)
+        index.document_types.add(self.document_type)
+        template_node = index.node_templates.create(
+            parent=index.template_root,
+            expression='{{ document.document_type }}'
+        )
+        index.node_templates.create(
+            parent=template_node, expression='{{ document.label }}',
+            link_documents=True
+        )
+        index.node_templates.create(
+            parent=template_node, expression='{% if document.missing %}{% endif %}'
+        )
+
+        results = IndexProfiler(index=index).run()
+
+        self.assertEqual(results['documents'], 1)
+        self.assertEqual(results['nodes'], 2)
+        self.assertEqual(results['links'], 1)
+
+        profiles = results['template_nodes']
+        self.assertEqual(profiles[0]['cardinality'], 1)
+        self.assertEqual(profiles[1]['links'], 1)
+        self.assertEqual(profiles[2]['empty'], 1)
+
+        self.assertEqual(results['projected_nodes'], 2)
+
+        # Nothing is written
+        self.assertFalse(
+            IndexInstanceNode.objects.filter(
+                index_template_node__index=index
+            ).exists()
+        )
+
+    def test_profile_sample_projection(self):
+        for count in range(3):
+            with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+                self.document_type.new_document(file_object=File(file_object))
+
+        index = Index.objects.create(label='test', enabled=False)
+        index.document_types.add(self.document_type)
+        index.node_templates.create(
+            parent=index.template_root, expression='{{ document.label }}'
+        )
+        index.node_templates.create(
+            parent=index.template_root, expression='{{ document.pk }}'
+        )
+
+        results = IndexProfiler(index=index, sample=2).run()
+        repeated, unique = results['template_nodes']
+
+        self.assertEqual(results['documents'], 2)
+        self.assertEqual(results['total_documents'], 4)
+
+        # Repeated values don't grow with the documents
+        self.assertEqual(repeated['nodes'], 1)
+        self.assertEqual(repeated['projected_nodes'], 1)
+
+        # Values found once suggest more values not sampled
+        self.assertEqual(unique['nodes'], 2)
+        self.assertGreater(unique['projected_nodes'], 2)
+        self.assertLessEqual(unique['projected_nodes'], 4)
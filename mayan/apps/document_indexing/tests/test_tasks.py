@@ -0,0 +1,112 @@
+from __future__ import unicode_literals
+
+import datetime
+
+from django.core.files.base import File
+from django.test import TestCase
+from django.utils.timezone import now
+
+from documents.models import DocumentType
+from documents.tests import TEST_SMALL_DOCUMENT_PATH, TEST_DOCUMENT_TYPE
+from lock_manager import Lock
+
+from ..literals import (
+    REBUILD_CHUNK_LOCK_NAME, REBUILD_CHUNK_LOCK_PREFIX, REBUILD_LOCK_NAME,
+    REBUILD_LOCK_TIMEOUT
+)
+from ..models import Index, IndexInstanceNode, IndexUpdateQueueEntry
+from ..tasks import task_index_queued_documents, task_rebuild_index_finish
+
+
+class IndexingTaskTestCase(TestCase):
+    def setUp(self):
+        self.document_type = DocumentType.objects.create(
+            label=TEST_DOCUMENT_TYPE
+        )
+
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            self.document = self.document_type.new_document(
+                file_object=File(file_object)
+            )
+
+        self.index = Index.objects.create(label='test')
+        self.index.document_types.add(self.document_type)
+        self.index.node_templates.create(
+            parent=self.index.template_root,
+            expression='{{ document.label }}', link_documents=True
+        )
+
+    def tearDown(self):
+        for document_type in DocumentType.objects.all():
+            document_type.delete()
+
+    def test_index_queued_documents(self):
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            document = self.document_type.new_document(
+                file_object=File(file_object)
+            )
+
+        IndexUpdateQueueEntry.objects.all().delete()
+
+        # Repeated changes of the same documents
+        for document_pks in ((self.document.pk, document.pk), (document.pk,)):
+            IndexUpdateQueueEntry.objects.add_documents(
+                document_pks=document_pks
+            )
+
+        indexed_pks = []
+        index_document = IndexInstanceNode.objects.index_document
+
+        def count_index_document(document):
+            indexed_pks.append(document.pk)
+            index_document(document)
+
+        IndexInstanceNode.objects.index_document = count_index_document
+
+        try:
+            task_index_queued_documents.apply()
+        finally:
+            del IndexInstanceNode.objects.index_document
+
+        self.assertEqual(sorted(indexed_pks), sorted([self.document.pk, document.pk]))
+        self.assertFalse(IndexUpdateQueueEntry.objects.exists())
+        self.assertEqual(
+            set(
+                IndexInstanceNode.objects.get(
+                    value=self.document.label
+                ).documents.all()
+            ), set([self.document, document])
+        )
+
+    def test_rebuild_finish_lost_chunk(self):
+        IndexInstanceNode.objects.reset_index(index=self.index)
+        Lock.acquire_exclusive_lock(
+            REBUILD_LOCK_NAME, timeout=REBUILD_LOCK_TIMEOUT
+        )
+
+        # A chunk whose worker died while running it
+        Lock.acquire_lock(
+            REBUILD_CHUNK_LOCK_NAME % (
+                self.index.pk, self.document.pk, self.document.pk
+            ), timeout=60
+        )
+        Lock.filter(name__startswith=REBUILD_CHUNK_LOCK_PREFIX).update(
+            creation_datetime=now() - datetime.timedelta(hours=1)
+        )
+
+        task_rebuild_index_finish.apply(
+            kwargs=dict(index_ids=[self.index.pk])
+        )
+
+        self.assertFalse(
+            Lock.filter(name__startswith=REBUILD_CHUNK_LOCK_PREFIX).exists()
+        )
+        self.assertFalse(Lock.filter(name=REBUILD_LOCK_NAME).exists())
+
+        # The documents of the lost chunk are indexed after the rebuild
+        instance_node = IndexInstanceNode.objects.get(
+            value=self.document.label
+        )
+        self.assertQuerysetEqual(
+            instance_node.documents.all(), [repr(self.document)]
+        )
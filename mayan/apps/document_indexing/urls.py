@@ -9,7 +9,8 @@ from .api_views import (
 )
 from .views import (
     DocumentIndexNodeListView, IndexInstanceNodeView, IndexListView,
-    RebuildIndexesConfirmView, SetupIndexDocumentTypesView,
+    RebuildIndexConfirmView, RebuildIndexesConfirmView,
+    SetupIndexDocumentTypesView,
     SetupIndexCreateView, SetupIndexDeleteView, SetupIndexEditView,
     SetupIndexListView, SetupIndexTreeTemplateListView, TemplateNodeDeleteView
 )
@@ -32,6 +33,10 @@ urlpatterns = patterns(
         r'^setup/index/(?P<pk>\d+)/delete/$', SetupIndexDeleteView.as_view(),
         name='index_setup_delete'
     ),
+    url(
+        r'^setup/index/(?P<pk>\d+)/rebuild/$',
+        RebuildIndexConfirmView.as_view(), name='index_setup_rebuild'
+    ),
     url(
         r'^setup/index/(?P<pk>\d+)/template/$',
         SetupIndexTreeTemplateListView.as_view(), name='index_setup_view'
@@ -344,3 +344,29 @@ class RebuildIndexesConfirmView(ConfirmView):
     def view_action(self):
         task_do_rebuild_all_indexes.apply_async()
         messages.success(self.request, _('Index rebuild queued successfully.'))
+
+
+class RebuildIndexConfirmView(ConfirmView):
+    view_permission = permission_document_indexing_rebuild_indexes
+
+    def get_extra_context(self):
+        return {
+            'message': _(
+                'On large databases this operation may take some time to '
+                'execute.'
+            ),
+            'object': self.get_object(),
+            'title': _('Rebuild index: %s?') % self.get_object(),
+        }
+
+    def get_object(self):
+        return get_object_or_404(Index, pk=self.kwargs['pk'])
+
+    def get_post_action_redirect(self):
+        return reverse('indexing:index_setup_list')
+
+    def view_action(self):
+        task_do_rebuild_all_indexes.apply_async(
+            kwargs=dict(index_id=self.get_object().pk)
+        )
+        messages.success(self.request, _('Index rebuild queued successfully.'))
@@ -4,6 +4,7 @@ from datetime import timedelta
 
 from kombu import Exchange, Queue
 
+from django.db.models.signals import post_delete, post_save
 from django.utils.translation import ugettext_lazy as _
 
 from actstream import registry
@@ -71,7 +72,9 @@ from .permissions import (
     permission_document_trash, permission_document_version_revert,
     permission_document_view
 )
+from .search import document_search
 from .settings import setting_thumbnail_size
+from .signals import post_version_upload
 from .statistics import (
     new_documents_per_month, new_document_pages_per_month,
     new_document_versions_per_month, total_document_per_month,
@@ -422,5 +425,14 @@ class DocumentsApp(MayanAppConfig):
             dispatch_uid='create_default_document_type'
         )
 
+        document_search.add_index_trigger(signal=post_save, sender=Document)
+        document_search.add_index_trigger(
+            signal=post_delete, sender=Document, remove=True
+        )
+        document_search.add_index_trigger(
+            signal=post_version_upload, sender=DocumentVersion,
+            accessor='document'
+        )
+
         registry.register(DeletedDocument)
         registry.register(Document)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import DatabaseError, migrations, transaction
+
+
+def create_label_trigram_index(apps, schema_editor):
+    """
+    Index the label column with the PostgreSQL pg_trgm extension to
+    speed up the case insensitive substring searches. The extension can
+    only be created by privileged database users, without it the search
+    falls back to the portable trigram table.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError:
+        return
+
+    schema_editor.execute(
+        'CREATE INDEX documents_document_label_trgm ON documents_document USING gin '
+        '((UPPER(label::text)) gin_trgm_ops)'
+    )
+
+
+def remove_label_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('DROP INDEX IF EXISTS documents_document_label_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0028_newversionblock'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_label_trigram_index, remove_label_trigram_index
+        ),
+    ]
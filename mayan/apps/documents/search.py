@@ -17,5 +17,15 @@ document_search.add_model_field(
 document_search.add_model_field(
     field='versions__mimetype', label=_('MIME type')
 )
-document_search.add_model_field(field='label', label=_('Label'))
+document_search.add_model_field(
+    field='label', label=_('Label'), trigram=True, weight=3
+)
 document_search.add_model_field(field='description', label=_('Description'))
+
+document_search.add_facet(
+    name='document_type', label=_('Document type'),
+    field='document_type__label'
+)
+document_search.add_facet(
+    name='year', label=_('Year added'), field='date_added', by_year=True
+)
@@ -1,14 +1,17 @@
 from __future__ import unicode_literals
 
 from rest_framework import generics
+from rest_framework.authentication import TokenAuthentication
 from rest_framework.exceptions import ParseError
-
-from rest_api.filters import MayanObjectPermissionsFilter
+from rest_framework.response import Response
 
 from .classes import SearchModel
 from .filters import RecentSearchUserFilter
 from .models import RecentSearch
-from .serializers import RecentSearchSerializer
+from .serializers import (
+    RecentSearchSerializer, SearchSuggestionSerializer, get_ranked_serializer
+)
+from .settings import setting_recent_token_searches
 
 
 class APIRecentSearchListView(generics.ListAPIView):
@@ -35,26 +38,83 @@ class APISearchView(generics.ListAPIView):
     """
     Perform a search operaton
     q -- Term that will be used for the search.
+    Results are sorted by relevance and include their search_score when
+    the search backend supports ranking.
+    The response includes the result counts per facet value, a facet value
+    is selected with the facet_<name> parameter.
+    total_count is the number of all the matches, the results are
+    paginated past the first SEARCH_LIMIT.
     """
 
-    filter_backends = (MayanObjectPermissionsFilter,)
-
     def get_queryset(self):
         search_class = self.get_search_class()
-        if search_class.permission:
-            self.mayan_object_permissions = {'GET': (search_class.permission,)}
 
+        record_search = setting_recent_token_searches.value or not isinstance(
+            self.request.successful_authenticator, TokenAuthentication
+        )
+
+        # The search results are already filtered by access
         try:
-            queryset, ids, timedelta = search_class.search(
-                query_string=self.request.GET, user=self.request.user
+            results = search_class.search(
+                query_string=self.request.GET, user=self.request.user,
+                facets=True, record_search=record_search
             )
         except Exception as exception:
             raise ParseError(unicode(exception))
 
-        return queryset
+        self.facet_counts = results.facet_counts
+        self.total_count = results.total_count
+
+        return results
+
+    def list(self, request, *args, **kwargs):
+        response = super(APISearchView, self).list(request, *args, **kwargs)
+
+        if isinstance(response.data, dict):
+            response.data['facets'] = [
+                {
+                    'label': unicode(search_facet.label),
+                    'name': search_facet.name,
+                    'values': [
+                        {'count': count, 'value': value}
+                        for value, count in counts
+                    ],
+                } for search_facet, counts in self.facet_counts
+            ]
+            response.data['total_count'] = self.total_count
+
+        return response
 
     def get_search_class(self):
         return SearchModel.get('documents.Document')
 
     def get_serializer_class(self):
-        return self.get_search_class().serializer
+        search_class = self.get_search_class()
+
+        if search_class.get_backend().supports_ranking:
+            return get_ranked_serializer(search_class.serializer)
+        else:
+            return search_class.serializer
+
+
+class APISearchSuggestionView(generics.GenericAPIView):
+    """
+    Returns the indexed terms completing the last word of the query, the
+    terms found in the most documents first.
+    q -- Partial search terms.
+    """
+    serializer_class = SearchSuggestionSerializer
+
+    def get(self, request, *args, **kwargs):
+        suggestions = SearchModel.get('documents.Document').get_suggestions(
+            prefix=request.GET.get('q', ''), user=request.user
+        )
+
+        return Response(
+            self.get_serializer(
+                [
+                    {'frequency': frequency, 'term': term}
+                    for term, frequency in suggestions
+                ], many=True
+            ).data
+        )
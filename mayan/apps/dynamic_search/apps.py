@@ -1,10 +1,19 @@
 from __future__ import unicode_literals
 
+import atexit
+
+from kombu import Exchange, Queue
+
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.utils.translation import ugettext_lazy as _
 
+from acls.models import AccessControlList
 from common import MayanAppConfig, menu_facet, menu_sidebar
+from mayan.celery import app
+from permissions.models import Role
 from rest_api.classes import APIEndPoint
 
+from .classes import RecentSearchBuffer, SearchModel
 from .links import link_search, link_search_advanced, link_search_again
 
 
@@ -20,6 +29,43 @@ class DynamicSearchApp(MayanAppConfig):
 
         APIEndPoint(app=self, version_string='1')
 
+        # Store the searches still in the buffer when the process exits
+        atexit.register(RecentSearchBuffer.flush)
+
+        # Access changes alter the results visible to the users
+        for signal, sender in (
+            (post_save, AccessControlList),
+            (post_delete, AccessControlList),
+            (m2m_changed, AccessControlList.permissions.through),
+            (post_delete, Role),
+            (m2m_changed, Role.permissions.through),
+            (m2m_changed, Role.groups.through),
+        ):
+            signal.connect(
+                SearchModel.invalidate_cache, sender=sender,
+                dispatch_uid='search_cache_invalidate_{}_{}'.format(
+                    id(signal), sender._meta.model_name
+                )
+            )
+
+        app.conf.CELERY_QUEUES.append(
+            Queue('search', Exchange('search'), routing_key='search'),
+        )
+
+        app.conf.CELERY_ROUTES.update(
+            {
+                'dynamic_search.tasks.task_add_recent_searches': {
+                    'queue': 'search'
+                },
+                'dynamic_search.tasks.task_index_instance': {
+                    'queue': 'search'
+                },
+                'dynamic_search.tasks.task_remove_index_instance': {
+                    'queue': 'search'
+                },
+            }
+        )
+
         menu_facet.bind_links(
             links=(link_search, link_search_advanced),
             sources=(
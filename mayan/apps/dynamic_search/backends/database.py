@@ -0,0 +1,124 @@
+from __future__ import unicode_literals
+
+import logging
+from operator import and_, or_
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.constants import LOOKUP_SEP
+
+from ..classes import SearchBackend
+from ..managers import get_trigrams
+from ..models import SearchTrigram
+from ..settings import setting_trigram_table
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """
+    Search backend that queries the model fields directly with the ORM.
+    The whole query is compiled into a single SQL statement.
+    The substring searches of the trigram search fields are resolved by
+    the pg_trgm indexes when using PostgreSQL with the extension installed,
+    otherwise by the trigram table when SEARCH_TRIGRAM_TABLE is enabled.
+    """
+    _has_pg_trgm = None
+
+    @classmethod
+    def has_pg_trgm(cls):
+        if cls._has_pg_trgm is None:
+            if connection.vendor == 'postgresql':
+                cursor = connection.cursor()
+                cursor.execute(
+                    'SELECT 1 FROM pg_extension WHERE extname = %s',
+                    ['pg_trgm']
+                )
+                cls._has_pg_trgm = cursor.fetchone() is not None
+            else:
+                cls._has_pg_trgm = False
+
+        return cls._has_pg_trgm
+
+    @property
+    def supports_indexing(self):
+        # Only the trigram table needs to be kept up to date
+        return self.uses_trigram_table()
+
+    def uses_trigram_table(self):
+        return setting_trigram_table.value and not self.has_pg_trgm()
+
+    def get_term_query(self, search_model, search_field, term):
+        model = search_model.get_model()
+        query = Q(**{'{}__icontains'.format(search_field.field): term})
+
+        if LOOKUP_SEP in search_field.field:
+            # Each term of a related field can match a different related
+            # row, use a semi join per term instead of sharing the join.
+            query = Q(pk__in=model.objects.filter(query).values('pk'))
+
+        if search_field.trigram and self.uses_trigram_table():
+            # Narrow the rows to check to those containing every trigram
+            # of the term using the trigram index. Terms shorter than a
+            # trigram are still checked against every row.
+            for trigram in get_trigrams(term):
+                query &= Q(
+                    pk__in=SearchTrigram.objects.get_object_ids(
+                        search_model=search_model, field=search_field.field,
+                        trigram=trigram
+                    )
+                )
+
+        return query
+
+    def clear(self, search_model):
+        SearchTrigram.objects.filter(
+            search_model=search_model.get_full_name()
+        ).delete()
+
+    def index_instance(self, search_model, instance):
+        SearchTrigram.objects.set_instance_trigrams(
+            search_model=search_model, instance=instance, fields=[
+                search_field.field for search_field in
+                search_model.get_all_search_fields() if search_field.trigram
+            ]
+        )
+
+    def remove_instance(self, search_model, object_id):
+        SearchTrigram.objects.remove_instance(
+            search_model=search_model, object_id=object_id
+        )
+
+    def search(self, search_model, field_terms, global_and_search=False):
+        """
+        Return a lazy queryset of the primary keys of the matching
+        instances. All the terms of a field must match, the fields are
+        ANDed or ORed depending on global_and_search.
+        """
+        model = search_model.get_model()
+        field_queries = []
+
+        for search_field, terms in field_terms:
+            # Longer terms tend to be more selective, place them first so
+            # that the database can discard rows early.
+            term_queries = [
+                self.get_term_query(
+                    search_model=search_model, search_field=search_field,
+                    term=term
+                ) for term in sorted(terms, key=len, reverse=True)
+            ]
+
+            if term_queries:
+                field_queries.append(reduce(and_, term_queries))
+
+        if not field_queries:
+            return model.objects.none().values_list('pk', flat=True)
+
+        if global_and_search:
+            query = reduce(and_, field_queries)
+        else:
+            query = reduce(or_, field_queries)
+
+        logger.debug('query: %s', query)
+
+        return model.objects.filter(query).values_list('pk', flat=True)
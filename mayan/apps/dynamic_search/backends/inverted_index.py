@@ -0,0 +1,482 @@
+from __future__ import unicode_literals
+
+from collections import Counter
+import logging
+import math
+import os
+import re
+import sqlite3
+
+from django.utils.encoding import force_text
+
+from ..classes import SearchBackend
+from ..literals import (
+    INDEX_CONNECTION_TIMEOUT, RANKING_BM25_B, RANKING_BM25_K1,
+    SUGGESTION_FUZZY_MIN_LENGTH, SUGGESTION_FUZZY_SCAN_LIMIT
+)
+from ..settings import setting_index_path
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS postings (
+    model TEXT NOT NULL, field TEXT NOT NULL, term TEXT NOT NULL,
+    object_id INTEGER NOT NULL, frequency INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS postings_term ON postings (model, field, term);
+CREATE INDEX IF NOT EXISTS postings_object ON postings (model, object_id);
+CREATE INDEX IF NOT EXISTS postings_model_term ON postings (model, term);
+CREATE TABLE IF NOT EXISTS lengths (
+    model TEXT NOT NULL, field TEXT NOT NULL, object_id INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS lengths_field ON lengths (model, field, object_id);
+CREATE INDEX IF NOT EXISTS lengths_object ON lengths (model, object_id);
+CREATE TABLE IF NOT EXISTS terms (
+    model TEXT NOT NULL, term TEXT NOT NULL, frequency INTEGER NOT NULL,
+    PRIMARY KEY (model, term)
+);
+CREATE INDEX IF NOT EXISTS terms_frequency ON terms (model, frequency);
+'''
+
+token_regex = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """
+    Split a text in lower case word tokens
+    """
+    if not text:
+        return []
+
+    return token_regex.findall(force_text(text).lower())
+
+
+def get_prefix_distance(prefix, term):
+    """
+    Return the smallest edit distance between a prefix and the beginnings
+    of a term.
+    """
+    previous_row = range(len(term) + 1)
+
+    for index, character in enumerate(prefix, 1):
+        current_row = [index]
+        for term_index, term_character in enumerate(term, 1):
+            current_row.append(
+                min(
+                    previous_row[term_index] + 1,
+                    current_row[term_index - 1] + 1,
+                    previous_row[term_index - 1] + (
+                        character != term_character
+                    )
+                )
+            )
+        previous_row = current_row
+
+    return min(previous_row)
+
+
+class InvertedIndexSearchBackend(SearchBackend):
+    """
+    Search backend using an inverted index stored in a SQLite file. Field
+    values are split into word tokens, each token has a posting per field
+    and instance. Search terms match the tokens that start with them.
+    The token count of each field value is kept to rank the results using
+    the BM25 formula. A dictionary of the terms and the number of instances
+    containing each one provides the search suggestions.
+    """
+    indexes_field_values = True
+    supports_indexing = True
+    supports_ranking = True
+    supports_suggestions = True
+
+    _initialized_paths = set()
+
+    @staticmethod
+    def get_prefix_range(prefix):
+        """
+        Return the lower and upper bounds of the terms starting with a
+        prefix, to allow range scans of the term index.
+        """
+        return prefix, prefix[:-1] + unichr(ord(prefix[-1]) + 1)
+
+    def __init__(self):
+        self.path = setting_index_path.value
+
+    def get_connection(self):
+        initialize = (
+            self.path not in self.__class__._initialized_paths or
+            not os.path.exists(self.path)
+        )
+
+        connection = sqlite3.connect(
+            self.path, timeout=INDEX_CONNECTION_TIMEOUT
+        )
+
+        if initialize:
+            connection.executescript(SCHEMA)
+            self.__class__._initialized_paths.add(self.path)
+
+        return connection
+
+    def clear(self, search_model):
+        connection = self.get_connection()
+        try:
+            with connection:
+                for table in ('postings', 'lengths', 'terms'):
+                    connection.execute(
+                        'DELETE FROM {} WHERE model = ?'.format(table),
+                        (search_model.get_full_name(),)
+                    )
+        finally:
+            connection.close()
+
+    def get_postings(self, search_model, object_ids):
+        """
+        Return the postings of a batch of instances, with a query per
+        search field for all the instances.
+        """
+        frequencies = {}
+
+        for search_field in search_model.get_all_search_fields():
+            values = search_field.get_values(object_ids=object_ids)
+
+            for object_id, value in values:
+                frequencies.setdefault(
+                    (search_field.field, object_id), Counter()
+                ).update(tokenize(value))
+
+        postings = []
+        for (field, object_id), counter in frequencies.items():
+            for term, frequency in counter.items():
+                postings.append(
+                    (
+                        search_model.get_full_name(), field, term, object_id,
+                        frequency
+                    )
+                )
+
+        return postings
+
+    def index_instance(self, search_model, instance):
+        self.index_instances(search_model=search_model, instances=[instance])
+
+    def index_instances(self, search_model, instances):
+        object_ids = [instance.pk for instance in instances]
+        postings = self.get_postings(
+            search_model=search_model, object_ids=object_ids
+        )
+
+        lengths = Counter()
+        for model, field, term, object_id, frequency in postings:
+            lengths[(model, field, object_id)] += frequency
+
+        instance_terms = set(
+            (model, term, object_id)
+            for model, field, term, object_id, frequency in postings
+        )
+
+        connection = self.get_connection()
+        try:
+            with connection:
+                for object_id in object_ids:
+                    self._delete_instance(
+                        connection=connection, search_model=search_model,
+                        object_id=object_id
+                    )
+                connection.executemany(
+                    'INSERT INTO postings VALUES (?, ?, ?, ?, ?)', postings
+                )
+                connection.executemany(
+                    'INSERT INTO lengths VALUES (?, ?, ?, ?)',
+                    [key + (length,) for key, length in lengths.items()]
+                )
+
+                terms = Counter(
+                    (model, term) for model, term, object_id in instance_terms
+                )
+                connection.executemany(
+                    'INSERT OR IGNORE INTO terms VALUES (?, ?, 0)',
+                    terms.keys()
+                )
+                connection.executemany(
+                    'UPDATE terms SET frequency = frequency + ? WHERE '
+                    'model = ? AND term = ?', [
+                        (count, model, term)
+                        for (model, term), count in terms.items()
+                    ]
+                )
+        finally:
+            connection.close()
+
+    def remove_instance(self, search_model, object_id):
+        connection = self.get_connection()
+        try:
+            with connection:
+                self._delete_instance(
+                    connection=connection, search_model=search_model,
+                    object_id=object_id
+                )
+        finally:
+            connection.close()
+
+    def _delete_instance(self, connection, search_model, object_id):
+        model_name = search_model.get_full_name()
+
+        connection.execute(
+            'UPDATE terms SET frequency = frequency - 1 WHERE model = ? AND '
+            'term IN (SELECT DISTINCT term FROM postings WHERE model = ? AND '
+            'object_id = ?)', (model_name, model_name, object_id)
+        )
+        connection.execute(
+            'DELETE FROM terms WHERE model = ? AND frequency <= 0',
+            (model_name,)
+        )
+
+        for table in ('postings', 'lengths'):
+            connection.execute(
+                'DELETE FROM {} WHERE model = ? AND object_id = ?'.format(
+                    table
+                ), (search_model.get_full_name(), object_id)
+            )
+
+    def get_scores(self, search_model, field_terms, global_and_search=False, limit=None, offset=0):
+        """
+        Score the instances matched by search() using BM25 and return the
+        limit best scored after the offset best scored. Each token is scored against the field it was
+        searched in, with the statistics of that field, and multiplied by
+        the weight of the search field. The scores are added and sorted by
+        SQLite, only the best scored instances are returned.
+        """
+        search_statement = self.get_search_statement(
+            search_model=search_model, field_terms=field_terms,
+            global_and_search=global_and_search
+        )
+
+        if not search_statement:
+            return {}
+
+        model_name = search_model.get_full_name()
+        score_statements = []
+        parameters = []
+
+        connection = self.get_connection()
+        try:
+            for search_field, terms in field_terms:
+                count, average_length = connection.execute(
+                    'SELECT COUNT(*), AVG(length) FROM lengths WHERE '
+                    'model = ? AND field = ?', (model_name, search_field.field)
+                ).fetchone()
+
+                if not count:
+                    continue
+
+                for term in terms:
+                    for token in tokenize(term):
+                        token_parameters = (
+                            model_name, search_field.field
+                        ) + self.get_prefix_range(token)
+
+                        document_count = connection.execute(
+                            'SELECT COUNT(DISTINCT object_id) FROM postings '
+                            'WHERE model = ? AND field = ? AND term >= ? AND '
+                            'term < ?', token_parameters
+                        ).fetchone()[0]
+
+                        idf = math.log(
+                            1 + (count - document_count + 0.5) / (
+                                document_count + 0.5
+                            )
+                        )
+
+                        # The constants are written in the statement to
+                        # keep the number of parameters bounded
+                        score_statements.append(
+                            'SELECT matches.object_id AS object_id, {!r} * '
+                            'matches.frequency / (matches.frequency + {!r} * '
+                            '({!r} + {!r} * lengths.length / {!r})) AS score '
+                            'FROM (SELECT model, field, object_id, '
+                            'SUM(frequency) AS frequency FROM postings WHERE '
+                            'model = ? AND field = ? AND term >= ? AND '
+                            'term < ? GROUP BY object_id) AS matches JOIN '
+                            'lengths ON lengths.model = matches.model AND '
+                            'lengths.field = matches.field AND '
+                            'lengths.object_id = matches.object_id'.format(
+                                float(
+                                    search_field.weight * idf * (
+                                        RANKING_BM25_K1 + 1
+                                    )
+                                ), float(RANKING_BM25_K1),
+                                float(1 - RANKING_BM25_B),
+                                float(RANKING_BM25_B), float(average_length)
+                            )
+                        )
+                        parameters.extend(token_parameters)
+
+            if not score_statements:
+                return {}
+
+            statement, search_parameters = search_statement
+            statement = (
+                'SELECT object_id, SUM(score) AS total_score FROM ({}) WHERE '
+                'object_id IN ({}) GROUP BY object_id ORDER BY total_score '
+                'DESC, object_id DESC LIMIT ? OFFSET ?'.format(
+                    ' UNION ALL '.join(score_statements), statement
+                )
+            )
+            parameters.extend(search_parameters)
+            parameters.extend((-1 if limit is None else limit, offset))
+
+            logger.debug('statement: %s', statement)
+
+            return dict(connection.execute(statement, parameters))
+        finally:
+            connection.close()
+
+    def get_count(self, search_model, field_terms, global_and_search=False):
+        search_statement = self.get_search_statement(
+            search_model=search_model, field_terms=field_terms,
+            global_and_search=global_and_search
+        )
+
+        if not search_statement:
+            return 0
+
+        statement, parameters = search_statement
+
+        connection = self.get_connection()
+        try:
+            return connection.execute(
+                'SELECT COUNT(*) FROM ({})'.format(statement), parameters
+            ).fetchone()[0]
+        finally:
+            connection.close()
+
+    def get_search_statement(self, search_model, field_terms, global_and_search=False):
+        """
+        Compile the query into a single compound SELECT. The tokens of all
+        the terms of a field are intersected, the fields are intersected or
+        joined depending on global_and_search. Return the statement and
+        its parameters or None if the query has no tokens.
+        """
+        field_statements = []
+        parameters = []
+
+        for search_field, terms in field_terms:
+            token_statements = []
+
+            for term in terms:
+                for token in tokenize(term):
+                    token_statements.append(
+                        'SELECT object_id FROM postings WHERE model = ? AND '
+                        'field = ? AND term >= ? AND term < ?'
+                    )
+                    parameters.extend(
+                        (search_model.get_full_name(), search_field.field) +
+                        self.get_prefix_range(token)
+                    )
+
+            if token_statements:
+                field_statements.append(
+                    'SELECT object_id FROM ({})'.format(
+                        ' INTERSECT '.join(token_statements)
+                    )
+                )
+
+        if not field_statements:
+            return None
+
+        if global_and_search:
+            statement = ' INTERSECT '.join(field_statements)
+        else:
+            statement = ' UNION '.join(field_statements)
+
+        return statement, parameters
+
+    def search(self, search_model, field_terms, global_and_search=False):
+        search_statement = self.get_search_statement(
+            search_model=search_model, field_terms=field_terms,
+            global_and_search=global_and_search
+        )
+
+        if not search_statement:
+            return []
+
+        statement, parameters = search_statement
+
+        logger.debug('statement: %s', statement)
+
+        connection = self.get_connection()
+        try:
+            return [
+                row[0] for row in connection.execute(statement, parameters)
+            ]
+        finally:
+            connection.close()
+
+    def get_suggestions(self, search_model, prefix, limit):
+        """
+        Return the terms starting with the prefix, the most frequent first.
+        When there are not enough of them, the frequent terms starting with
+        the same character and within a small edit distance of the prefix
+        are added, to tolerate typing and OCR errors.
+        """
+        model_name = search_model.get_full_name()
+        tokens = tokenize(prefix)
+
+        if not tokens:
+            return []
+
+        prefix = tokens[-1]
+
+        connection = self.get_connection()
+        try:
+            suggestions = connection.execute(
+                'SELECT term, frequency FROM terms WHERE model = ? AND '
+                'term >= ? AND term < ? ORDER BY frequency DESC, term '
+                'LIMIT ?', (model_name,) + self.get_prefix_range(prefix) +
+                (limit,)
+            ).fetchall()
+
+            if len(suggestions) < limit and len(prefix) >= SUGGESTION_FUZZY_MIN_LENGTH:
+                maximum_distance = 1 if len(prefix) < 8 else 2
+                found_terms = set(term for term, frequency in suggestions)
+                candidates = []
+
+                for term, frequency in connection.execute(
+                    'SELECT term, frequency FROM terms WHERE model = ? AND '
+                    'term >= ? AND term < ? ORDER BY frequency DESC LIMIT ?',
+                    (model_name,) + self.get_prefix_range(prefix[0]) +
+                    (SUGGESTION_FUZZY_SCAN_LIMIT,)
+                ):
+                    if term in found_terms:
+                        continue
+
+                    distance = get_prefix_distance(
+                        prefix, term[:len(prefix) + maximum_distance]
+                    )
+                    if distance <= maximum_distance:
+                        candidates.append((distance, -frequency, term))
+
+                suggestions.extend(
+                    (term, -frequency) for distance, frequency, term in sorted(
+                        candidates
+                    )[:limit - len(suggestions)]
+                )
+
+            return suggestions
+        finally:
+            connection.close()
+
+    def get_term_object_ids(self, search_model, term, limit):
+        connection = self.get_connection()
+        try:
+            return [
+                row[0] for row in connection.execute(
+                    'SELECT DISTINCT object_id FROM postings WHERE model = ? '
+                    'AND term = ? LIMIT ?',
+                    (search_model.get_full_name(), term, limit)
+                )
+            ]
+        finally:
+            connection.close()
@@ -0,0 +1,440 @@
+from __future__ import division, unicode_literals
+
+import bisect
+from collections import Counter
+import datetime
+import logging
+import math
+import os
+import random
+import string
+import time
+
+from django.contrib.auth.models import Group, User
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+import mayan
+
+from acls.models import AccessControlList
+from documents.models import (
+    Document, DocumentPage, DocumentType, DocumentVersion
+)
+from documents.permissions import permission_document_view
+from documents.search import document_search
+from metadata.models import DocumentMetadata, MetadataType
+from ocr.models import DocumentPageContent
+from permissions.models import Role
+
+from .literals import (
+    BENCHMARK_BATCH_SIZE, BENCHMARK_LIMITS, BENCHMARK_SELECTIVITIES
+)
+
+logger = logging.getLogger(__name__)
+
+
+def get_percentile(values, percentile):
+    """
+    Return the nearest rank percentile of a list of values
+    """
+    values = sorted(values)
+    index = max(0, int(math.ceil(percentile / 100 * len(values))) - 1)
+    return values[index]
+
+
+def get_resident_memory():
+    """
+    Return the current resident memory of the process in kilobytes or None
+    when it can't be read, only Linux is supported
+    """
+    try:
+        with open('/proc/self/statm') as file_object:
+            resident_pages = int(file_object.read().split()[1])
+    except (IOError, IndexError, ValueError):
+        return None
+
+    return resident_pages * os.sysconf(str('SC_PAGE_SIZE')) // 1024
+
+
+class SyntheticCorpus(object):
+    """
+    Create random documents with metadata and page text. The words follow
+    a Zipf distribution so that the vocabulary has terms of every
+    selectivity, the number of documents containing each word is kept to
+    pick the search terms.
+    """
+    def __init__(self, documents=1000, document_types=10, metadata=3, pages=1, words=200, vocabulary=5000, seed=0):
+        self.document_count = documents
+        self.document_type_count = document_types
+        self.metadata_count = metadata
+        self.page_count = pages
+        self.word_count = words
+        self.vocabulary_size = vocabulary
+        self.random = random.Random(seed)
+        self.document_frequencies = Counter()
+
+    def get_parameters(self):
+        return {
+            'documents': self.document_count,
+            'document_types': self.document_type_count,
+            'metadata': self.metadata_count,
+            'pages': self.page_count,
+            'words': self.word_count,
+            'vocabulary': self.vocabulary_size,
+        }
+
+    def create(self):
+        self.vocabulary = self.get_vocabulary()
+        self.cumulative_weights = self.get_cumulative_weights()
+
+        self.document_types = [
+            DocumentType.objects.create(label='Benchmark type {}'.format(index))
+            for index in range(self.document_type_count)
+        ]
+        self.metadata_types = [
+            MetadataType.objects.create(
+                name='benchmark_{}'.format(index),
+                label='Benchmark {}'.format(index)
+            ) for index in range(self.metadata_count)
+        ]
+
+        for start in range(0, self.document_count, BENCHMARK_BATCH_SIZE):
+            self.create_documents(
+                count=min(BENCHMARK_BATCH_SIZE, self.document_count - start)
+            )
+
+    def create_documents(self, count):
+        last_pk = Document.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+
+        documents = []
+        for index in range(count):
+            words = self.get_words(count=3)
+            documents.append(
+                Document(
+                    document_type=self.random.choice(self.document_types),
+                    label='{}.pdf'.format(' '.join(words)),
+                    description=' '.join(self.get_words(count=10)),
+                    is_stub=False
+                )
+            )
+        Document.objects.bulk_create(documents)
+        documents = list(Document.objects.filter(pk__gt=last_pk))
+
+        DocumentVersion.objects.bulk_create(
+            DocumentVersion(
+                document=document, file='benchmark.pdf',
+                mimetype='application/pdf', encoding='binary', checksum=''
+            ) for document in documents
+        )
+        versions = DocumentVersion.objects.filter(
+            document__in=documents
+        ).select_related('document')
+
+        DocumentPage.objects.bulk_create(
+            DocumentPage(document_version=version, page_number=page_number)
+            for version in versions
+            for page_number in range(1, self.page_count + 1)
+        )
+
+        page_contents = []
+        metadata = []
+        document_words = dict(
+            (
+                document.pk, set(document.label[:-4].split()) | set(
+                    document.description.split()
+                )
+            ) for document in documents
+        )
+
+        pages = DocumentPage.objects.filter(
+            document_version__in=versions
+        ).select_related('document_version')
+
+        for page in pages:
+            words = self.get_words(count=self.word_count)
+            document_words[page.document_version.document_id].update(words)
+            page_contents.append(
+                DocumentPageContent(
+                    document_page=page, content=' '.join(words)
+                )
+            )
+
+        for document in documents:
+            for metadata_type in self.metadata_types:
+                word = self.get_words(count=1)[0]
+                document_words[document.pk].add(word)
+                metadata.append(
+                    DocumentMetadata(
+                        document=document, metadata_type=metadata_type,
+                        value='{}-{:06d} {}'.format(
+                            metadata_type.name.upper(),
+                            self.random.randint(0, 999999), word
+                        )
+                    )
+                )
+
+        DocumentPageContent.objects.bulk_create(page_contents)
+        DocumentMetadata.objects.bulk_create(metadata)
+
+        for words in document_words.values():
+            self.document_frequencies.update(words)
+
+    def get_vocabulary(self):
+        vocabulary = set()
+        while len(vocabulary) < self.vocabulary_size:
+            vocabulary.add(
+                ''.join(
+                    self.random.choice(string.ascii_lowercase)
+                    for index in range(self.random.randint(4, 10))
+                )
+            )
+
+        return sorted(vocabulary)
+
+    def get_words(self, count):
+        return [
+            self.vocabulary[
+                bisect.bisect_left(
+                    self.cumulative_weights,
+                    self.random.random() * self.cumulative_weights[-1]
+                )
+            ] for index in range(count)
+        ]
+
+    def get_term(self, selectivity):
+        """
+        Return the word found in the fraction of the documents closest to
+        the selectivity and its actual selectivity.
+        """
+        target = selectivity * self.document_count
+        term, frequency = min(
+            self.document_frequencies.items(),
+            key=lambda item: (abs(item[1] - target), item[0])
+        )
+        return term, frequency / self.document_count
+
+    def get_cumulative_weights(self):
+        """
+        Return the cumulative Zipf weights of the vocabulary words
+        """
+        total = 0
+        weights = []
+        for rank in range(1, len(self.vocabulary) + 1):
+            total += 1 / rank
+            weights.append(total)
+
+        return weights
+
+
+class SearchBenchmark(object):
+    """
+    Run simple and advanced searches with terms of several selectivities,
+    for users with different access control setups and for several result
+    limits, and collect the latency percentiles, the number of database
+    queries and the growth of the resident memory during each case.
+    """
+    def __init__(self, corpus, repeat=5):
+        self.corpus = corpus
+        self.repeat = repeat
+
+    def create_users(self):
+        """
+        Return a list of (name, user) tuples: a superuser, a user with
+        access to half of the document types and a user with access to a
+        tenth of the documents through per document access entries.
+        """
+        users = [
+            (
+                'superuser', User.objects.create_superuser(
+                    username='benchmark_superuser',
+                    email='superuser@example.com', password='benchmark'
+                )
+            )
+        ]
+
+        document_type_content_type = ContentType.objects.get_for_model(
+            DocumentType
+        )
+        document_content_type = ContentType.objects.get_for_model(Document)
+
+        for name, content_type, object_ids in (
+            (
+                'document_type_acl', document_type_content_type,
+                [
+                    document_type.pk for document_type in
+                    self.corpus.document_types[::2]
+                ]
+            ),
+            (
+                'document_acl', document_content_type,
+                list(
+                    Document.objects.order_by('pk').values_list(
+                        'pk', flat=True
+                    )
+                )[::10]
+            ),
+        ):
+            user = User.objects.create_user(
+                username='benchmark_{}'.format(name),
+                email='{}@example.com'.format(name), password='benchmark'
+            )
+            group = Group.objects.create(name='benchmark_{}'.format(name))
+            user.groups.add(group)
+            role = Role.objects.create(label='benchmark_{}'.format(name))
+            role.groups.add(group)
+
+            for start in range(0, len(object_ids), BENCHMARK_BATCH_SIZE):
+                AccessControlList.objects.bulk_create(
+                    AccessControlList(
+                        content_type=content_type, object_id=object_id,
+                        role=role
+                    ) for object_id in object_ids[
+                        start:start + BENCHMARK_BATCH_SIZE
+                    ]
+                )
+
+            stored_permission = permission_document_view.stored_permission
+            AccessControlList.permissions.through.objects.bulk_create(
+                AccessControlList.permissions.through(
+                    accesscontrollist_id=acl_pk,
+                    storedpermission_id=stored_permission.pk
+                ) for acl_pk in AccessControlList.objects.filter(
+                    role=role
+                ).values_list('pk', flat=True)
+            )
+
+            users.append((name, user))
+
+        return users
+
+    def get_queries(self):
+        """
+        Return a list of (name, selectivity, query string) tuples
+        """
+        queries = []
+
+        for selectivity in BENCHMARK_SELECTIVITIES:
+            term, actual_selectivity = self.corpus.get_term(
+                selectivity=selectivity
+            )
+            queries.extend(
+                (
+                    ('simple', actual_selectivity, {'q': term}),
+                    ('label', actual_selectivity, {'label': term}),
+                    (
+                        'metadata_value', actual_selectivity,
+                        {'metadata__value': term}
+                    ),
+                    (
+                        'content', actual_selectivity,
+                        {'versions__pages__ocr_content__content': term}
+                    ),
+                )
+            )
+
+        common_term, common_selectivity = self.corpus.get_term(
+            selectivity=BENCHMARK_SELECTIVITIES[0]
+        )
+        rare_term, rare_selectivity = self.corpus.get_term(
+            selectivity=BENCHMARK_SELECTIVITIES[-1]
+        )
+        queries.append(
+            (
+                'simple_two_terms', min(common_selectivity, rare_selectivity),
+                {'q': '{} {}'.format(common_term, rare_term)}
+            )
+        )
+
+        return queries
+
+    def run(self):
+        start_time = time.time()
+        self.corpus.create()
+        corpus_time = time.time() - start_time
+
+        backend = document_search.get_backend()
+        index_time = None
+        if backend.supports_indexing:
+            start_time = time.time()
+            document_search.rebuild_index()
+            index_time = time.time() - start_time
+
+        users = self.create_users()
+        results = []
+
+        for limit in BENCHMARK_LIMITS:
+            with override_settings(SEARCH_LIMIT=limit):
+                for query_name, selectivity, query_string in self.get_queries():
+                    for user_name, user in users:
+                        results.append(
+                            self.run_case(
+                                query_name=query_name,
+                                selectivity=selectivity,
+                                query_string=query_string, user=user,
+                                user_name=user_name, limit=limit
+                            )
+                        )
+
+        return {
+            'backend': '{}.{}'.format(
+                backend.__class__.__module__, backend.__class__.__name__
+            ),
+            'cases': results,
+            'corpus': self.corpus.get_parameters(),
+            'corpus_time': corpus_time,
+            'database': connection.vendor,
+            'datetime': datetime.datetime.utcnow().isoformat(),
+            'index_time': index_time,
+            'repeat': self.repeat,
+            'version': mayan.__version__,
+        }
+
+    def run_case(self, query_name, selectivity, query_string, user, user_name, limit):
+        latencies = []
+        query_counts = []
+        memory_start = get_resident_memory()
+
+        for iteration in range(self.repeat):
+            with CaptureQueriesContext(connection) as context:
+                start_time = time.time()
+                results = document_search.search(
+                    query_string=query_string, user=user,
+                    record_search=False
+                )
+                result_count = len(list(results.queryset))
+                latencies.append((time.time() - start_time) * 1000)
+
+            query_counts.append(len(context.captured_queries))
+
+        memory_end = get_resident_memory()
+
+        logger.debug(
+            'query: %s, user: %s, limit: %d, median: %.2f ms', query_name,
+            user_name, limit, get_percentile(latencies, 50)
+        )
+
+        return {
+            'latency_ms': {
+                'max': max(latencies),
+                'mean': sum(latencies) / len(latencies),
+                'min': min(latencies),
+                'p50': get_percentile(latencies, 50),
+                'p90': get_percentile(latencies, 90),
+                'p99': get_percentile(latencies, 99),
+            },
+            'limit': limit,
+            'matches': results.total_count,
+            'memory_delta_kb': (
+                None if memory_start is None or memory_end is None else
+                memory_end - memory_start
+            ),
+            'queries': max(query_counts),
+            'query': query_name,
+            'query_string': query_string,
+            'results': result_count,
+            'selectivity': selectivity,
+            'user': user_name,
+        }
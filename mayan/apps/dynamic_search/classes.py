@@ -1,23 +1,226 @@
 from __future__ import absolute_import, unicode_literals
 
+from collections import Counter
 import datetime
+import hashlib
+import heapq
+import itertools
 import logging
+from operator import attrgetter
 import re
+import threading
+import time
 
 from django.apps import apps
-from django.core.exceptions import PermissionDenied
-from django.db.models import Q
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ObjectDoesNotExist, PermissionDenied
+from django.db import connection, models
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, pre_delete
+from django.utils import timezone
 from django.utils.module_loading import import_string
 
 from acls.models import AccessControlList
+from common.models import CacheGeneration
+from common.settings import settings_db_sync_task_delay
 from permissions import Permission
 
-from .models import RecentSearch
-from .settings import setting_limit
+from .literals import (
+    INDEX_BATCH_SIZE, RANKING_CANDIDATE_FACTOR, RECENT_SEARCH_BUFFER_SIZE,
+    RECENT_SEARCH_FLUSH_INTERVAL, SEARCH_CACHE_GENERATION_KEY, SEARCH_CACHE_KEY_PREFIX,
+    SUGGESTION_CANDIDATE_FACTOR
+)
+from .settings import (
+    setting_backend, setting_cache_timeout, setting_facet_limit,
+    setting_limit, setting_suggestion_limit
+)
+from .tasks import (
+    task_add_recent_searches, task_index_instance, task_remove_index_instance
+)
 
 logger = logging.getLogger(__name__)
 
 
+class SearchBackend(object):
+    """
+    Base class for search backends. A backend receives the parsed query of
+    a search model and returns the primary keys of the matching instances
+    as a list or as a lazy queryset.
+    Backends that keep their own index set supports_indexing and are sent
+    the changes of the indexed instances. Those that set
+    indexes_field_values search the values returned by
+    SearchField.get_values() instead of the database columns.
+    """
+    indexes_field_values = False
+    supports_indexing = False
+    supports_ranking = False
+    supports_suggestions = False
+
+    def search(self, search_model, field_terms, global_and_search=False):
+        raise NotImplementedError(
+            'Your %s class has not defined the required search() method.' %
+            self.__class__.__name__
+        )
+
+    def get_scores(self, search_model, field_terms, global_and_search=False, limit=None, offset=0):
+        """
+        Return a dictionary of the relevance score of the limit best scored
+        matching instance primary keys after skipping the offset best
+        scored. Instances with the same score are ordered by descending
+        primary key. Used instead of search() when the backend sets
+        supports_ranking.
+        """
+        raise NotImplementedError(
+            'Your %s class has not defined the required get_scores() method.' %
+            self.__class__.__name__
+        )
+
+    def get_count(self, search_model, field_terms, global_and_search=False):
+        """
+        Return the number of matching instances.
+        """
+        return len(
+            list(
+                self.search(
+                    search_model=search_model, field_terms=field_terms,
+                    global_and_search=global_and_search
+                )
+            )
+        )
+
+    def get_suggestions(self, search_model, prefix, limit):
+        """
+        Return a list of (term, instance count) tuples of the indexed terms
+        completing the last word of a prefix. Used when the backend sets
+        supports_suggestions.
+        """
+        raise NotImplementedError(
+            'Your %s class has not defined the required get_suggestions() method.' %
+            self.__class__.__name__
+        )
+
+    def get_term_object_ids(self, search_model, term, limit):
+        """
+        Return up to limit primary keys of the instances containing a term
+        returned by get_suggestions().
+        """
+        raise NotImplementedError(
+            'Your %s class has not defined the required get_term_object_ids() method.' %
+            self.__class__.__name__
+        )
+
+    def clear(self, search_model):
+        """
+        Remove all the index entries of a search model.
+        """
+
+    def index_instance(self, search_model, instance):
+        """
+        Add or update the index entry of a search model instance.
+        """
+
+    def index_instances(self, search_model, instances):
+        """
+        Add or update the index entries of a batch of search model
+        instances.
+        """
+        for instance in instances:
+            self.index_instance(search_model=search_model, instance=instance)
+
+    def remove_instance(self, search_model, object_id):
+        """
+        Remove the index entry of a search model instance.
+        """
+
+    def rebuild(self, search_model):
+        """
+        Index all the instances of a search model from scratch, walking
+        the model table in batches of primary keys.
+        """
+        if not self.supports_indexing:
+            return
+
+        self.clear(search_model=search_model)
+
+        queryset = search_model.get_model().objects.order_by('pk')
+        last_pk = 0
+
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:INDEX_BATCH_SIZE])
+
+            if not batch:
+                break
+
+            self.index_instances(search_model=search_model, instances=batch)
+
+            last_pk = batch[-1].pk
+
+
+class RecentSearchBuffer(object):
+    """
+    Collect the searches to remember in memory and store them in batches
+    from a background task, to keep the database writes out of the search
+    requests. The buffer is submitted when it is full, when a timer started
+    by its first entry expires after the flush interval and when the
+    process exits.
+    """
+    _entries = []
+    _lock = threading.Lock()
+    _oldest_time = None
+    _timer = None
+    flush_interval = RECENT_SEARCH_FLUSH_INTERVAL
+
+    @classmethod
+    def add(cls, user, query_string, hits):
+        if not user.is_authenticated():
+            return
+
+        with cls._lock:
+            if not cls._entries:
+                cls._oldest_time = time.time()
+                cls._timer = threading.Timer(cls.flush_interval, cls.flush)
+                cls._timer.daemon = True
+                cls._timer.start()
+
+            cls._entries.append((user.pk, dict(query_string.items()), hits))
+
+            buffer_full = len(cls._entries) >= RECENT_SEARCH_BUFFER_SIZE
+            buffer_expired = (
+                time.time() - cls._oldest_time >= cls.flush_interval
+            )
+
+            if buffer_full or buffer_expired:
+                entries = cls._pop_entries()
+            else:
+                entries = None
+
+        if entries:
+            cls.submit(entries=entries)
+
+    @classmethod
+    def flush(cls):
+        with cls._lock:
+            entries = cls._pop_entries()
+
+        if entries:
+            cls.submit(entries=entries)
+
+    @classmethod
+    def _pop_entries(cls):
+        if cls._timer:
+            cls._timer.cancel()
+            cls._timer = None
+
+        entries = cls._entries
+        cls._entries = []
+        return entries
+
+    @staticmethod
+    def submit(entries):
+        task_add_recent_searches.apply_async(kwargs={'entries': entries})
+
+
 class SearchModel(object):
     registry = {}
 
@@ -33,6 +236,7 @@ class SearchModel(object):
         self.app_label = app_label
         self.model_name = model_name
         self.search_fields = []
+        self.search_facets = []
         self.model = None  # Lazy
         self.label = label
         self.serializer_string = serializer_string
@@ -45,6 +249,16 @@ class SearchModel(object):
     def get_all_search_fields(self):
         return self.search_fields
 
+    def get_all_search_facets(self):
+        return self.search_facets
+
+    def get_search_facet(self, name):
+        for search_facet in self.search_facets:
+            if search_facet.name == name:
+                return search_facet
+
+        raise KeyError('No search facet named: %s' % name)
+
     def get_search_field(self, full_name):
         try:
             return self.search_fields[full_name]
@@ -68,6 +282,13 @@ class SearchModel(object):
         search_field = SearchField(self, *args, **kwargs)
         self.search_fields.append(search_field)
 
+    def add_facet(self, *args, **kwargs):
+        """
+        Add a facet to count the search results per value of a field
+        """
+        search_facet = SearchFacet(self, *args, **kwargs)
+        self.search_facets.append(search_facet)
+
     def normalize_query(self, query_string,
                         findterms=re.compile(r'"([^"]+)"|(\S+)').findall,
                         normspace=re.compile(r'\s{2,}').sub):
@@ -82,124 +303,607 @@ class SearchModel(object):
             normspace(' ', (t[0] or t[1]).strip()) for t in findterms(query_string)
         ]
 
-    def search(self, query_string, user, global_and_search=False):
-        elapsed_time = 0
-        start_time = datetime.datetime.now()
-        result_set = set()
-        search_dict = {}
-
+    def get_model(self):
         if not self.model:
             self.model = apps.get_model(self.app_label, self.model_name)
             if not self.label:
                 self.label = self.model._meta.verbose_name
 
+        return self.model
+
+    def get_backend(self):
+        return import_string(setting_backend.value)()
+
+    def get_field_terms(self, query_string):
+        """
+        Return a list of (search field, terms) tuples for the fields
+        referenced by the query string. A simple search ('q') applies the
+        same terms to all the fields.
+        """
+        field_terms = []
+
         if 'q' in query_string:
             # Simple search
+            terms = self.normalize_query(query_string.get('q', '').strip())
             for search_field in self.get_all_search_fields():
-                search_dict.setdefault(search_field.get_model(), {
-                    'searches': [],
-                    'label': search_field.label,
-                    'return_value': search_field.return_value
-                })
-                search_dict[search_field.get_model()]['searches'].append(
-                    {
-                        'field_name': [search_field.field],
-                        'terms': self.normalize_query(
-                            query_string.get('q', '').strip()
-                        )
-                    }
-                )
+                field_terms.append((search_field, terms))
         else:
-
             for search_field in self.get_all_search_fields():
                 if search_field.field in query_string and query_string[search_field.field]:
-                    search_dict.setdefault(search_field.get_model(), {
-                        'searches': [],
-                        'label': search_field.label,
-                        'return_value': search_field.return_value
-                    })
-                    search_dict[search_field.get_model()]['searches'].append(
-                        {
-                            'field_name': [search_field.field],
-                            'terms': self.normalize_query(
+                    field_terms.append(
+                        (
+                            search_field,
+                            self.normalize_query(
                                 query_string[search_field.field]
                             )
-                        }
+                        )
                     )
 
-        for model, data in search_dict.items():
-            logger.debug('model: %s', model)
+        return field_terms
 
-            # Initialize per model result set
-            model_result_set = set()
+    def search(self, query_string, user, global_and_search=False, facets=False, record_search=True, offset=0, limit=None):
+        """
+        Return a SearchResults instance with the limit instances, by
+        default SEARCH_LIMIT, matching the query that the user has access
+        to after skipping the offset first ones. When facets is True the
+        facet counts of the accessible matches are computed too. The
+        ordered primary keys of the results are fetched in multiples of
+        SEARCH_LIMIT and cached per query and user groups, later requests
+        of the same search, like the other pages of the results, are
+        served from the cache until an indexed instance or an access
+        control changes. The cached results are checked again against the
+        access of the user. When record_search is False the query is not
+        added to the recent searches of the user. The number of accessible
+        matches is estimated when a ranking backend has more matches than
+        the candidates checked for access and for cached results, where
+        the matches that are no longer accessible are only known among the
+        returned ones.
+        """
+        elapsed_time = 0
+        start_time = datetime.datetime.now()
 
-            for query_entry in data['searches']:
-                # Fashion a list of queries for a field for each term
-                field_query_list = self.assemble_query(
-                    query_entry['terms'], query_entry['field_name']
-                )
+        self.get_model()
+
+        search_limit = setting_limit.value
+        limit = limit or search_limit
+        # Fetch whole multiples of SEARCH_LIMIT to serve the next pages of
+        # the results from the cache
+        fetch_limit = (
+            (offset + limit + search_limit - 1) // search_limit
+        ) * search_limit
+
+        field_terms = self.get_field_terms(query_string=query_string)
+        facet_values = self.get_facet_values(query_string=query_string)
+        cache_key = self.get_cache_key(
+            field_terms=field_terms, user=user,
+            global_and_search=global_and_search, facet_values=facet_values
+        )
+
+        cached_results = None
+        if cache_key:
+            cached_results = caches['default'].get(cache_key)
+            if cached_results and facets and cached_results[2] is None:
+                # Cached without the facet counts
+                cached_results = None
+            elif cached_results and len(cached_results[0]) < min(offset + limit, cached_results[3]):
+                # Cached without enough results
+                cached_results = None
 
-                logger.debug('field_query_list: %s', field_query_list)
+        if cached_results:
+            object_ids, scores, facet_counts, total_count = cached_results
 
-                # Initialize per field result set
-                field_result_set = set()
+            if facet_counts is not None:
+                facet_counts = [
+                    (self.get_search_facet(name=name), counts)
+                    for name, counts in facet_counts
+                ]
 
-                # Get results per search field
-                for query in field_query_list:
-                    logger.debug('query: %s', query)
-                    term_query_result_set = set(
-                        model.objects.filter(query).values_list(
-                            data['return_value'], flat=True
+            # The cached results are shared by the users of the same
+            # groups, keep only those this user has access to
+            object_ids = object_ids[offset:offset + limit]
+            accessible_ids = set(
+                self.get_accessible_queryset(
+                    result_set=object_ids, user=user
+                ).values_list('pk', flat=True)
+            )
+            total_count -= len(object_ids) - len(accessible_ids)
+            object_ids = [
+                object_id for object_id in object_ids
+                if object_id in accessible_ids
+            ]
+        else:
+            backend = self.get_backend()
+            facet_filter = self.get_facet_filter(facet_values=facet_values)
+
+            if backend.supports_ranking:
+                # Check the access of windows of the best scored matches,
+                # doubling their size, until enough of them are accessible
+                # or the matches run out
+                candidate_limit = fetch_limit * RANKING_CANDIDATE_FACTOR
+                scores = {}
+                accessible_ids = []
+                querysets = []
+
+                while True:
+                    window_scores = backend.get_scores(
+                        search_model=self, field_terms=field_terms,
+                        global_and_search=global_and_search,
+                        limit=candidate_limit, offset=len(scores)
+                    )
+                    scores.update(window_scores)
+                    result_set = window_scores.keys()
+
+                    # Check access in batches to keep the number of query
+                    # parameters bounded
+                    window_querysets = [
+                        self.get_accessible_queryset(
+                            result_set=result_set[index:index + INDEX_BATCH_SIZE],
+                            user=user, facet_filter=facet_filter
+                        ) for index in range(0, len(result_set), INDEX_BATCH_SIZE)
+                    ]
+                    querysets.extend(window_querysets)
+                    accessible_ids.extend(
+                        itertools.chain.from_iterable(
+                            queryset.values_list('pk', flat=True)
+                            for queryset in window_querysets
                         )
                     )
 
-                    # Convert the QuerySet to a Python set and perform the
-                    # AND operation on the program and not as a query.
-                    # This operation ANDs all the field term results
-                    # belonging to a single model, making sure to only include
-                    # results in the final field result variable if all the
-                    # terms are found in a single field.
-                    if not field_result_set:
-                        field_result_set = term_query_result_set
-                    else:
-                        field_result_set &= term_query_result_set
-
-                    logger.debug(
-                        'term_query_result_set: %s', term_query_result_set
+                    if len(window_scores) < candidate_limit:
+                        total_count = len(accessible_ids)
+                        break
+                    elif len(accessible_ids) >= fetch_limit:
+                        # Estimate the accessible matches beyond the
+                        # candidates from the accessible fraction of the
+                        # candidates
+                        total_count = int(
+                            round(
+                                backend.get_count(
+                                    search_model=self, field_terms=field_terms,
+                                    global_and_search=global_and_search
+                                ) * len(accessible_ids) / float(len(scores))
+                            )
+                        )
+                        break
+
+                    candidate_limit *= 2
+
+                object_ids = heapq.nlargest(
+                    fetch_limit, accessible_ids,
+                    key=lambda object_id: (scores[object_id], object_id)
+                )
+                scores = dict(
+                    (object_id, scores[object_id]) for object_id in object_ids
+                )
+            else:
+                scores = None
+                result_set = backend.search(
+                    search_model=self, field_terms=field_terms,
+                    global_and_search=global_and_search
+                )
+
+                # The access control filter and the ordering are part of
+                # the same query, so the limit is applied after removing
+                # the instances the user can't see
+                querysets = [
+                    self.get_accessible_queryset(
+                        result_set=result_set, user=user,
+                        facet_filter=facet_filter
                     )
-                    logger.debug('field_result_set: %s', field_result_set)
+                ]
+
+                ordering = tuple(self.model._meta.ordering) + ('-pk',)
+                object_ids = list(
+                    querysets[0].order_by(*ordering).values_list(
+                        'pk', flat=True
+                    )[:fetch_limit]
+                )
+
+                # Count the matches only when they don't all fit the limit
+                if len(object_ids) < fetch_limit:
+                    total_count = len(object_ids)
+                else:
+                    total_count = querysets[0].count()
+
+            if facets:
+                facet_counts = self.get_facet_counts(querysets=querysets)
+            else:
+                facet_counts = None
 
-                if global_and_search:
-                    if not model_result_set:
-                        model_result_set = field_result_set
-                    else:
-                        model_result_set &= field_result_set
+            if cache_key:
+                # Cache the facet names, the facets reference the search
+                # model and its fields
+                if facet_counts is None:
+                    cached_facet_counts = None
                 else:
-                    model_result_set |= field_result_set
+                    cached_facet_counts = [
+                        (search_facet.name, counts)
+                        for search_facet, counts in facet_counts
+                    ]
+
+                caches['default'].set(
+                    cache_key, (
+                        object_ids, scores, cached_facet_counts, total_count
+                    ), setting_cache_timeout.value
+                )
 
-            result_set = result_set | model_result_set
+            object_ids = object_ids[offset:offset + limit]
+
+        queryset = self.get_ordered_queryset(
+            object_ids=object_ids, scores=scores
+        )
 
         elapsed_time = unicode(
             datetime.datetime.now() - start_time
         ).split(':')[2]
 
-        queryset = self.model.objects.filter(
-            pk__in=list(result_set)[:setting_limit.value]
+        if record_search and not cached_results:
+            RecentSearchBuffer.add(
+                user=user, query_string=query_string, hits=total_count
+            )
+
+        return SearchResults(
+            search_model=self, query_string=query_string, user=user,
+            global_and_search=global_and_search, offset=offset,
+            queryset=queryset, object_ids=object_ids,
+            elapsed_time=elapsed_time, facet_counts=facet_counts,
+            total_count=total_count
+        )
+
+    def get_suggestions(self, prefix, user, limit=None):
+        """
+        Return a list of (term, instance count) tuples of the indexed terms
+        completing the last word of a prefix, for search as you type. The
+        terms that are only found in instances the user has no access to
+        are not suggested.
+        """
+        backend = self.get_backend()
+        limit = limit or setting_suggestion_limit.value
+
+        if not backend.supports_suggestions or not prefix.strip():
+            return []
+
+        self.get_model()
+
+        candidates = backend.get_suggestions(
+            search_model=self, prefix=prefix,
+            limit=limit * SUGGESTION_CANDIDATE_FACTOR
+        )
+
+        try:
+            if self.permission:
+                Permission.check_permissions(user, [self.permission])
+        except PermissionDenied:
+            suggestions = []
+
+            for term, frequency in candidates:
+                queryset = self.filter_by_access(
+                    queryset=self.model.objects.filter(
+                        pk__in=backend.get_term_object_ids(
+                            search_model=self, term=term,
+                            limit=INDEX_BATCH_SIZE
+                        )
+                    ), user=user
+                )
+
+                if queryset.exists():
+                    suggestions.append((term, frequency))
+                    if len(suggestions) == limit:
+                        break
+
+            return suggestions
+        else:
+            return candidates[:limit]
+
+    def get_accessible_queryset(self, result_set, user, facet_filter=None):
+        """
+        Return a queryset of the instances of the primary keys returned by
+        a backend that the user has access to, narrowed by the selected
+        facet values.
+        """
+        queryset = self.model.objects.filter(pk__in=result_set)
+
+        if facet_filter:
+            queryset = queryset.filter(facet_filter)
+
+        return self.filter_by_access(queryset=queryset, user=user)
+
+    def get_facet_values(self, query_string):
+        """
+        Return a list of (search facet, value) tuples of the facet values
+        selected in the query string.
+        """
+        facet_values = []
+
+        for search_facet in self.get_all_search_facets():
+            value = query_string.get(search_facet.get_query_key())
+            if value and (not search_facet.by_year or value.isdigit()):
+                facet_values.append((search_facet, value))
+
+        return facet_values
+
+    def get_facet_filter(self, facet_values):
+        if not facet_values:
+            return None
+
+        query = Q()
+        for search_facet, value in facet_values:
+            query &= search_facet.get_filter(value=value)
+
+        # Filter with a subquery to avoid duplicated results when the facet
+        # field is multi valued
+        return Q(pk__in=self.model.objects.filter(query).values('pk'))
+
+    def get_facet_counts(self, querysets):
+        """
+        Return a list of (search facet, [(value, count), ...]) tuples with
+        the SEARCH_FACET_LIMIT values with the most results of each facet.
+        The counts of each queryset are added together.
+        """
+        facet_counts = []
+
+        for search_facet in self.get_all_search_facets():
+            if len(querysets) == 1:
+                counts = search_facet.get_counts(
+                    queryset=querysets[0], limit=setting_facet_limit.value
+                )
+            else:
+                counter = Counter()
+                for queryset in querysets:
+                    counter.update(
+                        dict(search_facet.get_counts(queryset=queryset))
+                    )
+
+                counts = sorted(
+                    counter.items(), key=lambda item: (-item[1], item[0])
+                )[:setting_facet_limit.value]
+
+            facet_counts.append((search_facet, counts))
+
+        return facet_counts
+
+    def get_cache_key(self, field_terms, user, global_and_search, facet_values=()):
+        """
+        Return the key of the cached results of a search or None if the
+        search must not be cached. Users with the same groups share the same
+        access and the same cached results.
+        """
+        if not setting_cache_timeout.value or not user.is_authenticated():
+            return None
+
+        if user.is_superuser or user.is_staff:
+            access = 'all'
+        else:
+            access = ','.join(
+                sorted(
+                    unicode(pk) for pk in user.groups.values_list(
+                        'pk', flat=True
+                    )
+                )
+            )
+
+        key = '\n'.join(
+            [
+                self.get_full_name(), setting_backend.value,
+                unicode(setting_limit.value),
+                unicode(self.get_cache_generation()), access,
+                unicode(global_and_search)
+            ] + [
+                '{}:{}'.format(search_field.field, '\t'.join(terms))
+                for search_field, terms in field_terms
+            ] + [
+                '{}={}'.format(search_facet.get_query_key(), value)
+                for search_facet, value in facet_values
+            ]
+        )
+
+        return '{}{}'.format(
+            SEARCH_CACHE_KEY_PREFIX,
+            hashlib.sha256(key.encode('utf-8')).hexdigest()
+        )
+
+    @staticmethod
+    def get_cache_generation():
+        # Stored in the database to be shared by all the processes
+        return CacheGeneration.objects.get_value(
+            name=SEARCH_CACHE_GENERATION_KEY
         )
 
+    @staticmethod
+    def invalidate_cache(**kwargs):
+        """
+        Invalidate the cached results of all the searches. Accepts the
+        arguments of a signal to be used as a signal receiver.
+        """
+        CacheGeneration.objects.increment(name=SEARCH_CACHE_GENERATION_KEY)
+
+    def get_ordered_queryset(self, object_ids, scores=None):
+        """
+        Return a queryset of the instances of a list of primary keys. When
+        the scores of the instances are provided the queryset is ordered by
+        relevance and each instance has its score in the search_score
+        attribute, otherwise the model ordering is used.
+        """
+        if not object_ids:
+            return self.model.objects.none()
+
+        queryset = self.model.objects.filter(pk__in=object_ids)
+
+        if scores is None:
+            ordering = tuple(self.model._meta.ordering) + ('-pk',)
+            return queryset.order_by(*ordering)
+
+        pk_column = '{}.{}'.format(
+            connection.ops.quote_name(self.model._meta.db_table),
+            connection.ops.quote_name(self.model._meta.pk.column)
+        )
+        score_parameters = []
+        for object_id in object_ids:
+            score_parameters.extend((object_id, scores[object_id]))
+
+        return queryset.extra(
+            select={
+                'search_score': 'CASE {} {} ELSE 0 END'.format(
+                    pk_column, ' '.join(['WHEN %s THEN %s'] * len(object_ids))
+                )
+            }, select_params=score_parameters,
+            order_by=('-search_score', '-pk')
+        )
+
+    def filter_by_access(self, queryset, user):
         if self.permission:
             try:
                 Permission.check_permissions(user, [self.permission])
             except PermissionDenied:
-                queryset = AccessControlList.objects.filter_by_access(
+                return AccessControlList.objects.filter_by_access(
                     self.permission, user, queryset
                 )
 
-        RecentSearch.objects.add_query_for_user(
-            user, query_string, len(result_set)
+        return queryset
+
+    def add_index_trigger(self, signal, sender=None, accessor=None, remove=False):
+        """
+        Update the search index entry of an instance of this search model
+        when a signal is sent. accessor is the dotted attribute path from
+        the signal instance to the instance of the search model, or to a
+        manager of several of them. When remove is True the entry is
+        removed from the search index. For m2m_changed signals the
+        instances of this search model added to or removed from the
+        relation are updated.
+        """
+        def handler(sender, instance, **kwargs):
+            self.invalidate_cache()
+
+            if not self.get_backend().supports_indexing:
+                return
+
+            if 'action' in kwargs:
+                object_ids = self.get_m2m_changed_object_ids(
+                    instance=instance, accessor=accessor, **kwargs
+                )
+            else:
+                try:
+                    if accessor:
+                        instance = attrgetter(accessor)(instance)
+                except ObjectDoesNotExist:
+                    # The related instance is being deleted
+                    return
+
+                if isinstance(instance, models.Manager):
+                    object_ids = instance.values_list('pk', flat=True)
+                else:
+                    object_ids = (instance.pk,)
+
+            self.update_index_entries(object_ids=object_ids, remove=remove)
+
+        signal.connect(
+            handler, sender=sender, weak=False, dispatch_uid='{}_{}_{}_{}'.format(
+                self.get_full_name(), id(signal), sender, accessor
+            )
+        )
+
+    def add_delete_index_trigger(self, sender, accessor):
+        """
+        Update the search index entries of the instances of this search
+        model related to an instance of sender when it is deleted.
+        accessor is the name of the manager of the related instances. Their
+        primary keys are collected before the deletion removes the
+        relations and the entries are updated after it.
+        """
+        attribute_name = '_search_object_ids_{}'.format(
+            self.get_full_name().replace('.', '_')
         )
 
-        return queryset, result_set, elapsed_time
+        def collect_handler(sender, instance, **kwargs):
+            setattr(
+                instance, attribute_name, list(
+                    getattr(instance, accessor).values_list('pk', flat=True)
+                )
+            )
+
+        def update_handler(sender, instance, **kwargs):
+            self.invalidate_cache()
+
+            if self.get_backend().supports_indexing:
+                self.update_index_entries(
+                    object_ids=getattr(instance, attribute_name, ())
+                )
+
+        dispatch_uid = '{}_{}_{}'.format(self.get_full_name(), sender, accessor)
+        pre_delete.connect(
+            collect_handler, sender=sender, weak=False,
+            dispatch_uid='{}_pre_delete'.format(dispatch_uid)
+        )
+        post_delete.connect(
+            update_handler, sender=sender, weak=False,
+            dispatch_uid='{}_post_delete'.format(dispatch_uid)
+        )
+
+    def update_index_entries(self, object_ids, remove=False):
+        """
+        Queue the update, or the removal when remove is True, of the search
+        index entries of a list of primary keys.
+        """
+        for object_id in object_ids:
+            if remove:
+                task_remove_index_instance.apply_async(
+                    kwargs={
+                        'search_model_name': self.get_full_name(),
+                        'object_id': object_id
+                    }
+                )
+            else:
+                task_index_instance.apply_async(
+                    kwargs={
+                        'search_model_name': self.get_full_name(),
+                        'object_id': object_id
+                    }, countdown=settings_db_sync_task_delay.value
+                )
+
+    def get_m2m_changed_object_ids(self, instance, accessor, action, pk_set, **kwargs):
+        """
+        Return the primary keys of the instances of this search model
+        changed by an m2m_changed signal.
+        """
+        if isinstance(instance, self.get_model()):
+            if action in ('post_add', 'post_remove', 'post_clear'):
+                return (instance.pk,)
+        elif action in ('post_add', 'post_remove'):
+            return pk_set
+        elif action == 'pre_clear':
+            # The related instances are no longer known after the clear,
+            # the indexing tasks run after the database sync delay
+            return list(
+                attrgetter(accessor)(instance).values_list('pk', flat=True)
+            )
+
+        return ()
+
+    def index_instance(self, object_id):
+        """
+        Update the search index entry of the instance with the given
+        primary key or remove it if the instance no longer exists.
+        """
+        backend = self.get_backend()
+
+        try:
+            instance = self.get_model().objects.get(pk=object_id)
+        except self.model.DoesNotExist:
+            backend.remove_instance(search_model=self, object_id=object_id)
+        else:
+            backend.index_instance(search_model=self, instance=instance)
+
+        self.invalidate_cache()
+
+    def remove_index_instance(self, object_id):
+        self.get_backend().remove_instance(
+            search_model=self, object_id=object_id
+        )
+        self.invalidate_cache()
+
+    def rebuild_index(self):
+        self.get_backend().rebuild(search_model=self)
+        self.invalidate_cache()
 
     def assemble_query(self, terms, search_fields):
         """
@@ -222,18 +926,171 @@ class SearchModel(object):
 
 
 # SearchField classes
+class SearchResults(object):
+    """
+    Results of SearchModel.search(). queryset and object_ids are the
+    instances and the primary keys of the window of the ordered results
+    selected by the offset and the limit, total_count is the number of all
+    the accessible matches and facet_counts is None unless the facet counts
+    were requested. Iterating returns the instances of the window. Slicing
+    returns the instances of any window of the results, searching again
+    when they are outside of this one, and count() returns total_count, so
+    that paginators can page through all the matches.
+    """
+    def __init__(self, search_model, query_string, user, global_and_search, offset, queryset, object_ids, elapsed_time, facet_counts, total_count):
+        self.search_model = search_model
+        self.query_string = query_string
+        self.user = user
+        self.global_and_search = global_and_search
+        self.offset = offset
+        self.queryset = queryset
+        self.object_ids = object_ids
+        self.elapsed_time = elapsed_time
+        self.facet_counts = facet_counts
+        self.total_count = total_count
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            try:
+                return self[key:key + 1][0]
+            except IndexError:
+                raise IndexError('Search result index out of range.')
+
+        start, stop, step = key.indices(self.total_count)
+
+        if start >= self.offset and stop <= self.offset + len(self.object_ids):
+            results = list(
+                self.queryset[start - self.offset:stop - self.offset]
+            )
+        elif stop > start:
+            results = list(
+                self.search_model.search(
+                    query_string=self.query_string, user=self.user,
+                    global_and_search=self.global_and_search,
+                    record_search=False, offset=start, limit=stop - start
+                ).queryset
+            )
+        else:
+            results = []
+
+        return results[::step]
+
+    def __iter__(self):
+        return iter(self.queryset)
+
+    def count(self):
+        return self.total_count
+
+
 class SearchField(object):
     """
     Search for terms in fields that directly belong to the parent SearchModel
+    The weight multiplies the relevance of the matches in this field when
+    the search backend ranks the results. Fields with trigram set use a
+    trigram index for substring searches when the backend supports it.
+    values_function replaces the values read from the field column when
+    indexing, it receives a list of primary keys and returns (primary key,
+    value) tuples. It must be a module level function, bound methods
+    can't be pickled.
     """
-    def __init__(self, search_model, field, label):
+    def __init__(self, search_model, field, label, weight=1, trigram=False, values_function=None):
         self.search_model = search_model
         self.field = field
         self.label = label
         self.return_value = 'pk'
+        self.weight = weight
+        self.trigram = trigram
+        self.values_function = values_function
 
     def get_full_name(self):
         return self.field
 
     def get_model(self):
         return self.search_model.model
+
+    def get_values(self, object_ids):
+        """
+        Return (primary key, value) tuples of the field values of the
+        instances of a list of primary keys.
+        """
+        if self.values_function:
+            return self.values_function(object_ids)
+
+        return self.search_model.get_model().objects.filter(
+            pk__in=object_ids
+        ).values_list('pk', self.field)
+
+
+class SearchFacet(object):
+    """
+    Count the search results per distinct value of a field. When by_year is
+    True the field is a date and the results are counted per year.
+    """
+    def __init__(self, search_model, name, label, field, by_year=False):
+        self.search_model = search_model
+        self.name = name
+        self.label = label
+        self.field = field
+        self.by_year = by_year
+
+    def __unicode__(self):
+        return unicode(self.label)
+
+    def get_query_key(self):
+        return 'facet_{}'.format(self.name)
+
+    def get_filter(self, value):
+        if self.by_year:
+            return Q(**{'{}__year'.format(self.field): value})
+        else:
+            return Q(**{self.field: value})
+
+    def get_counts(self, queryset, limit=None):
+        """
+        Return a list of (value, count) tuples sorted by descending count
+        """
+        if self.by_year:
+            model_field = queryset.model._meta.get_field(self.field)
+            column = '{}.{}'.format(
+                connection.ops.quote_name(queryset.model._meta.db_table),
+                connection.ops.quote_name(model_field.column)
+            )
+
+            if isinstance(model_field, models.DateTimeField):
+                if settings.USE_TZ:
+                    timezone_name = timezone.get_current_timezone_name()
+                else:
+                    timezone_name = None
+
+                sql, parameters = connection.ops.datetime_extract_sql(
+                    'year', column, timezone_name
+                )
+            else:
+                sql = connection.ops.date_extract_sql('year', column)
+                parameters = ()
+
+            queryset = queryset.extra(
+                select={'facet_value': sql}, select_params=parameters
+            )
+            value_field = 'facet_value'
+        else:
+            value_field = self.field
+
+        values = queryset.values(value_field).annotate(
+            facet_count=Count('pk', distinct=True)
+        ).order_by('-facet_count', value_field)
+
+        if limit:
+            values = values[:limit]
+
+        counts = [
+            (entry[value_field], entry['facet_count']) for entry in values
+            if entry[value_field] is not None
+        ]
+
+        if self.by_year:
+            # Some databases, like PostgreSQL, extract the year as a
+            # floating point number
+            counts = [(int(value), count) for value, count in counts]
+
+        return counts
@@ -0,0 +1,34 @@
+from __future__ import unicode_literals
+
+# Documents created per batch by the search benchmark, search result limits
+# and fractions of the documents matched by the terms it measures
+BENCHMARK_BATCH_SIZE = 500
+BENCHMARK_LIMITS = (10, 100, 1000)
+BENCHMARK_SELECTIVITIES = (0.5, 0.05, 0.005)
+
+INDEX_BATCH_SIZE = 500
+INDEX_CONNECTION_TIMEOUT = 30
+
+# BM25 term frequency saturation and field length normalization
+RANKING_BM25_B = 0.75
+RANKING_BM25_K1 = 1.2
+
+# Best scored matches checked for access per search result returned
+RANKING_CANDIDATE_FACTOR = 10
+
+# Searches kept in memory before storing them as recent searches and
+# maximum seconds they are kept
+RECENT_SEARCH_BUFFER_SIZE = 50
+RECENT_SEARCH_FLUSH_INTERVAL = 10
+
+SEARCH_CACHE_GENERATION_KEY = 'dynamic_search_cache_generation'
+SEARCH_CACHE_KEY_PREFIX = 'dynamic_search_results_'
+
+# Candidate suggestions fetched per suggestion returned, to have enough of
+# them after removing the terms of inaccessible instances
+SUGGESTION_CANDIDATE_FACTOR = 3
+
+# Shortest prefix for which misspelled terms are suggested and number of
+# most frequent terms checked for misspellings
+SUGGESTION_FUZZY_MIN_LENGTH = 3
+SUGGESTION_FUZZY_SCAN_LIMIT = 5000
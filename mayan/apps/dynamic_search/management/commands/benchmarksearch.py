@@ -0,0 +1,106 @@
+from __future__ import unicode_literals
+
+import json
+from optparse import make_option
+import os
+import tempfile
+
+from django.core import management
+from django.db import connection
+from django.test.utils import override_settings
+
+from ...benchmarks import SearchBenchmark, SyntheticCorpus
+
+
+class Command(management.BaseCommand):
+    help = (
+        'Measure the search performance on a synthetic corpus created in a '
+        'temporary test database and output the results as JSON.'
+    )
+
+    option_list = management.BaseCommand.option_list + (
+        make_option(
+            '--documents', action='store', dest='documents', type='int',
+            default=1000, help='Number of documents to create.'
+        ),
+        make_option(
+            '--document-types', action='store', dest='document_types',
+            type='int', default=10, help='Number of document types to create.'
+        ),
+        make_option(
+            '--metadata', action='store', dest='metadata', type='int',
+            default=3, help='Number of metadata values per document.'
+        ),
+        make_option(
+            '--pages', action='store', dest='pages', type='int', default=1,
+            help='Number of pages per document.'
+        ),
+        make_option(
+            '--words', action='store', dest='words', type='int', default=200,
+            help='Number of words of the text of each page.'
+        ),
+        make_option(
+            '--vocabulary', action='store', dest='vocabulary', type='int',
+            default=5000, help='Number of distinct words of the corpus.'
+        ),
+        make_option(
+            '--repeat', action='store', dest='repeat', type='int', default=5,
+            help='Number of times each search is measured.'
+        ),
+        make_option(
+            '--seed', action='store', dest='seed', type='int', default=0,
+            help='Seed of the random corpus generator.'
+        ),
+        make_option(
+            '--backend', action='store', dest='backend',
+            help='Full path of the search backend to measure instead of '
+            'the configured one.'
+        ),
+        make_option(
+            '--output', action='store', dest='output',
+            help='File to write the results to instead of the standard '
+            'output.'
+        ),
+    )
+
+    def handle(self, *args, **options):
+        corpus = SyntheticCorpus(
+            documents=options['documents'],
+            document_types=options['document_types'],
+            metadata=options['metadata'], pages=options['pages'],
+            words=options['words'], vocabulary=options['vocabulary'],
+            seed=options['seed']
+        )
+
+        overrides = {'SEARCH_CACHE_TIMEOUT': 0}
+        if options['backend']:
+            overrides['SEARCH_BACKEND'] = options['backend']
+
+        file_descriptor, overrides['SEARCH_INDEX_PATH'] = tempfile.mkstemp(
+            suffix='.sqlite3'
+        )
+        os.close(file_descriptor)
+
+        old_database_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+
+        try:
+            with override_settings(**overrides):
+                results = SearchBenchmark(
+                    corpus=corpus, repeat=options['repeat']
+                ).run()
+        finally:
+            connection.creation.destroy_test_db(
+                old_database_name, verbosity=0
+            )
+            os.unlink(overrides['SEARCH_INDEX_PATH'])
+
+        output = json.dumps(results, indent=2, sort_keys=True)
+
+        if options['output']:
+            with open(options['output'], 'w') as file_object:
+                file_object.write(output)
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,18 @@
+from __future__ import unicode_literals
+
+from django.core import management
+
+from ...classes import SearchModel
+
+
+class Command(management.BaseCommand):
+    help = 'Build the search index of all the search models from scratch.'
+
+    def handle(self, *args, **options):
+        for search_model in SearchModel.registry.values():
+            self.stdout.write(
+                'Rebuilding search index of: {}'.format(
+                    search_model.get_full_name()
+                )
+            )
+            search_model.rebuild_index()
@@ -1,14 +1,33 @@
 import urlparse
 
-from django.contrib.auth.models import AnonymousUser
-from django.db import models
+from django.contrib.auth.models import AnonymousUser, User
+from django.db import models, transaction
+from django.utils.encoding import force_text
 from django.utils.http import urlencode
 
 from .settings import setting_recent_count
 
 
 class RecentSearchManager(models.Manager):
-    def add_query_for_user(self, user, query_string, hits):
+    def add_queries(self, entries):
+        """
+        Store a batch of (user primary key, query string, hits) entries in
+        a single transaction, older entries first.
+        """
+        users = User.objects.in_bulk(set(entry[0] for entry in entries))
+
+        with transaction.atomic():
+            for user_pk, query_string, hits in entries:
+                if user_pk in users:
+                    self.add_query_for_user(
+                        user=users[user_pk], query_string=query_string,
+                        hits=hits, trim=False
+                    )
+
+            for user in users.values():
+                self.trim_for_user(user=user)
+
+    def add_query_for_user(self, user, query_string, hits, trim=True):
         parsed_query = urlparse.parse_qs(
             urlencode(dict(query_string.items()))
         )
@@ -36,5 +55,74 @@ class RecentSearchManager(models.Manager):
                 new_recent.hits = hits
                 new_recent.save()
 
-            for recent_to_delete in self.model.objects.filter(user=user)[setting_recent_count.value:]:
-                recent_to_delete.delete()
+            if trim:
+                self.trim_for_user(user=user)
+
+    def trim_for_user(self, user):
+        """
+        Delete the queries of a user beyond the SEARCH_RECENT_COUNT most
+        recent ones.
+        """
+        self.model.objects.filter(user=user).exclude(
+            pk__in=list(
+                self.model.objects.filter(user=user).values_list(
+                    'pk', flat=True
+                )[:setting_recent_count.value]
+            )
+        ).delete()
+
+
+def get_trigrams(text):
+    """
+    Return the set of the lower case three character substrings of a text
+    """
+    text = text.lower()
+    return set(text[index:index + 3] for index in range(len(text) - 2))
+
+
+class SearchTrigramManager(models.Manager):
+    def get_object_ids(self, search_model, field, trigram):
+        """
+        Return a lazy queryset of the primary keys of the instances whose
+        field contains a trigram, to be used as a subquery.
+        """
+        return self.filter(
+            search_model=search_model.get_full_name(), field=field,
+            trigram=trigram
+        ).values('object_id')
+
+    def remove_instance(self, search_model, object_id):
+        self.filter(
+            search_model=search_model.get_full_name(), object_id=object_id
+        ).delete()
+
+    def set_instance_trigrams(self, search_model, instance, fields):
+        """
+        Replace the trigrams of the values of the given fields of an
+        instance.
+        """
+        model = search_model.get_model()
+        entries = []
+
+        for field in fields:
+            trigrams = set()
+            values = model.objects.filter(pk=instance.pk).values_list(
+                field, flat=True
+            )
+
+            for value in values:
+                if value:
+                    trigrams.update(get_trigrams(force_text(value)))
+
+            entries.extend(
+                self.model(
+                    search_model=search_model.get_full_name(), field=field,
+                    trigram=trigram, object_id=instance.pk
+                ) for trigram in trigrams
+            )
+
+        with transaction.atomic():
+            self.remove_instance(
+                search_model=search_model, object_id=instance.pk
+            )
+            self.bulk_create(entries)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dynamic_search', '0002_auto_20150920_0202'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTrigram',
+            fields=[
+                (
+                    'id', models.AutoField(
+                        verbose_name='ID', serialize=False, auto_created=True,
+                        primary_key=True
+                    )
+                ),
+                (
+                    'search_model', models.CharField(
+                        max_length=128, verbose_name='Search model'
+                    )
+                ),
+                (
+                    'field', models.CharField(
+                        max_length=255, verbose_name='Field'
+                    )
+                ),
+                (
+                    'trigram', models.CharField(
+                        max_length=3, verbose_name='Trigram'
+                    )
+                ),
+                (
+                    'object_id', models.PositiveIntegerField(
+                        verbose_name='Object ID'
+                    )
+                ),
+            ],
+            options={
+                'verbose_name': 'Search trigram',
+                'verbose_name_plural': 'Search trigrams',
+            },
+            bases=(models.Model,),
+        ),
+        migrations.AlterIndexTogether(
+            name='searchtrigram',
+            index_together=set(
+                [('search_model', 'object_id'), ('search_model', 'field', 'trigram')]
+            ),
+        ),
+    ]
@@ -11,7 +11,7 @@ from django.utils.encoding import (
 )
 from django.utils.translation import ugettext_lazy as _
 
-from .managers import RecentSearchManager
+from .managers import RecentSearchManager, SearchTrigramManager
 
 
 @python_2_unicode_compatible
@@ -71,3 +71,27 @@ class RecentSearch(models.Model):
         ordering = ('-datetime_created',)
         verbose_name = _('Recent search')
         verbose_name_plural = _('Recent searches')
+
+
+class SearchTrigram(models.Model):
+    """
+    Three character substring of the value of a search field of an
+    instance, used to find the instances containing a term without
+    scanning the field values.
+    """
+    search_model = models.CharField(
+        max_length=128, verbose_name=_('Search model')
+    )
+    field = models.CharField(max_length=255, verbose_name=_('Field'))
+    trigram = models.CharField(max_length=3, verbose_name=_('Trigram'))
+    object_id = models.PositiveIntegerField(verbose_name=_('Object ID'))
+
+    objects = SearchTrigramManager()
+
+    class Meta:
+        index_together = (
+            ('search_model', 'field', 'trigram'),
+            ('search_model', 'object_id'),
+        )
+        verbose_name = _('Search trigram')
+        verbose_name_plural = _('Search trigrams')
@@ -6,6 +6,8 @@ from user_management.serializers import UserSerializer
 
 from .models import RecentSearch
 
+_ranked_serializers = {}
+
 
 class RecentSearchSerializer(serializers.HyperlinkedModelSerializer):
     url = serializers.HyperlinkedIdentityField(
@@ -17,3 +19,28 @@ class RecentSearchSerializer(serializers.HyperlinkedModelSerializer):
         fields = ('datetime_created', 'hits', 'query', 'url', 'user')
         model = RecentSearch
         read_only_fields = ('datetime_created', 'hits', 'query', 'user')
+
+
+class SearchSuggestionSerializer(serializers.Serializer):
+    term = serializers.CharField(read_only=True)
+    frequency = serializers.IntegerField(read_only=True)
+
+
+def get_ranked_serializer(serializer_class):
+    """
+    Return a subclass of a search model serializer that also includes the
+    relevance score of each search result.
+    """
+    if serializer_class not in _ranked_serializers:
+        class Meta(serializer_class.Meta):
+            fields = tuple(serializer_class.Meta.fields) + ('search_score',)
+
+        _ranked_serializers[serializer_class] = type(
+            str('Ranked{}'.format(serializer_class.__name__)),
+            (serializer_class,), {
+                'Meta': Meta,
+                'search_score': serializers.FloatField(read_only=True),
+            }
+        )
+
+    return _ranked_serializers[serializer_class]
@@ -1,5 +1,8 @@
 from __future__ import unicode_literals
 
+import os
+
+from django.conf import settings
 from django.utils.translation import ugettext_lazy as _
 
 from smart_settings import Namespace
@@ -11,9 +14,63 @@ setting_show_object_type = namespace.add_setting(
 )
 setting_limit = namespace.add_setting(
     global_name='SEARCH_LIMIT', default=100,
-    help_text=_('Maximum amount search hits to fetch and display.')
+    help_text=_(
+        'Number of search hits to fetch at once, the next pages of the '
+        'results fetch more.'
+    )
 )
 setting_recent_count = namespace.add_setting(
     global_name='SEARCH_RECENT_COUNT', default=5,
     help_text=_('Maximum number of search queries to remember per user.')
 )
+setting_backend = namespace.add_setting(
+    global_name='SEARCH_BACKEND',
+    default='dynamic_search.backends.database.DatabaseSearchBackend',
+    help_text=_(
+        'Full path to the backend used to perform searches. Use '
+        'dynamic_search.backends.inverted_index.InvertedIndexSearchBackend '
+        'to search an on-disk index instead of scanning the database.'
+    )
+)
+setting_index_path = namespace.add_setting(
+    global_name='SEARCH_INDEX_PATH',
+    default=os.path.join(settings.MEDIA_ROOT, 'search_index.sqlite3'),
+    help_text=_('File path of the search index of the inverted index backend.'),
+    is_path=True
+)
+setting_cache_timeout = namespace.add_setting(
+    global_name='SEARCH_CACHE_TIMEOUT', default=300,
+    help_text=_(
+        'Time in seconds the results of a search are kept to serve the '
+        'other pages of the results. Set to 0 to disable caching of the '
+        'search results.'
+    )
+)
+setting_facet_limit = namespace.add_setting(
+    global_name='SEARCH_FACET_LIMIT', default=10,
+    help_text=_(
+        'Maximum number of values with the most results to show per search '
+        'facet.'
+    )
+)
+setting_suggestion_limit = namespace.add_setting(
+    global_name='SEARCH_SUGGESTION_LIMIT', default=10,
+    help_text=_('Maximum number of search suggestions to return.')
+)
+setting_trigram_table = namespace.add_setting(
+    global_name='SEARCH_TRIGRAM_TABLE', default=False,
+    help_text=_(
+        'Keep a table of the trigrams of the search fields that support it, '
+        'like the document label and the metadata values, so that the '
+        'database backend finds substrings using an index. Not needed '
+        'with PostgreSQL when the pg_trgm extension is installed. Run the '
+        'rebuildsearchindex command after enabling it.'
+    )
+)
+setting_recent_token_searches = namespace.add_setting(
+    global_name='SEARCH_RECENT_TOKEN_SEARCHES', default=True,
+    help_text=_(
+        'Remember the searches of API clients authenticated with a token. '
+        'Disable to avoid storing the queries of automated clients.'
+    )
+)
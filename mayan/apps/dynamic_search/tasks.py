@@ -0,0 +1,40 @@
+from __future__ import unicode_literals
+
+import logging
+
+from mayan.celery import app
+
+logger = logging.getLogger(__name__)
+
+
+@app.task(ignore_result=True)
+def task_index_instance(search_model_name, object_id):
+    # Avoid circular import, classes.py imports this module
+    from .classes import SearchModel
+
+    logger.debug(
+        'Updating search index of %s instance: %s', search_model_name,
+        object_id
+    )
+    SearchModel.get(search_model_name).index_instance(object_id=object_id)
+
+
+@app.task(ignore_result=True)
+def task_remove_index_instance(search_model_name, object_id):
+    from .classes import SearchModel
+
+    logger.debug(
+        'Removing search index entry of %s instance: %s', search_model_name,
+        object_id
+    )
+    SearchModel.get(search_model_name).remove_index_instance(
+        object_id=object_id
+    )
+
+
+@app.task(ignore_result=True)
+def task_add_recent_searches(entries):
+    from .models import RecentSearch
+
+    logger.debug('Storing %d recent searches', len(entries))
+    RecentSearch.objects.add_queries(entries=entries)
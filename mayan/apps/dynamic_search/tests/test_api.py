@@ -47,3 +47,4 @@ class SearchAPITestCase(APITestCase):
         content = loads(response.content)
         self.assertEqual(content['results'][0]['label'], document.label)
         self.assertEqual(content['count'], 1)
+        self.assertEqual(content['total_count'], 1)
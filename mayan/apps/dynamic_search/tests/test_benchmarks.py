@@ -0,0 +1,28 @@
+from __future__ import unicode_literals
+
+from django.test import TestCase, override_settings
+
+from ..benchmarks import SearchBenchmark, SyntheticCorpus, get_percentile
+
+
+@override_settings(SEARCH_CACHE_TIMEOUT=0)
+class SearchBenchmarkTestCase(TestCase):
+    def test_percentile(self):
+        self.assertEqual(get_percentile(range(1, 101), 50), 50)
+        self.assertEqual(get_percentile(range(1, 101), 99), 99)
+        self.assertEqual(get_percentile([5], 90), 5)
+
+    def test_benchmark(self):
+        results = SearchBenchmark(
+            corpus=SyntheticCorpus(
+                documents=20, document_types=2, words=20, vocabulary=50
+            ), repeat=1
+        ).run()
+
+        self.assertEqual(results['corpus']['documents'], 20)
+        self.assertTrue(results['cases'])
+
+        for case in results['cases']:
+            self.assertLessEqual(case['results'], case['limit'])
+            self.assertGreater(case['queries'], 0)
+            self.assertIn('p90', case['latency_ms'])
@@ -1,14 +1,34 @@
 from __future__ import unicode_literals
 
-from django.contrib.auth.models import User
+import os
+import tempfile
+
+from django.contrib.auth.models import Group, User
+from django.core.cache import caches
 from django.core.files.base import File
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
+from acls.models import AccessControlList
 from documents.models import DocumentType
+from documents.permissions import permission_document_view
 from documents.search import document_search
 from documents.tests import TEST_DOCUMENT_TYPE, TEST_SMALL_DOCUMENT_PATH
+from permissions.classes import Permission
+from permissions.models import Role
+from permissions.tests.literals import TEST_ROLE_LABEL
 from user_management.tests import (
-    TEST_ADMIN_PASSWORD, TEST_ADMIN_USERNAME, TEST_ADMIN_EMAIL
+    TEST_ADMIN_PASSWORD, TEST_ADMIN_USERNAME, TEST_ADMIN_EMAIL, TEST_GROUP,
+    TEST_USER_EMAIL, TEST_USER_PASSWORD, TEST_USER_USERNAME
+)
+
+from .. import classes
+from ..backends.database import DatabaseSearchBackend
+from ..backends.inverted_index import InvertedIndexSearchBackend
+from ..classes import RecentSearchBuffer
+from ..models import RecentSearch, SearchTrigram
+
+TEST_SEARCH_INDEX_PATH = os.path.join(
+    tempfile.gettempdir(), 'mayan_test_search_index.sqlite3'
 )
 
 
@@ -36,24 +56,332 @@ class DocumentSearchTestCase(TestCase):
         document versions and document version pages
         """
 
-        model_list, result_set, elapsed_time = document_search.search(
+        results = document_search.search(
             {'q': 'Mayan'}, user=self.admin_user
         )
-        self.assertEqual(len(result_set), 1)
-        self.assertEqual(list(model_list), [self.document])
+        self.assertEqual(len(results.object_ids), 1)
+        self.assertEqual(list(results.queryset), [self.document])
 
     def test_advanced_search_after_related_name_change(self):
         # Test versions__filename
-        model_list, result_set, elapsed_time = document_search.search(
+        results = document_search.search(
             {'label': self.document.label}, user=self.admin_user
         )
-        self.assertEqual(len(result_set), 1)
-        self.assertEqual(list(model_list), [self.document])
+        self.assertEqual(len(results.object_ids), 1)
+        self.assertEqual(list(results.queryset), [self.document])
 
         # Test versions__mimetype
-        model_list, result_set, elapsed_time = document_search.search(
+        results = document_search.search(
             {'versions__mimetype': self.document.file_mimetype},
             user=self.admin_user
         )
-        self.assertEqual(len(result_set), 1)
-        self.assertEqual(list(model_list), [self.document])
+        self.assertEqual(len(results.object_ids), 1)
+        self.assertEqual(list(results.queryset), [self.document])
+
+    def test_database_backend_single_query(self):
+        result_set = DatabaseSearchBackend().search(
+            search_model=document_search,
+            field_terms=document_search.get_field_terms(
+                {'q': 'Mayan EDMS'}
+            )
+        )
+
+        with self.assertNumQueries(1):
+            self.assertEqual(list(result_set), [self.document.pk])
+
+    def test_cached_search(self):
+        document_search.search({'q': 'Mayan'}, user=self.admin_user)
+
+        # Change the label without sending signals, the cached results are
+        # still valid
+        type(self.document).objects.filter(pk=self.document.pk).update(
+            label='other'
+        )
+
+        results = document_search.search(
+            {'q': 'Mayan'}, user=self.admin_user
+        )
+
+        self.assertEqual(list(results.object_ids), [self.document.pk])
+        self.assertEqual(list(results.queryset), [self.document])
+
+    def test_cached_search_access(self):
+        user = User.objects.create_user(
+            username=TEST_USER_USERNAME, email=TEST_USER_EMAIL,
+            password=TEST_USER_PASSWORD
+        )
+        field_terms = document_search.get_field_terms({'q': 'Mayan'})
+
+        # Results cached for another user of the same groups
+        caches['default'].set(
+            document_search.get_cache_key(
+                field_terms=field_terms, user=user, global_and_search=False
+            ), ([self.document.pk], None, None, 1), 60
+        )
+
+        results = document_search.search(
+            {'q': 'Mayan'}, user=user
+        )
+
+        self.assertEqual(list(results.object_ids), [])
+        self.assertEqual(list(results.queryset), [])
+
+    def test_cached_search_invalidation(self):
+        results = document_search.search(
+            {'description': 'invalidation'}, user=self.admin_user
+        )
+        self.assertEqual(list(results.queryset), [])
+
+        self.document.description = 'invalidation'
+        self.document.save()
+
+        results = document_search.search(
+            {'description': 'invalidation'}, user=self.admin_user
+        )
+        self.assertEqual(list(results.queryset), [self.document])
+
+    def test_recent_search_buffer(self):
+        document_search.search({'q': 'buffered'}, user=self.admin_user)
+        RecentSearchBuffer.flush()
+
+        self.assertTrue(
+            RecentSearch.objects.filter(
+                user=self.admin_user, query='q=buffered'
+            ).exists()
+        )
+
+    def test_recent_search_buffer_timer(self):
+        submitted_entries = []
+        submit = RecentSearchBuffer.__dict__['submit']
+        flush_interval = RecentSearchBuffer.flush_interval
+
+        RecentSearchBuffer.flush()
+        RecentSearchBuffer.submit = staticmethod(
+            lambda entries: submitted_entries.extend(entries)
+        )
+        RecentSearchBuffer.flush_interval = 0.5
+        try:
+            RecentSearchBuffer.add(
+                user=self.admin_user, query_string={'q': 'buffered'}, hits=1
+            )
+            timer = RecentSearchBuffer._timer
+            timer.join(5)
+        finally:
+            RecentSearchBuffer.submit = submit
+            RecentSearchBuffer.flush_interval = flush_interval
+
+        self.assertEqual(
+            submitted_entries, [(self.admin_user.pk, {'q': 'buffered'}, 1)]
+        )
+
+    def test_facet_counts(self):
+        results = document_search.search(
+            {'label': 'mayan'}, user=self.admin_user, facets=True
+        )
+
+        facet_counts = dict(
+            (search_facet.name, counts)
+            for search_facet, counts in results.facet_counts
+        )
+        self.assertEqual(
+            facet_counts['document_type'], [(TEST_DOCUMENT_TYPE, 1)]
+        )
+        self.assertEqual(
+            facet_counts['year'], [(self.document.date_added.year, 1)]
+        )
+
+    def test_cached_facet_counts(self):
+        document_search.search(
+            {'label': 'mayan'}, user=self.admin_user, facets=True
+        )
+
+        # Served from the cache
+        results = document_search.search(
+            {'label': 'mayan'}, user=self.admin_user, facets=True
+        )
+
+        facet_counts = dict(
+            (search_facet.name, counts)
+            for search_facet, counts in results.facet_counts
+        )
+        self.assertEqual(
+            facet_counts['document_type'], [(TEST_DOCUMENT_TYPE, 1)]
+        )
+        self.assertEqual(list(results.queryset), [self.document])
+
+    def test_facet_filter(self):
+        results = document_search.search(
+            {'label': 'mayan', 'facet_document_type': TEST_DOCUMENT_TYPE},
+            user=self.admin_user
+        )
+        self.assertEqual(list(results.queryset), [self.document])
+
+        results = document_search.search(
+            {'label': 'mayan', 'facet_document_type': 'other'},
+            user=self.admin_user
+        )
+        self.assertEqual(list(results.queryset), [])
+
+
+@override_settings(
+    SEARCH_BACKEND='dynamic_search.backends.inverted_index.InvertedIndexSearchBackend',
+    SEARCH_INDEX_PATH=TEST_SEARCH_INDEX_PATH
+)
+class InvertedIndexSearchTestCase(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username=TEST_ADMIN_USERNAME, email=TEST_ADMIN_EMAIL,
+            password=TEST_ADMIN_PASSWORD
+        )
+        self.document_type = DocumentType.objects.create(
+            label=TEST_DOCUMENT_TYPE
+        )
+
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            self.document = self.document_type.new_document(
+                file_object=File(file_object), label='mayan_11_1.pdf'
+            )
+
+    def tearDown(self):
+        self.document_type.delete()
+        os.unlink(TEST_SEARCH_INDEX_PATH)
+
+    def test_simple_search(self):
+        results = document_search.search(
+            {'q': 'Mayan'}, user=self.admin_user
+        )
+
+        self.assertEqual(len(results.object_ids), 1)
+        self.assertEqual(list(results.queryset), [self.document])
+
+    def test_rebuild_index(self):
+        document_search.rebuild_index()
+
+        results = document_search.search(
+            {'label': 'mayan'}, user=self.admin_user
+        )
+
+        self.assertEqual(list(results.queryset), [self.document])
+
+    def test_ranked_search(self):
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            document = self.document_type.new_document(
+                file_object=File(file_object), label='test.pdf'
+            )
+        document.description = 'mayan'
+        document.save()
+
+        results = document_search.search(
+            {'q': 'mayan'}, user=self.admin_user
+        )
+
+        self.assertEqual(list(results.queryset), [self.document, document])
+        self.assertGreater(
+            results.queryset[0].search_score, results.queryset[1].search_score
+        )
+
+    def test_ranked_search_limit(self):
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            document = self.document_type.new_document(
+                file_object=File(file_object), label='test.pdf'
+            )
+        document.description = 'mayan'
+        document.save()
+
+        scores = InvertedIndexSearchBackend().get_scores(
+            search_model=document_search,
+            field_terms=document_search.get_field_terms({'q': 'mayan'}),
+            limit=1
+        )
+
+        self.assertEqual(scores.keys(), [self.document.pk])
+
+    def test_ranked_search_access(self):
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            document = self.document_type.new_document(
+                file_object=File(file_object), label='test.pdf'
+            )
+        document.description = 'mayan'
+        document.save()
+
+        user = User.objects.create_user(
+            username=TEST_USER_USERNAME, email=TEST_USER_EMAIL,
+            password=TEST_USER_PASSWORD
+        )
+        group = Group.objects.create(name=TEST_GROUP)
+        role = Role.objects.create(label=TEST_ROLE_LABEL)
+        group.user_set.add(user)
+        role.groups.add(group)
+        acl = AccessControlList.objects.create(
+            content_object=document, role=role
+        )
+        acl.permissions.add(permission_document_view.stored_permission)
+        Permission.invalidate_cache()
+
+        # The best scored match is not accessible, the next candidate
+        # window has the result
+        ranking_candidate_factor = classes.RANKING_CANDIDATE_FACTOR
+        classes.RANKING_CANDIDATE_FACTOR = 1
+        try:
+            with self.settings(SEARCH_LIMIT=1):
+                results = document_search.search(
+                    {'q': 'mayan'}, user=user
+                )
+        finally:
+            classes.RANKING_CANDIDATE_FACTOR = ranking_candidate_factor
+
+        self.assertEqual(list(results.queryset), [document])
+
+    def test_suggestions(self):
+        self.assertIn(
+            ('mayan_11_1', 1), document_search.get_suggestions(
+                prefix='document may', user=self.admin_user
+            )
+        )
+
+    def test_suggestions_typo(self):
+        self.assertIn(
+            ('mayan_11_1', 1), document_search.get_suggestions(
+                prefix='mayam_1', user=self.admin_user
+            )
+        )
+
+
+@override_settings(SEARCH_TRIGRAM_TABLE=True)
+class TrigramSearchTestCase(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username=TEST_ADMIN_USERNAME, email=TEST_ADMIN_EMAIL,
+            password=TEST_ADMIN_PASSWORD
+        )
+        self.document_type = DocumentType.objects.create(
+            label=TEST_DOCUMENT_TYPE
+        )
+
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            self.document = self.document_type.new_document(
+                file_object=File(file_object), label='mayan_11_1.pdf'
+            )
+
+    def tearDown(self):
+        self.document_type.delete()
+
+    def test_substring_search(self):
+        results = document_search.search(
+            {'label': 'an_11'}, user=self.admin_user
+        )
+        self.assertEqual(list(results.queryset), [self.document])
+
+        results = document_search.search(
+            {'label': 'an_12'}, user=self.admin_user
+        )
+        self.assertEqual(list(results.queryset), [])
+
+    def test_rebuild_index(self):
+        SearchTrigram.objects.all().delete()
+        document_search.rebuild_index()
+
+        results = document_search.search(
+            {'label': 'an_11'}, user=self.admin_user
+        )
+        self.assertEqual(list(results.queryset), [self.document])
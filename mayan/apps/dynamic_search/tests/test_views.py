@@ -52,10 +52,10 @@ class Issue46TestCase(TestCase):
 
     def test_advanced_search_past_first_page(self):
         # Make sure all documents are returned by the search
-        model_list, result_set, elapsed_time = document_search.search(
+        results = document_search.search(
             {'label': 'test document'}, user=self.admin_user
         )
-        self.assertEqual(len(result_set), self.document_count)
+        self.assertEqual(len(results.object_ids), self.document_count)
 
         with self.settings(COMMON_PAGINATE_BY=2):
             # Funcitonal test for the first page of advanced results
@@ -76,3 +76,24 @@ class Issue46TestCase(TestCase):
                 response, 'Total (3 - 4 out of 4) (Page 2 of 2)',
                 status_code=200
             )
+
+    def test_search_past_search_limit(self):
+        with self.settings(COMMON_PAGINATE_BY=2, SEARCH_LIMIT=2):
+            results = document_search.search(
+                {'label': 'test document'}, user=self.admin_user
+            )
+            self.assertEqual(len(results.object_ids), 2)
+            self.assertEqual(results.total_count, self.document_count)
+
+            results = document_search.search(
+                {'label': 'test document'}, user=self.admin_user, offset=3
+            )
+            self.assertEqual(len(results.object_ids), 1)
+
+            response = self.client.get(
+                reverse('search:results'), {'label': 'test', 'page': 2}
+            )
+            self.assertContains(
+                response, 'Total (3 - 4 out of 4) (Page 2 of 2)',
+                status_code=200
+            )
@@ -3,7 +3,8 @@ from __future__ import unicode_literals
 from django.conf.urls import patterns, url
 
 from .api_views import (
-    APIRecentSearchListView, APIRecentSearchView, APISearchView
+    APIRecentSearchListView, APIRecentSearchView, APISearchSuggestionView,
+    APISearchView
 )
 from .views import AdvancedSearchView, ResultsView, SearchView
 
@@ -26,4 +27,8 @@ api_urls = patterns(
         name='recentsearch-detail'
     ),
     url(r'^search/$', APISearchView.as_view(), name='search-view'),
+    url(
+        r'^search/suggestions/$', APISearchSuggestionView.as_view(),
+        name='search-suggestion-view'
+    ),
 )
@@ -12,30 +12,80 @@ from common.generics import SimpleView, SingleObjectListView
 
 from .classes import SearchModel
 from .forms import SearchForm, AdvancedSearchForm
-from .settings import setting_limit, setting_show_object_type
+from .settings import setting_show_object_type
 
 logger = logging.getLogger(__name__)
 
 
 class ResultsView(SingleObjectListView):
+    template_name = 'dynamic_search/results.html'
+
     def get_extra_context(self):
         context = {
+            'facets': self.get_facets(),
             'hide_links': True,
-            'search_results_limit': setting_limit.value,
             'title': _('Search results'),
         }
 
+        extra_columns = []
+
         if setting_show_object_type.value:
-            context.update({
-                'extra_columns': (
+            extra_columns.append(
+                {
+                    'name': _('Type'),
+                    'attribute': lambda x: x._meta.verbose_name[0].upper() + x._meta.verbose_name[1:]
+                }
+            )
+
+        if SearchModel.get('documents.Document').get_backend().supports_ranking:
+            extra_columns.append(
+                {
+                    'name': _('Relevance'),
+                    'attribute': lambda x: '{:.2f}'.format(
+                        getattr(x, 'search_score', 0)
+                    )
+                }
+            )
+
+        if extra_columns:
+            context['extra_columns'] = extra_columns
+
+        return context
+
+    def get_facets(self):
+        """
+        Return the facet counts of the results with the query string that
+        selects each value, or that clears it if already selected.
+        """
+        facets = []
+
+        for search_facet, counts in getattr(self, 'facet_counts', ()):
+            selected_value = self.request.GET.get(
+                search_facet.get_query_key()
+            )
+            entries = []
+
+            for value, count in counts:
+                query_dict = self.request.GET.copy()
+                query_dict.pop('page', None)
+
+                if unicode(value) == selected_value:
+                    query_dict.pop(search_facet.get_query_key())
+                else:
+                    query_dict[search_facet.get_query_key()] = value
+
+                entries.append(
                     {
-                        'name': _('Type'),
-                        'attribute': lambda x: x._meta.verbose_name[0].upper() + x._meta.verbose_name[1:]
-                    },
+                        'count': count,
+                        'query_string': query_dict.urlencode(),
+                        'selected': unicode(value) == selected_value,
+                        'value': value,
+                    }
                 )
-            })
 
-        return context
+            facets.append({'entries': entries, 'label': search_facet.label})
+
+        return facets
 
     def get_queryset(self):
         document_search = SearchModel.get('documents.Document')
@@ -44,11 +94,14 @@ class ResultsView(SingleObjectListView):
             # Only do search if there is user input, otherwise just render
             # the template with the extra_context
 
-            queryset, ids, timedelta = document_search.search(
-                self.request.GET, self.request.user
+            # The paginator slices the results, searching again for the
+            # pages past the first SEARCH_LIMIT results
+            results = document_search.search(
+                self.request.GET, self.request.user, facets=True
             )
+            self.facet_counts = results.facet_counts
 
-            return queryset
+            return results
 
 
 class SearchView(SimpleView):
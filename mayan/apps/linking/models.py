@@ -2,10 +2,10 @@ from __future__ import unicode_literals
 
 from django.db import models
 from django.db.models import Q
-from django.template import Context, Template
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 
+from common.classes import CompiledTemplate
 from documents.models import Document, DocumentType
 
 from .literals import (
@@ -34,10 +34,10 @@ class SmartLink(models.Model):
 
     def get_dynamic_label(self, document):
         if self.dynamic_label:
-            context = Context({'document': document})
             try:
-                template = Template(self.dynamic_label)
-                return template.render(context=context)
+                return CompiledTemplate.get(self.dynamic_label).render(
+                    context={'document': document}
+                )
             except Exception as exception:
                 return _(
                     'Error generating dynamic label; %s' % unicode(exception)
@@ -56,10 +56,10 @@ class SmartLink(models.Model):
 
         smart_link_query = Q()
 
-        context = Context({'document': document})
+        context = {'document': document}
 
         for condition in self.conditions.filter(enabled=True):
-            template = Template(condition.expression)
+            template = CompiledTemplate.get(condition.expression)
 
             condition_query = Q(**{
                 '%s__%s' % (
@@ -0,0 +1,5 @@
+from __future__ import unicode_literals
+
+EXCLUSIVE_LOCK_INTENT_SUFFIX = '|pending'
+EXCLUSIVE_LOCK_INTENT_TIMEOUT = 60  # 1 minute
+SHARED_LOCK_SEPARATOR = ':'
@@ -2,17 +2,80 @@ from __future__ import unicode_literals
 
 import datetime
 import logging
+import uuid
 
 from django.db import OperationalError, models, transaction
 from django.db.utils import IntegrityError
 from django.utils.timezone import now
 
 from .exceptions import LockError
+from .literals import (
+    EXCLUSIVE_LOCK_INTENT_SUFFIX, EXCLUSIVE_LOCK_INTENT_TIMEOUT,
+    SHARED_LOCK_SEPARATOR
+)
 
 logger = logging.getLogger(__name__)
 
 
 class LockManager(models.Manager):
+    def acquire_exclusive_lock(self, name, timeout=None):
+        """
+        Acquire a lock that excludes the other holders of the lock, both
+        exclusive and shared. While shared holders keep it from being
+        acquired, an intent entry stops new shared holders so that retrying
+        eventually succeeds. The intent expires if the attempts stop for
+        longer than EXCLUSIVE_LOCK_INTENT_TIMEOUT.
+        """
+        intent_name = name + EXCLUSIVE_LOCK_INTENT_SUFFIX
+
+        lock = self.acquire_lock(name=name, timeout=timeout)
+
+        if self.get_active_locks(name__startswith=name + SHARED_LOCK_SEPARATOR):
+            logger.debug('lock: %s is held shared', name)
+            lock.release()
+
+            if not self.filter(name=intent_name).update(creation_datetime=now(), timeout=EXCLUSIVE_LOCK_INTENT_TIMEOUT):
+                try:
+                    self.acquire_lock(
+                        name=intent_name,
+                        timeout=EXCLUSIVE_LOCK_INTENT_TIMEOUT
+                    )
+                except LockError:
+                    # Created by another exclusive attempt meanwhile
+                    pass
+
+            raise LockError('Unable to acquire exclusive lock')
+
+        self.filter(name=intent_name).delete()
+
+        return lock
+
+    def acquire_shared_lock(self, name, timeout=None):
+        """
+        Acquire a lock that can be held by several shared holders at the same
+        time but not while acquire_exclusive_lock holds it or is trying to
+        acquire it. Each shared holder has its own lock entry that is
+        released normally.
+        """
+        if self.get_active_locks(name__in=(name, name + EXCLUSIVE_LOCK_INTENT_SUFFIX)):
+            logger.debug('lock: %s is held or wanted exclusive', name)
+            raise LockError('Unable to acquire shared lock')
+
+        lock = self.acquire_lock(
+            name='{}{}{}'.format(
+                name, SHARED_LOCK_SEPARATOR, uuid.uuid4().hex[:12]
+            ), timeout=timeout
+        )
+
+        # Check again in case the exclusive lock was acquired between the
+        # first check and the creation of our shared entry
+        if self.get_active_locks(name=name):
+            logger.debug('lock: %s was acquired exclusive', name)
+            lock.release()
+            raise LockError('Unable to acquire shared lock')
+
+        return lock
+
     def acquire_lock(self, name, timeout=None):
         logger.debug('trying to acquire lock: %s', name)
         lock = self.model(name=name, timeout=timeout)
@@ -50,6 +113,18 @@ class LockManager(models.Manager):
             logger.debug('acquired lock: %s', name)
             return lock
 
+    def get_active_locks(self, **kwargs):
+        """
+        Return the locks matching the filter that have not expired
+        """
+        return [
+            lock for lock in self.filter(**kwargs) if now() <= (
+                lock.creation_datetime + datetime.timedelta(
+                    seconds=lock.timeout
+                )
+            )
+        ]
+
     def check_existing(self, **kwargs):
         try:
             existing_lock = self.get(**kwargs)
@@ -58,3 +58,41 @@ class LockTestCase(TestCase):
 
         # Cleanup
         lock_2.release()
+
+    def test_shared(self):
+        lock_1 = Lock.objects.acquire_shared_lock(name='test_lock_1')
+        lock_2 = Lock.objects.acquire_shared_lock(name='test_lock_1')
+
+        with self.assertRaises(LockError):
+            Lock.objects.acquire_exclusive_lock(name='test_lock_1')
+
+        lock_1.release()
+        lock_2.release()
+
+        lock_3 = Lock.objects.acquire_exclusive_lock(name='test_lock_1')
+
+        with self.assertRaises(LockError):
+            Lock.objects.acquire_shared_lock(name='test_lock_1')
+
+        # Cleanup
+        lock_3.release()
+
+    def test_shared_exclusive_pending(self):
+        lock_1 = Lock.objects.acquire_shared_lock(name='test_lock_1')
+
+        with self.assertRaises(LockError):
+            Lock.objects.acquire_exclusive_lock(name='test_lock_1')
+
+        # New shared holders wait for the pending exclusive request
+        with self.assertRaises(LockError):
+            Lock.objects.acquire_shared_lock(name='test_lock_1')
+
+        lock_1.release()
+
+        lock_2 = Lock.objects.acquire_exclusive_lock(name='test_lock_1')
+        lock_2.release()
+
+        lock_3 = Lock.objects.acquire_shared_lock(name='test_lock_1')
+
+        # Cleanup
+        lock_3.release()
@@ -162,7 +162,18 @@ class MetadataApp(MayanAppConfig):
             field='metadata__metadata_type__name', label=_('Metadata type')
         )
         document_search.add_model_field(
-            field='metadata__value', label=_('Metadata value')
+            field='metadata__value', label=_('Metadata value'), trigram=True,
+            weight=2
+        )
+        document_search.add_facet(
+            name='metadata_value', label=_('Metadata value'),
+            field='metadata__value'
+        )
+        document_search.add_index_trigger(
+            signal=post_delete, sender=DocumentMetadata, accessor='document'
+        )
+        document_search.add_index_trigger(
+            signal=post_save, sender=DocumentMetadata, accessor='document'
         )
 
         menu_facet.bind_links(links=(link_metadata_view,), sources=(Document,))
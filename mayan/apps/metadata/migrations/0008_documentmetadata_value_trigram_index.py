@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import DatabaseError, migrations, transaction
+
+
+def create_value_trigram_index(apps, schema_editor):
+    """
+    Index the value column with the PostgreSQL pg_trgm extension to
+    speed up the case insensitive substring searches. The extension can
+    only be created by privileged database users, without it the search
+    falls back to the portable trigram table.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except DatabaseError:
+        return
+
+    schema_editor.execute(
+        'CREATE INDEX metadata_documentmetadata_value_trgm ON metadata_documentmetadata USING gin '
+        '((UPPER(value::text)) gin_trgm_ops)'
+    )
+
+
+def remove_value_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    schema_editor.execute('DROP INDEX IF EXISTS metadata_documentmetadata_value_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('metadata', '0007_auto_20150918_0800'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_value_trigram_index, remove_value_trigram_index
+        ),
+    ]
@@ -4,11 +4,11 @@ import shlex
 
 from django.core.exceptions import ValidationError
 from django.db import models
-from django.template import Context, Template
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.module_loading import import_string
 from django.utils.translation import ugettext_lazy as _
 
+from common.classes import CompiledTemplate
 from documents.models import Document, DocumentType
 
 from .classes import MetadataLookup
@@ -100,14 +100,13 @@ class MetadataType(models.Model):
         return list(splitter)
 
     def get_default_value(self):
-        template = Template(self.default)
-        context = Context()
-        return template.render(context=context)
+        return CompiledTemplate.get(self.default).render()
 
     def get_lookup_values(self):
-        template = Template(self.lookup)
-        context = Context(MetadataLookup.get_as_context())
-        return MetadataType.comma_splitter(template.render(context=context))
+        template = CompiledTemplate.get(self.lookup)
+        return MetadataType.comma_splitter(
+            template.render(context=MetadataLookup.get_as_context())
+        )
 
     def get_required_for(self, document_type):
         return self in document_type.metadata.filter(required=True)
@@ -6,4 +6,5 @@ from django.utils.translation import ugettext_lazy as _
 
 class MirroringApp(apps.AppConfig):
     name = 'mirroring'
+    test = True
     verbose_name = _('Mirroring')
@@ -0,0 +1,219 @@
+from __future__ import unicode_literals
+
+import datetime
+import logging
+import threading
+import time
+
+from django.db.models import Count, Max, Sum
+
+from document_indexing.models import IndexInstanceNode
+from documents.models import Document
+
+logger = logging.getLogger(__name__)
+
+
+def get_timestamp(value):
+    """
+    Return the seconds since the epoch of an aware or naive datetime
+    """
+    if value.utcoffset() is not None:
+        value = value.replace(tzinfo=None) - value.utcoffset()
+
+    return (value - datetime.datetime(1970, 1, 1)).total_seconds()
+
+
+class IndexMirrorNode(object):
+    """
+    Index instance node of the in memory tree of an index mirror. Children
+    and documents are stored by the name under which they are listed.
+    """
+    __slots__ = ('children', 'documents', 'link_documents', 'pk')
+
+    def __init__(self, pk=None, link_documents=False):
+        self.children = {}
+        self.documents = {}
+        self.link_documents = link_documents
+        self.pk = pk
+
+
+class IndexMirror(object):
+    """
+    In memory copy of the tree of an index used to resolve paths and list
+    directories without database queries. The tree is loaded at once and
+    reloaded when it is found to be stale: index changes made in this
+    process mark it stale through the model signals and the changes made
+    by other processes are detected by comparing a fingerprint of the index
+    instances, checked at most once per refresh interval.
+    Names containing a slash and names shared by several children or
+    documents of the same node can't be represented and are not listed.
+    """
+    def __init__(self, index, refresh_interval):
+        self.index = index
+        self.refresh_interval = refresh_interval
+        self.lock = threading.Lock()
+        self.fingerprint = None
+        self.last_check = 0
+        self.stale = True
+        self.root = IndexMirrorNode()
+        self.document_attributes = {}
+
+    def get_document_attributes(self, document_pk):
+        """
+        Return the creation and modification times and the size of a
+        document, cached until the tree is reloaded. Return None for
+        documents deleted or without a version yet.
+        """
+        try:
+            return self.document_attributes[document_pk]
+        except KeyError:
+            try:
+                document = Document.objects.get(pk=document_pk)
+            except Document.DoesNotExist:
+                return None
+
+            latest_version = document.latest_version
+            if not latest_version:
+                # Document still being uploaded
+                return None
+
+            attributes = {
+                'st_ctime': get_timestamp(document.date_added),
+                'st_mtime': get_timestamp(latest_version.timestamp),
+                'st_size': latest_version.size or 0,
+            }
+            self.document_attributes[document_pk] = attributes
+            return attributes
+
+    def get_fingerprint(self):
+        """
+        Return a value that changes when index instances are added or
+        removed or when their documents change.
+        """
+        result = IndexInstanceNode.objects.filter(
+            index_template_node__index=self.index
+        ).aggregate(
+            count=Count('pk'), last=Max('pk'),
+            revision=Sum('document_revision')
+        )
+
+        return (result['count'], result['last'], result['revision'])
+
+    def get_root(self):
+        """
+        Return the root of the tree, reloading it first if it is stale
+        """
+        if time.time() - self.last_check > self.refresh_interval:
+            with self.lock:
+                fingerprint = self.get_fingerprint()
+                self.last_check = time.time()
+
+                if self.stale or fingerprint != self.fingerprint:
+                    self.load(fingerprint=fingerprint)
+        elif self.stale:
+            with self.lock:
+                if self.stale:
+                    self.load(fingerprint=self.get_fingerprint())
+
+        return self.root
+
+    @staticmethod
+    def get_unique_names(entries):
+        result = {}
+        duplicates = set()
+
+        for name, value in entries:
+            if '/' in name or name in duplicates:
+                continue
+
+            if name in result:
+                del result[name]
+                duplicates.add(name)
+            else:
+                result[name] = value
+
+        return result
+
+    def invalidate(self, **kwargs):
+        """
+        Mark the tree as stale. Accepts the arguments of a signal to be used
+        as a signal receiver.
+        """
+        self.stale = True
+
+    def load(self, fingerprint):
+        logger.debug('Loading index: %s', self.index)
+
+        # Clear the stale flag first, changes made while loading mark the
+        # tree stale again
+        self.stale = False
+
+        nodes = {}
+        root = None
+        children = {}
+
+        queryset = IndexInstanceNode.objects.filter(
+            index_template_node__index=self.index
+        ).values_list(
+            'pk', 'parent', 'value', 'index_template_node__link_documents'
+        )
+
+        for pk, parent_pk, value, link_documents in queryset:
+            nodes[pk] = IndexMirrorNode(pk=pk, link_documents=link_documents)
+
+            if parent_pk is None:
+                root = nodes[pk]
+            else:
+                children.setdefault(parent_pk, []).append((value, pk))
+
+        for parent_pk, entries in children.items():
+            parent = nodes.get(parent_pk)
+            if parent:
+                parent.children = self.get_unique_names(
+                    (value, nodes[pk]) for value, pk in entries
+                )
+
+        queryset = IndexInstanceNode.documents.through.objects.filter(
+            document__in_trash=False,
+            indexinstancenode__index_template_node__index=self.index
+        ).values_list('indexinstancenode', 'document', 'document__label')
+
+        documents = {}
+        for node_pk, document_pk, label in queryset:
+            documents.setdefault(node_pk, []).append((label, document_pk))
+
+        for node_pk, entries in documents.items():
+            node = nodes.get(node_pk)
+            if node and node.link_documents:
+                node.documents = dict(
+                    (label, document_pk) for label, document_pk in (
+                        self.get_unique_names(entries).items()
+                    ) if label not in node.children
+                )
+
+        # Replace the whole tree at once, other threads keep using the
+        # previous one until they resolve their next path
+        self.root = root or IndexMirrorNode()
+        self.document_attributes = {}
+        self.fingerprint = fingerprint
+
+    def resolve(self, path):
+        """
+        Return a tuple of the node and the document primary key of a path,
+        the node is None for documents and both are None for paths that
+        don't exist.
+        """
+        node = self.get_root()
+
+        parts = [part for part in path.split('/') if part]
+
+        for count, part in enumerate(parts):
+            try:
+                node = node.children[part]
+            except KeyError:
+                if count == len(parts) - 1 and part in node.documents:
+                    return None, node.documents[part]
+                else:
+                    return None, None
+
+        return node, None
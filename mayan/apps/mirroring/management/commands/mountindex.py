@@ -1,27 +1,25 @@
 from __future__ import unicode_literals
 
-import datetime
 from errno import ENOENT
 import logging
+from optparse import make_option
 from stat import S_IFDIR, S_IFREG
+import threading
 from time import time
 
 from fuse import FUSE, FuseOSError, Operations
 
 from django.core import management
-from django.core.cache import caches
-from django.core.exceptions import MultipleObjectsReturned
-from django.db.models import Count
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 from document_indexing.models import Index, IndexInstanceNode
 from documents.models import Document
 
+from ...classes import IndexMirror
 from ...literals import (
     MAX_FILE_DESCRIPTOR, MIN_FILE_DESCRIPTOR, FILE_MODE, DIRECTORY_MODE
 )
-from ...settings import (
-    setting_document_lookup_cache_timeout, setting_node_lookup_cache_timeout
-)
+from ...settings import setting_refresh_interval
 
 logger = logging.getLogger(__name__)
 
@@ -39,81 +37,10 @@ class IndexFS(Operations):
             except KeyError:
                 return self.file_descriptor_count
 
-    def _path_to_node(self, path, access_only=False, directory_only=True):
-        logger.debug('path: %s', path)
-        logger.debug('directory_only: %s', directory_only)
-
-        parts = path.split('/')
-
-        logger.debug('parts: %s', parts)
-
-        node = self.index.instance_root
-
-        if len(parts) > 1 and parts[1] != '':
-            obj = self.cache.get(path)
-
-            if obj:
-                node_pk = obj.get('node_pk')
-                if node_pk:
-                    if access_only:
-                        return True
-                    else:
-                        return IndexInstanceNode.objects.get(pk=node_pk)
-
-                document_pk = obj.get('document_pk')
-                if document_pk:
-                    if access_only:
-                        return True
-                    else:
-                        return Document.objects.get(pk=document_pk)
-
-            for count, part in enumerate(parts[1:]):
-                try:
-                    node = node.children.get(value=part)
-                except IndexInstanceNode.DoesNotExist:
-                    logger.debug('%s does not exists', part)
-
-                    if directory_only:
-                        return None
-                    else:
-                        try:
-                            if node.index_template_node.link_documents:
-                                result = node.documents.get(label=part)
-                                logger.debug(
-                                    'path %s is a valid file path', path
-                                )
-                                self.cache.set(
-                                    path, {'document_pk': result.pk},
-                                    setting_document_lookup_cache_timeout.value
-                                )
-
-                                return result
-                            else:
-                                return None
-                        except Document.DoesNotExist:
-                            logger.debug(
-                                'path %s is a file, but is not found', path
-                            )
-                            return None
-                        except MultipleObjectsReturned:
-                            return None
-                except MultipleObjectsReturned:
-                    return None
-
-            self.cache.set(
-                path, {'node_pk': node.pk},
-                setting_node_lookup_cache_timeout.value
-            )
-
-        logger.debug('node: %s', node)
-        logger.debug('node is root: %s', node.is_root_node())
-
-        return node
-
     def __init__(self, index_slug):
         self.file_descriptor_count = MIN_FILE_DESCRIPTOR
         self.file_descriptors = {}
-        self.cache = caches['default']
+        self.file_descriptors_lock = threading.Lock()
 
         try:
             self.index = Index.objects.get(slug=index_slug)
@@ -121,63 +48,105 @@ class IndexFS(Operations):
             print 'Unknown index slug: {}.'.format(index_slug)
             exit(1)
 
-    def access(self, path, fh=None):
-        result = self._path_to_node(
-            path=path, access_only=True, directory_only=False
+        self.mirror = IndexMirror(
+            index=self.index, refresh_interval=setting_refresh_interval.value
         )
 
-        if not result:
+        for signal, sender in (
+            (post_save, IndexInstanceNode),
+            (post_delete, IndexInstanceNode),
+            (m2m_changed, IndexInstanceNode.documents.through),
+            (post_save, Document),
+        ):
+            signal.connect(
+                self.mirror.invalidate, sender=sender, weak=False,
+                dispatch_uid='index_mirror_invalidate_{}_{}'.format(
+                    id(signal), sender._meta.model_name
+                )
+            )
+
+    def access(self, path, fh=None):
+        node, document_pk = self.mirror.resolve(path=path)
+
+        if not node and not document_pk:
             raise FuseOSError(ENOENT)
 
     def getattr(self, path, fh=None):
         logger.debug('path: %s, fh: %s', path, fh)
 
         now = time()
-        result = self._path_to_node(path=path, directory_only=False)
+        node, document_pk = self.mirror.resolve(path=path)
 
-        if not result:
-            raise FuseOSError(ENOENT)
-
-        if isinstance(result, IndexInstanceNode):
+        if node:
             return {
                 'st_mode': (S_IFDIR | DIRECTORY_MODE), 'st_ctime': now,
                 'st_mtime': now, 'st_atime': now, 'st_nlink': 2
             }
+        elif document_pk:
+            attributes = self.mirror.get_document_attributes(
+                document_pk=document_pk
+            )
+
+            if not attributes:
+                raise FuseOSError(ENOENT)
+
+            result = {'st_mode': (S_IFREG | FILE_MODE), 'st_atime': now}
+            result.update(attributes)
+            return result
         else:
-            return {
-                'st_mode': (S_IFREG | FILE_MODE),
-                'st_ctime': (
-                    result.date_added.replace(tzinfo=None) - result.date_added.utcoffset() - datetime.datetime(1970, 1, 1)
-                ).total_seconds(),
-                'st_mtime': (
-                    result.latest_version.timestamp.replace(tzinfo=None) - result.latest_version.timestamp.utcoffset() - datetime.datetime(1970, 1, 1)
-                ).total_seconds(),
-                'st_atime': now,
-                'st_size': result.size
-            }
+            raise FuseOSError(ENOENT)
 
     def open(self, path, flags):
-        result = self._path_to_node(path=path, directory_only=False)
+        node, document_pk = self.mirror.resolve(path=path)
 
-        if isinstance(result, Document):
-            next_file_descriptor = self._get_next_file_descriptor()
-            self.file_descriptors[next_file_descriptor] = result.open()
-            return next_file_descriptor
-        else:
+        if not document_pk:
             raise FuseOSError(ENOENT)
 
+        try:
+            latest_version = Document.objects.get(pk=document_pk).latest_version
+        except Document.DoesNotExist:
+            raise FuseOSError(ENOENT)
+
+        if not latest_version:
+            # Document still being uploaded
+            raise FuseOSError(ENOENT)
+
+        # The position is kept to avoid seeking on sequential reads, the
+        # lock serializes the reads of the same descriptor in threaded mode
+        descriptor = {
+            'file': latest_version.open(), 'lock': threading.Lock(),
+            'position': 0
+        }
+
+        with self.file_descriptors_lock:
+            next_file_descriptor = self._get_next_file_descriptor()
+            self.file_descriptors[next_file_descriptor] = descriptor
+
+        return next_file_descriptor
+
     def release(self, path, fh):
-        self.file_descriptors[fh] = None
-        del(self.file_descriptors[fh])
+        with self.file_descriptors_lock:
+            descriptor = self.file_descriptors.pop(fh, None)
+
+        if descriptor:
+            descriptor['file'].close()
 
     def read(self, path, size, offset, fh):
-        self.file_descriptors[fh].seek(offset)
-        return self.file_descriptors[fh].read(size)
+        descriptor = self.file_descriptors[fh]
+
+        with descriptor['lock']:
+            if descriptor['position'] != offset:
+                descriptor['file'].seek(offset)
+
+            data = descriptor['file'].read(size)
+            descriptor['position'] = offset + len(data)
+
+        return data
 
     def readdir(self, path, fh):
         logger.debug('path: %s', path)
 
-        node = self._path_to_node(path=path, directory_only=True)
+        node, document_pk = self.mirror.resolve(path=path)
 
         if not node:
             raise FuseOSError(ENOENT)
@@ -185,28 +154,11 @@ class IndexFS(Operations):
         yield '.'
         yield '..'
 
-        # Nodes
-        queryset = node.get_children().values('value').exclude(
-            value__contains='/'
-        )
-
-        for duplicate in queryset.order_by().annotate(count_id=Count('id')).filter(count_id__gt=1):
-            queryset = queryset.exclude(label=duplicate['label'])
+        for name in node.children:
+            yield name
 
-        for child_node in queryset.values_list('value', flat=True):
-            yield child_node
-
-        # Documents
-        if node.index_template_node.link_documents:
-            queryset = node.documents.values('label').exclude(
-                label__contains='/'
-            )
-
-            for duplicate in queryset.order_by().annotate(count_id=Count('id')).filter(count_id__gt=1):
-                queryset = queryset.exclude(label=duplicate['label'])
-
-            for document_label in queryset.values_list('label', flat=True):
-                yield document_label
+        for name in node.documents:
+            yield name
 
 
 class Command(management.BaseCommand):
@@ -214,6 +166,13 @@ class Command(management.BaseCommand):
     usage_str = 'Usage: ./manage.py mountindex [index slug] [mount point]'
     args = '[index slug] [mount point]'
 
+    option_list = management.BaseCommand.option_list + (
+        make_option(
+            '--threads', action='store_true', dest='threads', default=False,
+            help='Serve the filesystem requests with several threads.'
+        ),
+    )
+
     def handle(self, *args, **options):
         if len(args) != 2:
             print('Incorrect number of arguments')
@@ -221,5 +180,5 @@ class Command(management.BaseCommand):
 
         FUSE(
             operations=IndexFS(index_slug=args[0]), mountpoint=args[1],
-            nothreads=True, foreground=True
+            nothreads=not options['threads'], foreground=True
         )
@@ -0,0 +1,134 @@
+from __future__ import unicode_literals
+
+from django.core.files.base import File
+from django.test import TestCase, override_settings
+
+from document_indexing.models import Index, IndexInstanceNode
+from documents.models import Document, DocumentType
+from documents.tests import TEST_DOCUMENT_TYPE, TEST_SMALL_DOCUMENT_PATH
+
+from ..classes import IndexMirror
+
+TEST_DOCUMENT_LABEL = 'test document'
+TEST_DOCUMENT_LABEL_2 = 'test document 2'
+
+
+@override_settings(OCR_AUTO_OCR=False)
+class IndexMirrorTestCase(TestCase):
+    def setUp(self):
+        self.document_type = DocumentType.objects.create(
+            label=TEST_DOCUMENT_TYPE
+        )
+
+        self.index = Index.objects.create(label='test')
+        self.index.document_types.add(self.document_type)
+        level_1 = self.index.node_templates.create(
+            parent=self.index.template_root, expression='level 1'
+        )
+        self.index.node_templates.create(
+            parent=level_1, expression='level 2', link_documents=True
+        )
+
+        self.document = self.create_document(label=TEST_DOCUMENT_LABEL)
+
+    def tearDown(self):
+        for document_type in DocumentType.objects.all():
+            document_type.delete()
+
+        self.index.delete()
+
+    def create_document(self, label):
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            document = self.document_type.new_document(
+                file_object=File(file_object), label=label
+            )
+
+        IndexInstanceNode.objects.index_document(document)
+
+        return document
+
+    def test_resolve_nested_nodes(self):
+        mirror = IndexMirror(index=self.index, refresh_interval=60)
+
+        node, document_pk = mirror.resolve(path='/')
+        self.assertEqual(node.children.keys(), ['level 1'])
+        self.assertEqual(document_pk, None)
+
+        node, document_pk = mirror.resolve(path='/level 1/level 2')
+        self.assertEqual(node.documents.keys(), [TEST_DOCUMENT_LABEL])
+
+        self.assertEqual(
+            mirror.resolve(
+                path='/level 1/level 2/{}'.format(TEST_DOCUMENT_LABEL)
+            ), (None, self.document.pk)
+        )
+        self.assertEqual(
+            mirror.resolve(path='/level 1/missing'), (None, None)
+        )
+        self.assertEqual(
+            mirror.resolve(
+                path='/level 1/level 2/{}/missing'.format(TEST_DOCUMENT_LABEL)
+            ), (None, None)
+        )
+
+    def test_duplicate_labels(self):
+        self.create_document(label=TEST_DOCUMENT_LABEL)
+        document = self.create_document(label=TEST_DOCUMENT_LABEL_2)
+
+        mirror = IndexMirror(index=self.index, refresh_interval=60)
+
+        node, document_pk = mirror.resolve(path='/level 1/level 2')
+        self.assertEqual(
+            node.documents, {TEST_DOCUMENT_LABEL_2: document.pk}
+        )
+        self.assertEqual(
+            mirror.resolve(
+                path='/level 1/level 2/{}'.format(TEST_DOCUMENT_LABEL)
+            ), (None, None)
+        )
+
+    def test_stale_reload(self):
+        path = '/level 1/level 2/{}'.format(TEST_DOCUMENT_LABEL_2)
+
+        # Changes made by other processes are found by the fingerprint
+        mirror = IndexMirror(index=self.index, refresh_interval=0)
+        self.assertEqual(mirror.resolve(path=path), (None, None))
+
+        document = self.create_document(label=TEST_DOCUMENT_LABEL_2)
+        self.assertEqual(mirror.resolve(path=path), (None, document.pk))
+
+        # Changes made by this process are found when the tree is
+        # invalidated
+        mirror = IndexMirror(index=self.index, refresh_interval=3600)
+        self.assertEqual(mirror.resolve(path=path), (None, document.pk))
+
+        document.delete()
+        self.assertEqual(mirror.resolve(path=path), (None, document.pk))
+
+        mirror.invalidate()
+        self.assertEqual(mirror.resolve(path=path), (None, None))
+
+    def test_document_attributes(self):
+        mirror = IndexMirror(index=self.index, refresh_interval=60)
+
+        attributes = mirror.get_document_attributes(
+            document_pk=self.document.pk
+        )
+        self.assertEqual(
+            sorted(attributes.keys()), ['st_ctime', 'st_mtime', 'st_size']
+        )
+        self.assertEqual(
+            attributes['st_size'], self.document.latest_version.size or 0
+        )
+
+    def test_document_attributes_without_version(self):
+        # Document still being uploaded, mountindex answers ENOENT
+        document = Document.objects.create(
+            document_type=self.document_type, label=TEST_DOCUMENT_LABEL_2
+        )
+
+        mirror = IndexMirror(index=self.index, refresh_interval=60)
+
+        self.assertEqual(
+            mirror.get_document_attributes(document_pk=document.pk), None
+        )
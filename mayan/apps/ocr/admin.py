@@ -3,7 +3,8 @@ from __future__ import unicode_literals
 from django.contrib import admin
 
 from .models import (
-    DocumentPageContent, DocumentTypeSettings, DocumentVersionOCRError
+    DocumentPageContent, DocumentTypeSettings, DocumentVersionOCRError,
+    DocumentVersionOCRQueueEntry
 )
 
 
@@ -14,10 +15,16 @@ class DocumentPageContentAdmin(admin.ModelAdmin):
 
 @admin.register(DocumentTypeSettings)
 class DocumentTypeSettingsAdmin(admin.ModelAdmin):
-    list_display = ('document_type', 'auto_ocr')
+    list_display = ('document_type', 'auto_ocr', 'priority')
 
 
 @admin.register(DocumentVersionOCRError)
 class DocumentVersionOCRErrorAdmin(admin.ModelAdmin):
     list_display = ('document_version', 'datetime_submitted')
     readonly_fields = ('document_version', 'datetime_submitted', 'result')
+
+
+@admin.register(DocumentVersionOCRQueueEntry)
+class DocumentVersionOCRQueueEntryAdmin(admin.ModelAdmin):
+    list_display = ('document_version', 'datetime_submitted')
+    readonly_fields = ('document_version', 'datetime_submitted')
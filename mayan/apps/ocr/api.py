@@ -0,0 +1,146 @@
+from __future__ import unicode_literals
+
+import logging
+
+from django.db.models import Max
+
+from common.settings import settings_db_sync_task_delay
+from documents.models import Document, DocumentVersion
+from documents.search import document_search
+
+from .literals import QUEUE_OCR, QUEUE_OCR_BULK, SUBMIT_BATCH_SIZE
+from .models import DocumentPageContent, DocumentVersionOCRQueueEntry
+from .tasks import task_do_ocr
+
+logger = logging.getLogger(__name__)
+
+
+def get_document_contents(document_pks):
+    """
+    Return (document primary key, page text) tuples of the pages of all
+    the versions of the documents, decompressing the compressed text.
+    """
+    queryset = DocumentPageContent.objects.filter(
+        document_page__document_version__document__pk__in=document_pks
+    ).select_related('document_page__document_version')
+
+    for document_page_content in queryset:
+        document_version = document_page_content.document_page.document_version
+        yield document_version.document_id, document_page_content.get_content()
+
+
+def get_documents(document_type=None, date_start=None, date_end=None, query=None):
+    """
+    Return a queryset of the documents matching all the given criteria:
+    a document type, an interval of the date added and a simple search
+    query.
+    """
+    queryset = Document.objects.all()
+
+    if document_type:
+        queryset = queryset.filter(document_type=document_type)
+
+    if date_start:
+        queryset = queryset.filter(date_added__gte=date_start)
+
+    if date_end:
+        queryset = queryset.filter(date_added__lt=date_end)
+
+    if query:
+        # Query the backend directly, the selection is not restricted by
+        # access or capped at the search results limit.
+        document_search.get_model()
+        queryset = queryset.filter(
+            pk__in=document_search.get_backend().search(
+                search_model=document_search,
+                field_terms=document_search.get_field_terms({'q': query})
+            )
+        )
+
+    return queryset
+
+
+def submit_document_versions(queryset, bulk=False, skip_processed=False):
+    """
+    Queue the document versions of a queryset for OCR. Versions that
+    already have an OCR job pending are skipped, as are versions with
+    extracted content when skip_processed is True. Returns the number of
+    document versions queued.
+    """
+    if skip_processed:
+        queryset = queryset.exclude(pages__ocr_content__isnull=False)
+
+    if bulk:
+        queue = QUEUE_OCR_BULK
+    else:
+        queue = QUEUE_OCR
+
+    new_pks = DocumentVersionOCRQueueEntry.objects.add_pending(
+        document_version_pks=queryset.values_list('pk', flat=True)
+    )
+
+    document_versions = DocumentVersion.objects.filter(
+        pk__in=new_pks
+    ).select_related('document__document_type__ocr_settings')
+
+    for document_version in document_versions:
+        try:
+            task_do_ocr.apply_async(
+                kwargs={'document_version_pk': document_version.pk},
+                countdown=settings_db_sync_task_delay.value,
+                priority=document_version.document.document_type.ocr_settings.priority,
+                queue=queue
+            )
+        except Exception:
+            DocumentVersionOCRQueueEntry.objects.remove_pending(
+                document_version_pk=document_version.pk
+            )
+            raise
+
+    return len(new_pks)
+
+
+def submit_documents(queryset, bulk=True, skip_processed=False, batch_size=SUBMIT_BATCH_SIZE, callback=None):
+    """
+    Queue the latest version of the documents of a queryset for OCR,
+    walking the queryset in batches of primary keys. The callback, if
+    given, is called after each batch with the number of documents
+    processed and queued so far and the total number of documents.
+    Returns the number of document versions queued.
+    """
+    total = queryset.count()
+    processed = 0
+    queued = 0
+    last_pk = 0
+
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk').annotate(
+                latest_version_pk=Max('versions__pk')
+            ).values_list('pk', 'latest_version_pk')[:batch_size]
+        )
+
+        if not batch:
+            break
+
+        last_pk = batch[-1][0]
+
+        queued += submit_document_versions(
+            queryset=DocumentVersion.objects.filter(
+                pk__in=[
+                    version_pk for document_pk, version_pk in batch
+                    if version_pk
+                ]
+            ), bulk=bulk, skip_processed=skip_processed
+        )
+        processed += len(batch)
+
+        logger.debug(
+            'Processed %d of %d documents, %d queued for OCR', processed,
+            total, queued
+        )
+
+        if callback:
+            callback(processed=processed, queued=queued, total=total)
+
+    return queued
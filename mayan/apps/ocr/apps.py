@@ -13,7 +13,6 @@ from common import (
     MayanAppConfig, menu_facet, menu_multi_item, menu_object, menu_secondary,
     menu_tools
 )
-from common.settings import settings_db_sync_task_delay
 from documents.models import Document, DocumentType, DocumentVersion
 from documents.search import document_search
 from documents.signals import post_version_upload
@@ -23,30 +22,38 @@ from mayan.celery import app
 from navigation import SourceColumn
 from rest_api.classes import APIEndPoint
 
+from .api import get_document_contents, submit_document_versions
+from .classes import OCRQueue
 from .handlers import initialize_new_ocr_settings, post_version_upload_ocr
 from .links import (
     link_document_content, link_document_submit, link_document_submit_all,
     link_document_submit_multiple, link_document_type_ocr_settings,
-    link_document_type_submit, link_entry_list
+    link_document_type_submit, link_entry_list, link_queue_list
 )
+from .literals import OCR_PRIORITY_HIGH, QUEUE_OCR, QUEUE_OCR_BULK
 from .models import DocumentVersionOCRError
 from .permissions import permission_ocr_document, permission_ocr_content_view
 from .settings import (
     setting_pdftotext_path, setting_tesseract_path
 )
-from .tasks import task_do_ocr
+from .signals import post_document_version_ocr
 
 logger = logging.getLogger(__name__)
 
 
-def document_ocr_submit(self):
-    task_do_ocr.apply_async(args=(self.latest_version.pk,))
+def document_ocr_submit(self, bulk=False):
+    self.latest_version.submit_for_ocr(bulk=bulk)
 
 
-def document_version_ocr_submit(self):
-    task_do_ocr.apply_async(
-        kwargs={'document_version_pk': self.pk},
-        countdown=settings_db_sync_task_delay.value
+def document_version_ocr_submit(self, bulk=False):
+    """
+    Queue the document version for OCR unless it is already pending. Bulk
+    submissions go to a separate queue so that they don't delay
+    interactive uploads, the document type priority orders the jobs
+    inside each queue.
+    """
+    submit_document_versions(
+        queryset=DocumentVersion.objects.filter(pk=self.pk), bulk=bulk
     )
 
 
@@ -84,20 +91,48 @@ class OCRApp(MayanAppConfig):
             attribute='result'
         )
 
-        app.conf.CELERY_QUEUES.append(
-            Queue('ocr', Exchange('ocr'), routing_key='ocr'),
+        SourceColumn(
+            source=OCRQueue, label=_('Pending jobs'),
+            func=lambda context: context['object'].get_depth()
+        )
+        SourceColumn(
+            source=OCRQueue, label=_('Estimated drain time'),
+            func=lambda context: context['object'].get_drain_time()
+        )
+
+        OCRQueue(name=QUEUE_OCR, label=_('Interactive'))
+        OCRQueue(name=QUEUE_OCR_BULK, label=_('Bulk'))
+
+        # The document type priority of the jobs is only honored by brokers
+        # supporting priority queues, like RabbitMQ 3.5 or later
+        app.conf.CELERY_QUEUES.extend(
+            (
+                Queue(
+                    QUEUE_OCR, Exchange(QUEUE_OCR), routing_key=QUEUE_OCR,
+                    queue_arguments={'x-max-priority': OCR_PRIORITY_HIGH}
+                ),
+                Queue(
+                    QUEUE_OCR_BULK, Exchange(QUEUE_OCR_BULK),
+                    routing_key=QUEUE_OCR_BULK,
+                    queue_arguments={'x-max-priority': OCR_PRIORITY_HIGH}
+                ),
+            )
         )
 
         app.conf.CELERY_ROUTES.update(
             {
                 'ocr.tasks.task_do_ocr': {
-                    'queue': 'ocr'
+                    'queue': QUEUE_OCR
                 },
             }
         )
 
         document_search.add_model_field(
-            field='versions__pages__ocr_content__content', label=_('Content')
+            field='versions__pages__ocr_content__content', label=_('Content'),
+            values_function=get_document_contents
+        )
+        document_search.add_index_trigger(
+            signal=post_document_version_ocr, accessor='document'
         )
 
         menu_facet.bind_links(
@@ -122,7 +157,7 @@ class OCRApp(MayanAppConfig):
         menu_tools.bind_links(
             links=(
                 link_document_submit_all, link_document_type_submit,
-                link_entry_list
+                link_entry_list, link_queue_list
             )
         )
 
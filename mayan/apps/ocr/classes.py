@@ -1,12 +1,21 @@
 from __future__ import unicode_literals
 
+from datetime import timedelta
 import logging
+import time
 
+from django.core.cache import caches
 from django.utils.module_loading import import_string
 
 from converter import converter_class
+from lock_manager import Lock, LockError
+from mayan.celery import app
 
 from .exceptions import NoMIMETypeMatch, ParserError
+from .literals import (
+    OCR_DURATION_AVERAGE_WEIGHT, OCR_DURATION_CACHE_KEY,
+    OCR_DURATION_LOCK_NAME, OCR_DURATION_LOCK_TIMEOUT, QUEUE_DEPTH_CACHE_TIME
+)
 from .models import DocumentPageContent
 from .parsers import Parser
 from .settings import setting_ocr_backend
@@ -14,33 +23,174 @@ from .settings import setting_ocr_backend
 logger = logging.getLogger(__name__)
 
 
+class OCRQueue(object):
+    """
+    Celery queue to which OCR jobs are routed. Provides an estimate of the
+    work pending in the queue.
+    """
+    _registry = {}
+
+    @classmethod
+    def get(cls, name):
+        return cls._registry[name]
+
+    @classmethod
+    def get_all(cls):
+        return sorted(cls._registry.values(), key=lambda queue: queue.name)
+
+    @staticmethod
+    def get_average_duration():
+        return caches['default'].get(OCR_DURATION_CACHE_KEY)
+
+    @staticmethod
+    def record_duration(seconds):
+        """
+        Update the exponential moving average of the time it takes to OCR
+        a document version. The sample is dropped if another worker is
+        updating the average at the same time.
+        """
+        try:
+            lock = Lock.acquire_lock(
+                OCR_DURATION_LOCK_NAME, OCR_DURATION_LOCK_TIMEOUT
+            )
+        except LockError:
+            logger.debug('Unable to acquire lock: %s', OCR_DURATION_LOCK_NAME)
+            return
+
+        try:
+            cache = caches['default']
+            average = cache.get(OCR_DURATION_CACHE_KEY)
+
+            if average is None:
+                average = seconds
+            else:
+                average = (
+                    OCR_DURATION_AVERAGE_WEIGHT * seconds +
+                    (1 - OCR_DURATION_AVERAGE_WEIGHT) * average
+                )
+
+            cache.set(OCR_DURATION_CACHE_KEY, average, None)
+        finally:
+            lock.release()
+
+    def __init__(self, name, label):
+        self.name = name
+        self.label = label
+        self._depth = None
+        self._depth_time = None
+        self.__class__._registry[name] = self
+
+    def __unicode__(self):
+        return unicode(self.label)
+
+    def get_depth(self):
+        """
+        Return the number of messages waiting in the broker for this queue
+        or None if the broker can't be queried. The broker is queried at
+        most once every QUEUE_DEPTH_CACHE_TIME seconds.
+        """
+        if self._depth_time and time.time() - self._depth_time < QUEUE_DEPTH_CACHE_TIME:
+            return self._depth
+
+        self._depth = self.get_broker_depth()
+        self._depth_time = time.time()
+
+        return self._depth
+
+    def get_broker_depth(self):
+        try:
+            with app.connection() as connection:
+                channel = connection.channel()
+                try:
+                    return channel.queue_declare(
+                        queue=self.name, passive=True
+                    ).message_count
+                finally:
+                    channel.close()
+        except Exception as exception:
+            logger.debug(
+                'Unable to get the depth of queue: %s; %s', self.name,
+                exception
+            )
+            return None
+
+    def get_drain_time(self):
+        """
+        Estimate the time a single worker needs to process the messages
+        currently in the queue.
+        """
+        depth = self.get_depth()
+        average = self.get_average_duration()
+
+        if depth is None or average is None:
+            return None
+
+        return timedelta(seconds=int(depth * average))
+
+
 class TextExtractor(object):
     @classmethod
-    def perform_ocr(cls, document_page):
+    def perform_ocr(cls, document_page, pending_contents=None):
+        """
+        Return the OCR text and the OCR input image hash of a page.
+        """
         ocr_backend_class = import_string(setting_ocr_backend.value)
         backend = ocr_backend_class()
-        backend.process_document_page(document_page)
+        return backend.get_document_page_content(
+            document_page, pending_contents=pending_contents
+        )
 
     @classmethod
-    def process_document_page(cls, document_page):
+    def get_document_page_content(cls, document_page, pending_contents=None):
         """
         Extract text for a document version's page. Try parsing the page and if
         no there are not parsers for the MIME type or the parser return nothing
         fallback to doing and OCR of the page.
+        Returns the text and the OCR input image hash, which is empty for
+        parsed pages.
         """
 
         try:
-            Parser.parse_document_page(document_page=document_page)
+            content = Parser.parse_document_page(document_page=document_page)
         except (NoMIMETypeMatch, ParserError):
-            cls.perform_ocr(document_page=document_page)
+            return cls.perform_ocr(
+                document_page=document_page,
+                pending_contents=pending_contents
+            )
         else:
-            if not document_page.ocr_content.content:
-                cls.perform_ocr(document_page=document_page)
+            if not content:
+                return cls.perform_ocr(
+                    document_page=document_page,
+                    pending_contents=pending_contents
+                )
+
+        return content, ''
+
+    @classmethod
+    def process_document_page(cls, document_page):
+        content, image_hash = cls.get_document_page_content(
+            document_page=document_page
+        )
+        DocumentPageContent.objects.bulk_set_content(
+            entries=((document_page, content, image_hash),)
+        )
 
     @classmethod
     def process_document_version(cls, document_version):
+        """
+        Extract the text of all the pages of a document version and store
+        it with a single bulk write once every page is processed.
+        """
+        entries = []
+        pending_contents = {}
         for document_page in document_version.pages.all():
-            cls.process_document_page(document_page=document_page)
+            content, image_hash = cls.get_document_page_content(
+                document_page=document_page,
+                pending_contents=pending_contents
+            )
+            entries.append((document_page, content, image_hash))
+
+        DocumentPageContent.objects.bulk_set_content(entries=entries)
 
 
 class OCRBackendBase(object):
@@ -48,32 +198,68 @@ class OCRBackendBase(object):
         logger.info('Starting OCR for document version: %s', document_version)
         logger.debug('document version: %d', document_version.pk)
 
+        entries = []
+        pending_contents = {}
         for document_page in document_version.pages.all():
-            self.process_document_page(document_page=document_page)
+            content, image_hash = self.get_document_page_content(
+                document_page=document_page,
+                pending_contents=pending_contents
+            )
+            entries.append((document_page, content, image_hash))
+
+        DocumentPageContent.objects.bulk_set_content(entries=entries)
 
     def process_document_page(self, document_page):
-            logger.info(
-                'Processing page: %d of document version: %s',
-                document_page.page_number, document_page.document_version
-            )
+        content, image_hash = self.get_document_page_content(
+            document_page=document_page
+        )
+        DocumentPageContent.objects.bulk_set_content(
+            entries=((document_page, content, image_hash),)
+        )
 
-            image = document_page.get_image()
+    def get_document_page_content(self, document_page, pending_contents=None):
+        """
+        Return the OCR text of a page and the hash of the image used as OCR
+        input. Reuse the text of a previous page with the same image hash
+        instead of calling the backend. pending_contents is a dictionary of
+        the text by image hash of the pages processed but not stored yet,
+        it is looked up first and updated with the text of the page.
+        """
+        logger.info(
+            'Processing page: %d of document version: %s',
+            document_page.page_number, document_page.document_version
+        )
 
-            try:
-                document_page_content, created = DocumentPageContent.objects.get_or_create(
-                    document_page=document_page
-                )
-                document_page_content.content = self.execute(
-                    file_object=image, language=document_page.document.language
-                )
-                document_page_content.save()
-            finally:
-                image.close()
+        image = document_page.get_image()
+        language = document_page.document.language
 
-            logger.info(
-                'Finished processing page: %d of document version: %s',
-                document_page.page_number, document_page.document_version
+        try:
+            image_hash = DocumentPageContent.objects.get_image_hash(
+                image=image, language=language
             )
+            content = None
+            if pending_contents is not None:
+                content = pending_contents.get(image_hash)
+
+            if content is None:
+                content = DocumentPageContent.objects.get_content_for_image_hash(
+                    image_hash=image_hash
+                )
+
+            if content is None:
+                content = self.execute(file_object=image, language=language)
+
+            if pending_contents is not None:
+                pending_contents[image_hash] = content
+        finally:
+            image.close()
+
+        logger.info(
+            'Finished processing page: %d of document version: %s',
+            document_page.page_number, document_page.document_version
+        )
+
+        return content, image_hash
 
     def execute(self, file_object, language=None, transformations=None):
         self.language = language
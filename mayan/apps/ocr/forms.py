@@ -29,7 +29,7 @@ class DocumentContentForm(forms.Form):
 
         for page in document_pages:
             try:
-                page_content = page.ocr_content.content
+                page_content = page.ocr_content.get_content()
             except DocumentPageContent.DoesNotExist:
                 pass
             else:
@@ -36,3 +36,7 @@ link_entry_list = Link(
     icon='fa fa-file-text-o', permissions=(permission_ocr_document,),
     text=_('OCR errors'), view='ocr:entry_list'
 )
+link_queue_list = Link(
+    icon='fa fa-tasks', permissions=(permission_ocr_document,),
+    text=_('OCR queues'), view='ocr:queue_list'
+)
@@ -1,4 +1,32 @@
 from __future__ import unicode_literals
 
+from django.utils.translation import ugettext_lazy as _
+
 DO_OCR_RETRY_DELAY = 10
 LOCK_EXPIRE = 60 * 10  # Adjust to worst case scenario
+# Pending entries older than this are considered lost jobs
+PENDING_EXPIRE = 60 * 60 * 24
+SUBMIT_BATCH_SIZE = 500
+DECOMPRESS_BATCH_SIZE = 100
+CONTENT_CHUNK_SIZE = 64 * 1024
+
+OCR_PRIORITY_LOW = 0
+OCR_PRIORITY_NORMAL = 5
+OCR_PRIORITY_HIGH = 9
+
+OCR_PRIORITY_CHOICES = (
+    (OCR_PRIORITY_HIGH, _('High')),
+    (OCR_PRIORITY_NORMAL, _('Normal')),
+    (OCR_PRIORITY_LOW, _('Low')),
+)
+
+QUEUE_OCR = 'ocr'
+QUEUE_OCR_BULK = 'ocr_bulk'
+# Seconds the number of messages of a queue is reused
+QUEUE_DEPTH_CACHE_TIME = 5
+
+# Weight of the latest sample in the OCR duration moving average
+OCR_DURATION_AVERAGE_WEIGHT = 0.1
+OCR_DURATION_CACHE_KEY = 'ocr_average_duration'
+OCR_DURATION_LOCK_NAME = 'ocr_average_duration'
+OCR_DURATION_LOCK_TIMEOUT = 10
@@ -0,0 +1,17 @@
+from __future__ import unicode_literals
+
+from django.core import management
+
+from ...models import DocumentPageContent
+
+
+class Command(management.BaseCommand):
+    help = (
+        'Store the compressed OCR content uncompressed, to search it with '
+        'the database search backend.'
+    )
+
+    def handle(self, *args, **options):
+        count = DocumentPageContent.objects.decompress_content()
+
+        self.stdout.write('{} document pages decompressed.'.format(count))
@@ -0,0 +1,87 @@
+from __future__ import unicode_literals
+
+import datetime
+from optparse import make_option
+
+from django.core import management
+from django.core.management.base import CommandError
+
+from documents.models import DocumentType
+
+from ...api import get_documents, submit_documents
+from ...literals import SUBMIT_BATCH_SIZE
+
+
+class Command(management.BaseCommand):
+    help = 'Queue documents for OCR in batches, skipping pending work.'
+
+    option_list = management.BaseCommand.option_list + (
+        make_option(
+            '--document-type', action='store', dest='document_type',
+            help='Label of the document type of the documents to submit.'
+        ),
+        make_option(
+            '--start-date', action='store', dest='start_date',
+            help='Submit documents added on or after this date (YYYY-MM-DD).'
+        ),
+        make_option(
+            '--end-date', action='store', dest='end_date',
+            help='Submit documents added before this date (YYYY-MM-DD).'
+        ),
+        make_option(
+            '--query', action='store', dest='query',
+            help='Submit the documents found by this simple search query.'
+        ),
+        make_option(
+            '--batch-size', action='store', dest='batch_size', type='int',
+            default=SUBMIT_BATCH_SIZE,
+            help='Number of documents queued per batch.'
+        ),
+        make_option(
+            '--force', action='store_true', dest='force', default=False,
+            help='Also submit documents that already have content.'
+        ),
+    )
+
+    @staticmethod
+    def _parse_date(value):
+        if value:
+            try:
+                return datetime.datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                raise CommandError('Invalid date: {}'.format(value))
+
+    def handle(self, *args, **options):
+        document_type = None
+        if options['document_type']:
+            try:
+                document_type = DocumentType.objects.get(
+                    label=options['document_type']
+                )
+            except DocumentType.DoesNotExist:
+                raise CommandError(
+                    'Unknown document type: {}'.format(
+                        options['document_type']
+                    )
+                )
+
+        queryset = get_documents(
+            document_type=document_type,
+            date_start=self._parse_date(options['start_date']),
+            date_end=self._parse_date(options['end_date']),
+            query=options['query']
+        )
+
+        def progress(processed, queued, total):
+            self.stdout.write(
+                'Processed {} of {} documents, {} queued for OCR.'.format(
+                    processed, total, queued
+                )
+            )
+
+        queued = submit_documents(
+            queryset=queryset, batch_size=options['batch_size'],
+            callback=progress, skip_processed=not options['force']
+        )
+
+        self.stdout.write('{} documents queued for OCR.'.format(queued))
@@ -0,0 +1,156 @@
+from __future__ import unicode_literals
+
+from datetime import timedelta
+import hashlib
+import logging
+import zlib
+
+from django.db import IntegrityError, models, transaction
+from django.utils.encoding import force_bytes
+from django.utils.timezone import now
+
+from documents.search import document_search
+
+from .literals import DECOMPRESS_BATCH_SIZE, PENDING_EXPIRE
+from .settings import setting_compress_content
+
+logger = logging.getLogger(__name__)
+
+
+class DocumentPageContentManager(models.Manager):
+    def get_image_hash(self, image, language=None):
+        """
+        Return a hash of the exact image bytes that will be fed to the OCR
+        backend. The language is part of the hash as the same image
+        produces different text under a different language setting.
+        """
+        image_hash = hashlib.sha256()
+        image_hash.update(image.getvalue())
+        if language:
+            image_hash.update(language.encode('utf-8'))
+
+        return image_hash.hexdigest()
+
+    def bulk_set_content(self, entries):
+        """
+        Store the content of several document pages with a fixed number of
+        queries. entries is an iterable of (document page, content, image
+        hash) tuples. Existing rows of those pages are replaced in the same
+        transaction. The content is only compressed when the search backend
+        indexes the text, database queries can't search compressed text.
+        """
+        entries = list(entries)
+        instances = []
+        compress = (
+            setting_compress_content.value and
+            document_search.get_backend().indexes_field_values
+        )
+
+        for document_page, content, image_hash in entries:
+            instance = self.model(
+                document_page=document_page, image_hash=image_hash
+            )
+
+            if compress and content:
+                instance.content_compressed = zlib.compress(
+                    force_bytes(content)
+                )
+            else:
+                instance.content = content
+
+            instances.append(instance)
+
+        with transaction.atomic():
+            self.filter(
+                document_page__in=[entry[0] for entry in entries]
+            ).delete()
+            self.bulk_create(instances)
+
+    def decompress_content(self, batch_size=DECOMPRESS_BATCH_SIZE):
+        """
+        Store the compressed content of all the pages uncompressed, for the
+        database queries to search it after switching to a search backend
+        that doesn't index the text. Return the number of pages changed.
+        """
+        count = 0
+
+        while True:
+            batch = list(
+                self.filter(content_compressed__isnull=False)[:batch_size]
+            )
+
+            if not batch:
+                return count
+
+            with transaction.atomic():
+                for instance in batch:
+                    instance.content = instance.get_content()
+                    instance.content_compressed = None
+                    instance.save(
+                        update_fields=('content', 'content_compressed')
+                    )
+
+            count += len(batch)
+
+    def get_content_for_image_hash(self, image_hash):
+        """
+        Return the OCR content of any existing page whose image produced
+        the same hash or None if there is no match.
+        """
+        document_page_content = self.filter(image_hash=image_hash).exclude(
+            content='', content_compressed=None
+        ).first()
+
+        if document_page_content:
+            logger.debug('Reusing OCR content for image hash: %s', image_hash)
+            return document_page_content.get_content()
+
+
+class DocumentVersionOCRQueueEntryManager(models.Manager):
+    def add_pending(self, document_version_pks):
+        """
+        Mark the document versions as pending OCR and return the primary
+        keys of those that were not already pending. Entries older than
+        PENDING_EXPIRE belong to lost jobs and are replaced.
+        """
+        document_version_pks = set(document_version_pks)
+
+        self.filter(
+            datetime_submitted__lt=now() - timedelta(seconds=PENDING_EXPIRE),
+            document_version__pk__in=document_version_pks
+        ).delete()
+
+        pending_pks = set(
+            self.filter(
+                document_version__pk__in=document_version_pks
+            ).values_list('document_version__pk', flat=True)
+        )
+
+        new_pks = document_version_pks - pending_pks
+
+        try:
+            with transaction.atomic():
+                self.bulk_create(
+                    [
+                        self.model(document_version_id=pk) for pk in new_pks
+                    ]
+                )
+        except IntegrityError:
+            # Another process marked some of these versions concurrently,
+            # fallback to adding the entries one by one.
+            result = set()
+            for pk in new_pks:
+                try:
+                    with transaction.atomic():
+                        self.create(document_version_id=pk)
+                except IntegrityError:
+                    logger.debug('Document version %d already pending', pk)
+                else:
+                    result.add(pk)
+
+            return result
+        else:
+            return new_pks
+
+    def remove_pending(self, document_version_pk):
+        self.filter(document_version__pk=document_version_pk).delete()
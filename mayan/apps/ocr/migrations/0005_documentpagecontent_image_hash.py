@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr', '0004_documenttypesettings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentpagecontent',
+            name='image_hash',
+            field=models.CharField(
+                db_index=True, editable=False, max_length=64,
+                verbose_name='Image hash', blank=True
+            ),
+            preserve_default=True,
+        ),
+    ]
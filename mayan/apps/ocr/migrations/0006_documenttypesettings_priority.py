@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr', '0005_documentpagecontent_image_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documenttypesettings',
+            name='priority',
+            field=models.PositiveIntegerField(
+                default=5, help_text='Priority of the OCR jobs of documents '
+                'of this type relative to the jobs of other document types '
+                'in the same OCR queue.', verbose_name='OCR priority',
+                choices=[(9, 'High'), (5, 'Normal'), (0, 'Low')]
+            ),
+            preserve_default=True,
+        ),
+    ]
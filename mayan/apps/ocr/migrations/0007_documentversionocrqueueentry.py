@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0028_newversionblock'),
+        ('ocr', '0006_documenttypesettings_priority'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentVersionOCRQueueEntry',
+            fields=[
+                (
+                    'id', models.AutoField(
+                        verbose_name='ID', serialize=False, auto_created=True,
+                        primary_key=True
+                    )
+                ),
+                (
+                    'datetime_submitted', models.DateTimeField(
+                        auto_now_add=True, verbose_name='Date time submitted',
+                        db_index=True
+                    )
+                ),
+                (
+                    'document_version', models.OneToOneField(
+                        related_name='ocr_queue_entry',
+                        verbose_name='Document version',
+                        to='documents.DocumentVersion'
+                    )
+                ),
+            ],
+            options={
+                'ordering': ('datetime_submitted',),
+                'verbose_name': 'Document version OCR queue entry',
+                'verbose_name_plural': 'Document version OCR queue entries',
+            },
+            bases=(models.Model,),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import models, migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ocr', '0007_documentversionocrqueueentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentpagecontent',
+            name='content_compressed',
+            field=models.BinaryField(
+                null=True, verbose_name='Compressed content', editable=False,
+                blank=True
+            ),
+            preserve_default=True,
+        ),
+    ]
@@ -1,11 +1,21 @@
 from __future__ import unicode_literals
 
+import codecs
+import zlib
+
 from django.db import models
 from django.utils.encoding import python_2_unicode_compatible
 from django.utils.translation import ugettext_lazy as _
 
 from documents.models import DocumentPage, DocumentType, DocumentVersion
 
+from .literals import (
+    CONTENT_CHUNK_SIZE, OCR_PRIORITY_CHOICES, OCR_PRIORITY_NORMAL
+)
+from .managers import (
+    DocumentPageContentManager, DocumentVersionOCRQueueEntryManager
+)
+
 
 class DocumentTypeSettings(models.Model):
     """
@@ -19,6 +29,13 @@ class DocumentTypeSettings(models.Model):
         default=True,
         verbose_name=_('Automatically queue newly created documents for OCR.')
     )
+    priority = models.PositiveIntegerField(
+        choices=OCR_PRIORITY_CHOICES, default=OCR_PRIORITY_NORMAL,
+        help_text=_(
+            'Priority of the OCR jobs of documents of this type relative '
+            'to the jobs of other document types in the same OCR queue.'
+        ), verbose_name=_('OCR priority')
+    )
 
     class Meta:
         verbose_name = _('Document type settings')
@@ -44,6 +61,31 @@ class DocumentVersionOCRError(models.Model):
         verbose_name_plural = _('Document Version OCR Errors')
 
 
+@python_2_unicode_compatible
+class DocumentVersionOCRQueueEntry(models.Model):
+    """
+    Document version with an OCR job waiting in the queue or being processed
+    """
+    document_version = models.OneToOneField(
+        DocumentVersion, related_name='ocr_queue_entry',
+        verbose_name=_('Document version')
+    )
+    datetime_submitted = models.DateTimeField(
+        auto_now_add=True, db_index=True,
+        verbose_name=_('Date time submitted')
+    )
+
+    objects = DocumentVersionOCRQueueEntryManager()
+
+    def __str__(self):
+        return unicode(self.document_version)
+
+    class Meta:
+        ordering = ('datetime_submitted',)
+        verbose_name = _('Document version OCR queue entry')
+        verbose_name_plural = _('Document version OCR queue entries')
+
+
 @python_2_unicode_compatible
 class DocumentPageContent(models.Model):
     """
@@ -54,10 +96,51 @@ class DocumentPageContent(models.Model):
         verbose_name=_('Document page')
     )
     content = models.TextField(blank=True, verbose_name=_('Content'))
+    content_compressed = models.BinaryField(
+        blank=True, editable=False, null=True,
+        verbose_name=_('Compressed content')
+    )
+    image_hash = models.CharField(
+        blank=True, db_index=True, editable=False, max_length=64,
+        verbose_name=_('Image hash')
+    )
+
+    objects = DocumentPageContentManager()
 
     def __str__(self):
         return unicode(self.document_page)
 
+    def get_content(self):
+        """
+        Return the text of the page, decompressing it when it was stored
+        compressed.
+        """
+        return ''.join(self.iter_content())
+
+    def iter_content(self, chunk_size=CONTENT_CHUNK_SIZE):
+        """
+        Yield the text of the page in chunks, decompressing it
+        incrementally when it was stored compressed.
+        """
+        if self.content_compressed:
+            decompressor = zlib.decompressobj()
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            data = bytes(self.content_compressed)
+
+            for index in range(0, len(data), chunk_size):
+                chunk = decoder.decode(
+                    decompressor.decompress(data[index:index + chunk_size])
+                )
+                if chunk:
+                    yield chunk
+
+            chunk = decoder.decode(decompressor.flush(), final=True)
+            if chunk:
+                yield chunk
+        else:
+            for index in range(0, len(self.content), chunk_size):
+                yield self.content[index:index + chunk_size]
+
     class Meta:
         verbose_name = _('Document page content')
         verbose_name_plural = _('Document pages contents')
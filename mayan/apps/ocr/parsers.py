@@ -58,18 +58,18 @@ class Parser(object):
 
     @classmethod
     def parse_document_page(cls, document_page):
+        """
+        Return the text of a page using the first parser registered for the
+        MIME type of the document version that is able to parse it.
+        """
         try:
             for parser_class in cls._registry[document_page.document_version.mimetype]:
                 try:
                     parser = parser_class()
-                    parser.process_document_page(document_page)
+                    return parser.get_document_page_content(document_page)
                 except ParserError:
                     # If parser raises error, try next parser in the list
                     pass
-                else:
-                    # If parser was successfull there is no need to try
-                    # others in the list for this mimetype
-                    return
             raise NoMIMETypeMatch('Parser MIME type list exhausted')
         except KeyError:
             raise NoMIMETypeMatch
@@ -80,10 +80,32 @@ class Parser(object):
         )
         logger.debug('document version: %d', document_version.pk)
 
+        entries = []
         for document_page in document_version.pages.all():
-            self.process_document_page(document_page=document_page)
+            entries.append(
+                (
+                    document_page,
+                    self.get_document_page_content(
+                        document_page=document_page
+                    ), ''
+                )
+            )
+
+        DocumentPageContent.objects.bulk_set_content(entries=entries)
 
     def process_document_page(self, document_page):
+        DocumentPageContent.objects.bulk_set_content(
+            entries=(
+                (
+                    document_page,
+                    self.get_document_page_content(
+                        document_page=document_page
+                    ), ''
+                ),
+            )
+        )
+
+    def get_document_page_content(self, document_page):
         logger.info(
             'Processing page: %d of document version: %s',
             document_page.page_number, document_page.document_version
@@ -92,13 +114,9 @@ class Parser(object):
         file_object = document_page.document_version.get_intermidiate_file()
 
         try:
-            document_page_content, created = DocumentPageContent.objects.get_or_create(
-                document_page=document_page
-            )
-            document_page_content.content = self.execute(
+            content = self.execute(
                 file_object=file_object, page_number=document_page.page_number
             )
-            document_page_content.save()
         except Exception as exception:
             error_message = _('Exception parsing page; %s') % exception
             logger.error(error_message)
@@ -111,6 +129,8 @@ class Parser(object):
             document_page.page_number, document_page.document_version
         )
 
+        return content
+
     def execute(self, file_object, page_number):
         raise NotImplementedError(
             'Your %s class has not defined the required execute() method.' %
@@ -6,6 +6,8 @@ from .models import DocumentPageContent
 
 
 class DocumentPageContentSerializer(serializers.ModelSerializer):
+    content = serializers.CharField(source='get_content', read_only=True)
+
     class Meta:
         fields = ('content',)
         model = DocumentPageContent
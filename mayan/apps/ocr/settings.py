@@ -27,3 +27,13 @@ setting_auto_ocr = namespace.add_setting(
         'Set new document types to perform OCR automatically by default.'
     )
 )
+setting_compress_content = namespace.add_setting(
+    global_name='OCR_COMPRESS_CONTENT', default=False,
+    help_text=_(
+        'Store the extracted text of document pages compressed with zlib. '
+        'Only applied when the search backend indexes the text, compressed '
+        'text is not searchable with database queries. Run the '
+        'decompressocrcontent command after switching back to the database '
+        'search backend.'
+    )
+)
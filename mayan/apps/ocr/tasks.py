@@ -2,6 +2,7 @@ from __future__ import unicode_literals
 
 import logging
 import sys
+import time
 import traceback
 
 from django.conf import settings
@@ -11,9 +12,9 @@ from documents.models import DocumentVersion
 from lock_manager import Lock, LockError
 from mayan.celery import app
 
-from .classes import TextExtractor
+from .classes import OCRQueue, TextExtractor
 from .literals import DO_OCR_RETRY_DELAY, LOCK_EXPIRE
-from .models import DocumentVersionOCRError
+from .models import DocumentVersionOCRError, DocumentVersionOCRQueueEntry
 from .signals import post_document_version_ocr
 
 logger = logging.getLogger(__name__)
@@ -35,7 +36,9 @@ def task_do_ocr(self, document_version_pk):
                 'Starting document OCR for document version: %s',
                 document_version
             )
+            start_time = time.time()
             TextExtractor.process_document_version(document_version)
+            OCRQueue.record_duration(time.time() - start_time)
         except OperationalError as exception:
             logger.warning(
                 'OCR error for document version: %d; %s. Retrying.',
@@ -47,6 +50,9 @@ def task_do_ocr(self, document_version_pk):
                 'OCR error for document version: %d; %s', document_version_pk,
                 exception
             )
+            DocumentVersionOCRQueueEntry.objects.remove_pending(
+                document_version_pk=document_version_pk
+            )
             if document_version:
                 entry, created = DocumentVersionOCRError.objects.get_or_create(
                     document_version=document_version
@@ -66,6 +72,9 @@ def task_do_ocr(self, document_version_pk):
             logger.info(
                 'OCR complete for document version: %s', document_version
             )
+            DocumentVersionOCRQueueEntry.objects.remove_pending(
+                document_version_pk=document_version_pk
+            )
             try:
                 entry = DocumentVersionOCRError.objects.get(
                     document_version=document_version
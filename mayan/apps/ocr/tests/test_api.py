@@ -5,16 +5,24 @@ import json
 from django.contrib.auth.models import User
 from django.core.files import File
 from django.core.urlresolvers import reverse
+from django.test import TestCase, override_settings
 
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from documents.models import DocumentType
-from documents.tests import TEST_DOCUMENT_TYPE, TEST_SMALL_DOCUMENT_PATH
+from documents.models import DocumentType, DocumentVersion
+from documents.tests import (
+    TEST_DOCUMENT_TYPE, TEST_SMALL_DOCUMENT_FILENAME, TEST_SMALL_DOCUMENT_PATH
+)
+from mayan.celery import app
 from user_management.tests import (
     TEST_ADMIN_EMAIL, TEST_ADMIN_PASSWORD, TEST_ADMIN_USERNAME
 )
 
+from ..api import get_documents, submit_document_versions
+from ..literals import OCR_PRIORITY_HIGH, QUEUE_OCR, QUEUE_OCR_BULK
+from ..tasks import task_do_ocr
+
 
 class OCRAPITestCase(APITestCase):
     """
@@ -82,3 +90,68 @@ class OCRAPITestCase(APITestCase):
         self.assertTrue(
             'Mayan EDMS Documentation' in json.loads(response.content)['content']
         )
+
+
+@override_settings(OCR_AUTO_OCR=False)
+class OCRSubmitTestCase(TestCase):
+    def setUp(self):
+        self.document_type = DocumentType.objects.create(
+            label=TEST_DOCUMENT_TYPE
+        )
+        self.document_type.ocr_settings.priority = OCR_PRIORITY_HIGH
+        self.document_type.ocr_settings.save()
+
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            self.document = self.document_type.new_document(
+                file_object=File(file_object),
+            )
+
+    def tearDown(self):
+        self.document_type.delete()
+
+    def submit(self, bulk):
+        submissions = []
+
+        task_do_ocr.apply_async = lambda **kwargs: submissions.append(kwargs)
+        try:
+            submit_document_versions(
+                queryset=DocumentVersion.objects.filter(
+                    pk=self.document.latest_version.pk
+                ), bulk=bulk
+            )
+        finally:
+            del task_do_ocr.apply_async
+
+        return submissions
+
+    def test_submit_routing(self):
+        submissions = self.submit(bulk=False)
+
+        self.assertEqual(len(submissions), 1)
+        self.assertEqual(submissions[0]['queue'], QUEUE_OCR)
+        self.assertEqual(submissions[0]['priority'], OCR_PRIORITY_HIGH)
+
+    def test_submit_bulk_routing(self):
+        submissions = self.submit(bulk=True)
+
+        self.assertEqual(len(submissions), 1)
+        self.assertEqual(submissions[0]['queue'], QUEUE_OCR_BULK)
+        self.assertEqual(submissions[0]['priority'], OCR_PRIORITY_HIGH)
+
+    def test_get_documents_query(self):
+        self.assertEqual(
+            list(get_documents(query=TEST_SMALL_DOCUMENT_FILENAME)),
+            [self.document]
+        )
+        self.assertEqual(list(get_documents(query='nonexistent')), [])
+
+    def test_priority_queues(self):
+        queues = dict(
+            (queue.name, queue) for queue in app.conf.CELERY_QUEUES
+        )
+
+        for name in (QUEUE_OCR, QUEUE_OCR_BULK):
+            self.assertEqual(
+                queues[name].queue_arguments,
+                {'x-max-priority': OCR_PRIORITY_HIGH}
+            )
@@ -2,14 +2,30 @@
 
 from __future__ import unicode_literals
 
+import os
+import tempfile
+
+from django.contrib.auth.models import User
 from django.core.files.base import File
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.utils.module_loading import import_string
 
 from documents.models import DocumentType
+from documents.search import document_search
 from documents.settings import setting_language_choices
 from documents.tests import (
     TEST_DEU_DOCUMENT_PATH, TEST_DOCUMENT_TYPE, TEST_SMALL_DOCUMENT_PATH
 )
+from user_management.tests import (
+    TEST_ADMIN_EMAIL, TEST_ADMIN_PASSWORD, TEST_ADMIN_USERNAME
+)
+
+from ..models import DocumentPageContent, DocumentVersionOCRQueueEntry
+from ..settings import setting_ocr_backend
+
+TEST_SEARCH_INDEX_PATH = os.path.join(
+    tempfile.gettempdir(), 'mayan_test_ocr_search_index.sqlite3'
+)
 
 
 class DocumentOCRTestCase(TestCase):
@@ -32,6 +48,188 @@ class DocumentOCRTestCase(TestCase):
 
         self.assertTrue('Mayan EDMS Documentation' in content)
 
+    def patch_backend_execute(self):
+        """
+        Count the calls to the execute method of the OCR backend, return
+        the list of calls and the function restoring the method.
+        """
+        backend_class = import_string(setting_ocr_backend.value)
+        execute = backend_class.__dict__['execute']
+        calls = []
+
+        def counting_execute(self, *args, **kwargs):
+            calls.append(kwargs)
+            return execute(self, *args, **kwargs)
+
+        def restore():
+            backend_class.execute = execute
+
+        backend_class.execute = counting_execute
+
+        return calls, restore
+
+    def test_ocr_content_reuse_by_image_hash(self):
+        DocumentPageContent.objects.all().delete()
+        documents = []
+
+        calls, restore = self.patch_backend_execute()
+        try:
+            for index in range(2):
+                with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+                    documents.append(
+                        self.document_type.new_document(
+                            file_object=File(file_object),
+                        )
+                    )
+        finally:
+            restore()
+
+        page_content = documents[0].pages.first().ocr_content
+        duplicate_page_content = documents[1].pages.first().ocr_content
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(page_content.image_hash)
+        self.assertEqual(
+            page_content.image_hash, duplicate_page_content.image_hash
+        )
+        self.assertEqual(page_content.content, duplicate_page_content.content)
+
+        for document in documents:
+            document.delete()
+
+    def test_ocr_content_reuse_pending(self):
+        document_page = self.document.pages.first()
+        DocumentPageContent.objects.all().delete()
+        backend = import_string(setting_ocr_backend.value)()
+        pending_contents = {}
+
+        calls, restore = self.patch_backend_execute()
+        try:
+            content, image_hash = backend.get_document_page_content(
+                document_page, pending_contents=pending_contents
+            )
+            duplicate_content, duplicate_image_hash = backend.get_document_page_content(
+                document_page, pending_contents=pending_contents
+            )
+        finally:
+            restore()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(image_hash, duplicate_image_hash)
+        self.assertEqual(content, duplicate_content)
+
+    def test_bulk_set_content(self):
+        document_page = self.document.pages.first()
+
+        DocumentPageContent.objects.bulk_set_content(
+            entries=((document_page, 'test content', ''),)
+        )
+
+        self.assertEqual(
+            DocumentPageContent.objects.filter(
+                document_page=document_page
+            ).count(), 1
+        )
+        self.assertEqual(
+            DocumentPageContent.objects.get(
+                document_page=document_page
+            ).content, 'test content'
+        )
+
+    @override_settings(
+        OCR_COMPRESS_CONTENT=True,
+        SEARCH_BACKEND='dynamic_search.backends.inverted_index.InvertedIndexSearchBackend',
+        SEARCH_INDEX_PATH=TEST_SEARCH_INDEX_PATH
+    )
+    def test_compressed_content(self):
+        document_page = self.document.pages.first()
+        content = 'compressed content ' * 1000
+
+        DocumentPageContent.objects.bulk_set_content(
+            entries=((document_page, content, ''),)
+        )
+
+        document_page_content = DocumentPageContent.objects.get(
+            document_page=document_page
+        )
+
+        self.assertEqual(document_page_content.content, '')
+        self.assertEqual(document_page_content.get_content(), content)
+        self.assertEqual(
+            ''.join(document_page_content.iter_content(chunk_size=16)),
+            content
+        )
+
+        admin_user = User.objects.create_superuser(
+            username=TEST_ADMIN_USERNAME, email=TEST_ADMIN_EMAIL,
+            password=TEST_ADMIN_PASSWORD
+        )
+        document_search.index_instance(object_id=self.document.pk)
+
+        results = document_search.search(
+            {'versions__pages__ocr_content__content': 'compressed'},
+            user=admin_user
+        )
+
+        os.unlink(TEST_SEARCH_INDEX_PATH)
+
+        self.assertEqual(list(results.queryset), [self.document])
+
+    @override_settings(OCR_COMPRESS_CONTENT=True)
+    def test_compressed_content_database_backend(self):
+        document_page = self.document.pages.first()
+
+        DocumentPageContent.objects.bulk_set_content(
+            entries=((document_page, 'uncompressed content', ''),)
+        )
+
+        document_page_content = DocumentPageContent.objects.get(
+            document_page=document_page
+        )
+
+        self.assertEqual(document_page_content.content, 'uncompressed content')
+        self.assertFalse(document_page_content.content_compressed)
+
+    def test_decompress_content(self):
+        document_page = self.document.pages.first()
+
+        with self.settings(
+            OCR_COMPRESS_CONTENT=True,
+            SEARCH_BACKEND='dynamic_search.backends.inverted_index.InvertedIndexSearchBackend'
+        ):
+            DocumentPageContent.objects.bulk_set_content(
+                entries=((document_page, 'compressed content', ''),)
+            )
+
+        self.assertEqual(DocumentPageContent.objects.decompress_content(), 1)
+
+        document_page_content = DocumentPageContent.objects.get(
+            document_page=document_page
+        )
+
+        self.assertEqual(document_page_content.content, 'compressed content')
+        self.assertEqual(document_page_content.content_compressed, None)
+
+    def test_pending_entry_deduplication(self):
+        document_version_pk = self.document.latest_version.pk
+
+        self.assertFalse(
+            DocumentVersionOCRQueueEntry.objects.filter(
+                document_version__pk=document_version_pk
+            ).exists()
+        )
+
+        self.assertEqual(
+            DocumentVersionOCRQueueEntry.objects.add_pending(
+                document_version_pks=(document_version_pk,)
+            ), set((document_version_pk,))
+        )
+        self.assertEqual(
+            DocumentVersionOCRQueueEntry.objects.add_pending(
+                document_version_pks=(document_version_pk,)
+            ), set()
+        )
+
 
 class GermanOCRSupportTestCase(TestCase):
     def setUp(self):
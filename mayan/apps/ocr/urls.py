@@ -7,7 +7,8 @@ from .api_views import (
 )
 from .views import (
     DocumentAllSubmitView, DocumentSubmitView, DocumentSubmitManyView,
-    DocumentTypeSettingsEditView, DocumentTypeSubmitView, EntryListView
+    DocumentTypeSettingsEditView, DocumentTypeSubmitView, EntryListView,
+    QueueListView
 )
 
 urlpatterns = patterns(
@@ -39,6 +40,7 @@ urlpatterns = patterns(
     ),
 
     url(r'^all/$', EntryListView.as_view(), name='entry_list'),
+    url(r'^queues/$', QueueListView.as_view(), name='queue_list'),
 )
 
 api_urls = patterns(
@@ -16,6 +16,8 @@ from common.mixins import MultipleInstanceActionMixin
 from documents.models import Document, DocumentType
 from permissions import Permission
 
+from .api import get_documents, submit_documents
+from .classes import OCRQueue
 from .forms import DocumentContentForm, DocumentTypeSelectForm
 from .models import DocumentVersionOCRError
 from .permissions import (
@@ -31,10 +33,7 @@ class DocumentAllSubmitView(ConfirmView):
         return reverse('common:tools_list')
 
     def view_action(self):
-        count = 0
-        for document in Document.objects.all():
-            document.submit_for_ocr()
-            count += 1
+        count = submit_documents(queryset=Document.objects.all())
 
         messages.success(
             self.request, _('%d documents added to the OCR queue.') % count
@@ -98,11 +97,11 @@ class DocumentTypeSubmitView(FormView):
         return reverse('common:tools_list')
 
     def form_valid(self, form):
-        count = 0
-        print form.cleaned_data
-        for document in form.cleaned_data['document_type'].documents.all():
-            document.submit_for_ocr()
-            count += 1
+        count = submit_documents(
+            queryset=get_documents(
+                document_type=form.cleaned_data['document_type']
+            )
+        )
 
         messages.success(
             self.request, _(
@@ -118,7 +117,7 @@ class DocumentTypeSubmitView(FormView):
 
 
 class DocumentTypeSettingsEditView(SingleObjectEditView):
-    fields = ('auto_ocr',)
+    fields = ('auto_ocr', 'priority')
     view_permission = permission_document_type_ocr_setup
 
     def get_object(self, queryset=None):
@@ -169,3 +168,14 @@ class EntryListView(SingleObjectListView):
 
     def get_queryset(self):
         return DocumentVersionOCRError.objects.all()
+
+
+class QueueListView(SingleObjectListView):
+    extra_context = {
+        'hide_link': True,
+        'title': _('OCR queues'),
+    }
+    view_permission = permission_ocr_document
+
+    def get_queryset(self):
+        return OCRQueue.get_all()
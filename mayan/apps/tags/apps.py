@@ -1,5 +1,6 @@
 from __future__ import unicode_literals
 
+from django.db.models.signals import m2m_changed, post_save
 from django.utils.translation import ugettext_lazy as _
 
 from acls import ModelPermission
@@ -81,7 +82,25 @@ class TagsApp(MayanAppConfig):
             )
         )
 
-        document_search.add_model_field(field='tags__label', label=_('Tags'))
+        document_search.add_model_field(
+            field='tags__label', label=_('Tags'), weight=2
+        )
+        document_search.add_facet(
+            name='tag', label=_('Tags'), field='tags__label'
+        )
+
+        document_search.add_index_trigger(
+            signal=m2m_changed, sender=Tag.documents.through,
+            accessor='documents'
+        )
+        document_search.add_index_trigger(
+            signal=post_save, sender=Tag, accessor='documents'
+        )
+        # Deleting a tag deletes its relations with the documents
+        # without sending m2m_changed
+        document_search.add_delete_index_trigger(
+            sender=Tag, accessor='documents'
+        )
 
         menu_facet.bind_links(
             links=(link_tag_document_list,), sources=(Document,)
@@ -1,15 +1,27 @@
 from __future__ import unicode_literals
 
+import os
+import tempfile
+
+from django.contrib.auth.models import User
 from django.core.files.base import File
 from django.test import TestCase, override_settings
 
 from documents.models import DocumentType
+from documents.search import document_search
 from documents.tests import TEST_DOCUMENT_TYPE, TEST_SMALL_DOCUMENT_PATH
+from user_management.tests import (
+    TEST_ADMIN_EMAIL, TEST_ADMIN_PASSWORD, TEST_ADMIN_USERNAME
+)
 
 from ..models import Tag
 
 from .literals import TEST_TAG_COLOR, TEST_TAG_LABEL
 
+TEST_SEARCH_INDEX_PATH = os.path.join(
+    tempfile.gettempdir(), 'mayan_test_tag_search_index.sqlite3'
+)
+
 
 @override_settings(OCR_AUTO_OCR=False)
 class TagTestCase(TestCase):
@@ -46,3 +58,52 @@ class TagTestCase(TestCase):
         self.assertEqual(list(tag.documents.all()), [])
 
         tag.delete()
+
+
+@override_settings(
+    OCR_AUTO_OCR=False,
+    SEARCH_BACKEND='dynamic_search.backends.inverted_index.InvertedIndexSearchBackend',
+    SEARCH_INDEX_PATH=TEST_SEARCH_INDEX_PATH
+)
+class TagSearchTestCase(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username=TEST_ADMIN_USERNAME, email=TEST_ADMIN_EMAIL,
+            password=TEST_ADMIN_PASSWORD
+        )
+        self.document_type = DocumentType.objects.create(
+            label=TEST_DOCUMENT_TYPE
+        )
+
+        with open(TEST_SMALL_DOCUMENT_PATH) as file_object:
+            self.document = self.document_type.new_document(
+                file_object=File(file_object)
+            )
+
+        self.tag = Tag.objects.create(
+            color=TEST_TAG_COLOR, label=TEST_TAG_LABEL
+        )
+
+    def tearDown(self):
+        self.document_type.delete()
+        os.unlink(TEST_SEARCH_INDEX_PATH)
+
+    def search_tag(self):
+        results = document_search.search(
+            {'tags__label': TEST_TAG_LABEL}, user=self.admin_user
+        )
+        return list(results.queryset)
+
+    def test_tag_attach_detach(self):
+        self.tag.documents.add(self.document)
+        self.assertEqual(self.search_tag(), [self.document])
+
+        self.tag.documents.remove(self.document)
+        self.assertEqual(self.search_tag(), [])
+
+    def test_tag_delete(self):
+        self.document.tags.add(self.tag)
+        self.assertEqual(self.search_tag(), [self.document])
+
+        self.tag.delete()
+        self.assertEqual(self.search_tag(), [])